@@ -0,0 +1,193 @@
+"""ES117 Backend — Activity Rollups
+
+Participation counters for the instructor dashboard, kept pre-aggregated
+in activity_rollups (created by migration 8) so /api/analytics never
+counts rows in shoutouts or poll_votes:
+
+  grain 60      per-minute shoutouts and votes (votes also per poll)
+  grain 3600    hourly buckets, merged from minutes older than
+                ANALYTICS_MINUTE_RETENTION_HOURS by the compactor
+  grain 86400   per-day shoutouts, votes and unique active users
+
+The write paths call record() inside their own transaction, so a bucket
+moves exactly when the row it counts is committed. Days start at local
+midnight (ANALYTICS_DAY_OFFSET_MINUTES east of UTC); a user counts once
+per day however often they post or vote.
+
+Usage:
+    python -m app.analytics --compact   # merge old minute buckets into hours now
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import aiosqlite
+
+from app.config import (
+    ANALYTICS_ACTIVE_USERS_RETENTION_DAYS, ANALYTICS_COMPACT_INTERVAL_SECONDS, ANALYTICS_DAY_OFFSET_MINUTES,
+    ANALYTICS_MINUTE_RETENTION_HOURS,
+)
+from app.database import pool
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+DAY_OFFSET = ANALYTICS_DAY_OFFSET_MINUTES * 60
+
+UPSERT_ROLLUP_SQL = """
+    INSERT INTO activity_rollups (grain, kind, scope, bucket, count) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (grain, kind, scope, bucket) DO UPDATE SET count = count + excluded.count
+"""
+ACTIVE_USER_SQL = "INSERT OR IGNORE INTO active_users (day, user_id) VALUES (?, ?)"
+# {grains}, {kinds}: one "?" per value, comma-separated
+SERIES_SQL = """
+    SELECT kind, bucket, count FROM activity_rollups
+    WHERE grain IN ({grains}) AND kind IN ({kinds})
+      AND scope = ? AND bucket >= ? AND bucket < ?
+"""
+COMPACT_MINUTES_SQL = """
+    INSERT INTO activity_rollups (grain, kind, scope, bucket, count)
+    SELECT ?, kind, scope, bucket / ? * ?, SUM(count) FROM activity_rollups
+    WHERE grain = ? AND bucket < ?
+    GROUP BY kind, scope, bucket / ?
+    ON CONFLICT (grain, kind, scope, bucket) DO UPDATE SET count = count + excluded.count
+"""
+DROP_MINUTES_SQL = "DELETE FROM activity_rollups WHERE grain = ? AND bucket < ?"
+PRUNE_ACTIVE_USERS_SQL = "DELETE FROM active_users WHERE day < ?"
+
+
+def day_start(t: float) -> int:
+    """Unix time of the local midnight starting t's day."""
+    return (int(t) + DAY_OFFSET) // DAY * DAY - DAY_OFFSET
+
+
+def bucket_start(t: float, grain: int) -> int:
+    return day_start(t) if grain == DAY else int(t) // grain * grain
+
+
+def timestamp(t: int) -> str:
+    """UTC, in the format SQLite's CURRENT_TIMESTAMP uses for created_at."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(t))
+
+
+def local_day(t: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(t + DAY_OFFSET))
+
+
+async def series(db: aiosqlite.Connection, kinds: tuple[str, ...], scope: int, grain: int,
+                 start: int, end: int) -> dict[str, list[int]]:
+    """Zero-filled counts per `grain` bucket in [start, end) for each kind.
+
+    Hourly series also fold in the minute buckets not compacted yet.
+    """
+    points = max(0, (end - start) // grain)
+    counts = {kind: [0] * points for kind in kinds}
+    grains = (MINUTE, HOUR) if grain == HOUR else (grain,)
+    rows = await db.execute(SERIES_SQL.format(grains=",".join("?" * len(grains)), kinds=",".join("?" * len(kinds))),
+                            (*grains, *kinds, scope, start, end))
+    for kind, bucket, count in await rows.fetchall():
+        counts[kind][(bucket - start) // grain] += count
+    return counts
+
+
+class ActivityRollups:
+    """Incremental activity counters plus the background minute-to-hour compaction."""
+
+    def __init__(self, retention_hours: float = ANALYTICS_MINUTE_RETENTION_HOURS,
+                 interval: float = ANALYTICS_COMPACT_INTERVAL_SECONDS,
+                 users_retention_days: int = ANALYTICS_ACTIVE_USERS_RETENTION_DAYS):
+        self.retention_hours = retention_hours
+        self.interval = interval
+        self.users_retention_days = users_retention_days
+        self._task: asyncio.Task | None = None
+        self._stats = {"events": 0, "passes": 0, "minutes_merged": 0, "active_users_pruned": 0, "errors": 0}
+
+    async def record(self, db: aiosqlite.Connection, kind: str, events: list[tuple[int, int | None]],
+                     now: float | None = None):
+        """Count (scope, user_id) events in their minute and day buckets; caller commits.
+
+        scope is the poll id for votes (they also count towards the scope 0
+        total), else 0.
+        """
+        if not events:
+            return
+        now = time.time() if now is None else now
+        minute, day = bucket_start(now, MINUTE), day_start(now)
+        per_scope = Counter()
+        for scope, _ in events:
+            per_scope[scope] += 1
+            if scope:
+                per_scope[0] += 1
+        await db.executemany(UPSERT_ROLLUP_SQL, [
+            (grain, kind, scope, bucket, n)
+            for scope, n in per_scope.items() for grain, bucket in ((MINUTE, minute), (DAY, day))
+        ])
+        users = {(day, user_id) for _, user_id in events if user_id is not None}
+        if users:
+            cursor = await db.executemany(ACTIVE_USER_SQL, users)
+            if cursor.rowcount > 0:
+                await db.execute(UPSERT_ROLLUP_SQL, (DAY, "active_users", 0, day, cursor.rowcount))
+        self._stats["events"] += len(events)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as exc:
+                self._stats["errors"] += 1
+                print(f"⚠️  Activity rollup compaction: {exc}")
+            await asyncio.sleep(self.interval)
+
+    async def compact(self, now: float | None = None) -> int:
+        """Merge whole hours of minute buckets past retention into hourly ones. Returns minute rows merged."""
+        now = time.time() if now is None else now
+        cutoff = bucket_start(now - self.retention_hours * 3600, HOUR)
+        async with pool.writer() as db:
+            await db.execute(COMPACT_MINUTES_SQL, (HOUR, HOUR, HOUR, MINUTE, cutoff, HOUR))
+            merged = await db.execute(DROP_MINUTES_SQL, (MINUTE, cutoff))
+            pruned = await db.execute(PRUNE_ACTIVE_USERS_SQL, (day_start(now) - self.users_retention_days * DAY,))
+            await db.commit()
+        self._stats["passes"] += 1
+        self._stats["minutes_merged"] += merged.rowcount
+        self._stats["active_users_pruned"] += pruned.rowcount
+        return merged.rowcount
+
+    def stats(self) -> dict:
+        return {"compactor": self.running, "minute_retention_hours": self.retention_hours, **self._stats}
+
+
+activity = ActivityRollups()
+
+
+async def _main() -> int:
+    started = time.perf_counter()
+    merged = await activity.compact()
+    print(f"✅ Merged {merged} minute buckets into hourly ones in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the activity rollups")
+    parser.add_argument("--compact", action="store_true", help="Merge old minute buckets into hourly ones")
+    args = parser.parse_args()
+    if not args.compact:
+        parser.error("nothing to do (use --compact)")
+    raise SystemExit(asyncio.run(_main()))
@@ -1,20 +1,125 @@
 """ES117 Backend — Google OAuth + JWT Authentication"""
+import asyncio
+import hashlib
+import re
+import time
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
 
+from app.cache import TTLCache
 from app.config import (
     GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI,
+    GOOGLE_TOKEN_URL, GOOGLE_USERINFO_URL, GOOGLE_CERTS_URL,
     JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRE_HOURS, ALLOWED_DOMAIN,
+    OAUTH_TIMEOUT_SECONDS, OAUTH_CONNECT_TIMEOUT_SECONDS, OAUTH_RETRIES, OAUTH_BACKOFF_SECONDS,
+    OAUTH_VERIFY_ID_TOKEN, TOKEN_CACHE_SIZE, USER_CACHE_SIZE, USER_CACHE_TTL,
 )
+from app.metrics import timed_phase
+
+try:
+    import h2  # noqa: F401 — from httpx[http2]; enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 security = HTTPBearer(auto_error=False)
 
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+
+# --- Outbound HTTP ---
+# One pooled client for the app's lifetime, so logins reuse warm keep-alive
+# (and HTTP/2) connections to Google instead of a fresh TLS handshake each.
+_http: httpx.AsyncClient | None = None
+
+
+def _new_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(OAUTH_TIMEOUT_SECONDS, connect=OAUTH_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60),
+    )
+
+
+async def open_http_client():
+    """Create the shared outbound client (app startup)."""
+    global _http
+    if _http is None:
+        if not HTTP2_AVAILABLE:
+            print("⚠️  h2 is not installed (pip install 'httpx[http2]'): Google requests fall back to HTTP/1.1")
+        _http = _new_http_client()
+
+
+async def close_http_client():
+    """Close the shared outbound client (app shutdown)."""
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+async def _request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request on the shared client, retrying transient failures with backoff.
+
+    POSTs are only retried when the connection could not be made, since the
+    auth code is single-use and Google may already have consumed it.
+    """
+    if _http is None:
+        await open_http_client()
+    for attempt in range(OAUTH_RETRIES + 1):
+        last = attempt == OAUTH_RETRIES
+        try:
+            with timed_phase("oauth"):
+                resp = await _http.request(method, url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+            if last:
+                raise HTTPException(502, "Could not reach Google")
+        except httpx.TransportError:
+            if last or method != "GET":
+                raise HTTPException(502, "Could not reach Google")
+        else:
+            if resp.status_code < 500 or last or method != "GET":
+                return resp
+        await asyncio.sleep(OAUTH_BACKOFF_SECONDS * 2 ** attempt)
+
+
+# --- Google signing keys (for local id_token verification) ---
+_google_keys: dict = {"jwks": None, "expires": 0.0}
+# One fetch at a time: a cold-cache login burst waits for it instead of each fetching
+_google_keys_lock = asyncio.Lock()
+
+
+async def _get_google_keys(refresh: bool = False) -> dict:
+    """Google's JWKS, cached for the max-age Google sends."""
+    jwks = _google_keys["jwks"]
+    if not refresh and jwks is not None and _google_keys["expires"] >= time.monotonic():
+        return jwks
+    async with _google_keys_lock:
+        if _google_keys["jwks"] is not jwks:
+            # Another request fetched them while this one waited
+            return _google_keys["jwks"]
+        resp = await _request("GET", GOOGLE_CERTS_URL)
+        if resp.status_code != 200:
+            raise HTTPException(502, "Failed to fetch Google signing keys")
+        max_age = re.search(r"max-age=(\d+)", resp.headers.get("cache-control", ""))
+        _google_keys["jwks"] = resp.json()
+        _google_keys["expires"] = time.monotonic() + (int(max_age.group(1)) if max_age else 3600)
+    return _google_keys["jwks"]
+
+
+async def verify_google_id_token(id_token: str, access_token: str | None = None) -> dict:
+    """Verify a Google id_token locally and return its claims. Raises JWTError on failure."""
+    jwks = await _get_google_keys()
+    kid = jwt.get_unverified_header(id_token).get("kid")
+    if kid not in {k.get("kid") for k in jwks.get("keys", [])}:
+        jwks = await _get_google_keys(refresh=True)  # Google rotated its keys
+    return jwt.decode(
+        id_token, jwks, algorithms=["RS256"],
+        audience=GOOGLE_CLIENT_ID, issuer=GOOGLE_ISSUERS, access_token=access_token,
+    )
 
 
 def get_google_login_url(state: str = "") -> str:
@@ -35,27 +140,39 @@ def get_google_login_url(state: str = "") -> str:
 
 
 async def exchange_code(code: str) -> dict:
-    """Exchange auth code for tokens, then fetch user info."""
-    async with httpx.AsyncClient() as client:
-        # Exchange code for access token
-        token_resp = await client.post(GOOGLE_TOKEN_URL, data={
-            "code": code,
-            "client_id": GOOGLE_CLIENT_ID,
-            "client_secret": GOOGLE_CLIENT_SECRET,
-            "redirect_uri": GOOGLE_REDIRECT_URI,
-            "grant_type": "authorization_code",
-        })
-        if token_resp.status_code != 200:
-            raise HTTPException(400, "Failed to exchange auth code")
-        tokens = token_resp.json()
-
-        # Fetch user info
-        user_resp = await client.get(GOOGLE_USERINFO_URL, headers={
-            "Authorization": f"Bearer {tokens['access_token']}"
-        })
-        if user_resp.status_code != 200:
-            raise HTTPException(400, "Failed to fetch user info")
-        return user_resp.json()
+    """Exchange auth code for tokens, then resolve the user's profile."""
+    token_resp = await _request("POST", GOOGLE_TOKEN_URL, data={
+        "code": code,
+        "client_id": GOOGLE_CLIENT_ID,
+        "client_secret": GOOGLE_CLIENT_SECRET,
+        "redirect_uri": GOOGLE_REDIRECT_URI,
+        "grant_type": "authorization_code",
+    })
+    if token_resp.status_code != 200:
+        raise HTTPException(400, "Failed to exchange auth code")
+    tokens = token_resp.json()
+
+    # Fast path: the id_token already carries email/name/picture
+    if OAUTH_VERIFY_ID_TOKEN and tokens.get("id_token"):
+        try:
+            claims = await verify_google_id_token(tokens["id_token"], tokens.get("access_token"))
+        except (JWTError, HTTPException):
+            claims = None
+        if claims and claims.get("email") and "name" in claims:
+            return {
+                "email": claims["email"],
+                "verified_email": claims.get("email_verified", False),
+                "name": claims["name"],
+                "picture": claims.get("picture", ""),
+            }
+
+    # Fetch user info
+    user_resp = await _request("GET", GOOGLE_USERINFO_URL, headers={
+        "Authorization": f"Bearer {tokens['access_token']}"
+    })
+    if user_resp.status_code != 200:
+        raise HTTPException(400, "Failed to fetch user info")
+    return user_resp.json()
 
 
 def create_jwt(user_id: int, email: str) -> str:
@@ -67,12 +184,41 @@ def create_jwt(user_id: int, email: str) -> str:
     )
 
 
+# Verified tokens, keyed by a digest of the token so raw JWTs aren't kept
+# around; each entry expires with the token's own exp claim.
+token_cache = TTLCache(TOKEN_CACHE_SIZE, ttl=JWT_EXPIRE_HOURS * 3600)
+
+
 def decode_jwt(token: str) -> dict:
-    """Decode and validate a JWT token."""
+    """Decode and validate a JWT token (served from the verified-token cache when possible)."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except JWTError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+    if "exp" in claims:
+        token_cache.set(key, claims, ttl=claims["exp"] - time.time())
+    return claims
+
+
+# --- User profiles ---
+# /api/auth/me reads through this; the OAuth callback invalidates on upsert.
+user_cache = TTLCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+def get_cached_user(user_id: int) -> dict | None:
+    return user_cache.get(user_id)
+
+
+def cache_user(user: dict):
+    user_cache.set(user["id"], user)
+
+
+def invalidate_user(user_id: int):
+    user_cache.pop(user_id)
 
 
 async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(security)) -> dict | None:
@@ -80,7 +226,8 @@ async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(securit
     if not creds:
         return None
     try:
-        return decode_jwt(creds.credentials)
+        with timed_phase("auth"):
+            return decode_jwt(creds.credentials)
     except HTTPException:
         return None
 
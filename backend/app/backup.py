@@ -0,0 +1,330 @@
+"""ES117 Backend — Online Backups
+
+All of the service's state is one SQLite file. Backups copy it with
+SQLite's online backup API on a worker thread, BACKUP_STEP_PAGES pages
+per step with a short pause in between, so requests never wait on it.
+The source connection holds a single read transaction for the whole
+copy: in WAL mode that never blocks writers, and it pins the snapshot.
+(A plain stepped backup starts over whenever another connection writes,
+so during a vote storm it would never finish.) The worker thread runs
+at BACKUP_NICE lower priority, since on a one-core host gzip otherwise
+competes with the event loop.
+
+Each copy is integrity-checked, gzip-compressed and stored as
+es117-<UTC time>.db.gz beside a sha256sum-style .sha256 file; only the
+newest BACKUP_KEEP are kept. With BACKUP_INTERVAL_HOURS set, the leader
+worker takes one whenever the newest is older than that.
+
+Restoring replaces the database file, so stop the server first. The file
+it replaces is kept as <db>.pre-restore-<time>.
+
+Usage:
+    python -m app.backup --backup
+    python -m app.backup --list
+    python -m app.backup --verify                          # check every checksum
+    python -m app.backup --restore latest
+    python -m app.backup --restore --at "2026-10-17 09:00"   # newest taken at or before (UTC)
+    python -m app.backup --restore es117-20261017T090000Z.db.gz --to /tmp/copy.db
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import (
+    BACKUP_DIR, BACKUP_GZIP_LEVEL, BACKUP_INTERVAL_HOURS, BACKUP_KEEP, BACKUP_NICE, BACKUP_STEP_PAGES,
+    BACKUP_STEP_SLEEP_MS, DB_PATH,
+)
+
+PREFIX, SUFFIX = "es117-", ".db.gz"
+TIME_FORMAT = "%Y%m%dT%H%M%SZ"
+# Retry a failed scheduled backup after this long
+RETRY_SECONDS = 300
+
+
+class BackupError(Exception):
+    """A backup or restore was refused: bad checksum, failed integrity check, no such file."""
+
+
+class _Stopped(Exception):
+    pass
+
+
+def backup_time(path: Path) -> datetime | None:
+    """When a backup file was taken (from its name), or None if it isn't one."""
+    name = path.name
+    if not (name.startswith(PREFIX) and name.endswith(SUFFIX)):
+        return None
+    try:
+        return datetime.strptime(name[len(PREFIX):-len(SUFFIX)], TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def list_backups(directory: Path = BACKUP_DIR) -> list[Path]:
+    """Backup files, oldest first."""
+    if not directory.is_dir():
+        return []
+    return sorted((p for p in directory.iterdir() if backup_time(p)), key=backup_time)
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _checksum_path(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+def verify(path: Path) -> bool:
+    """True if the file matches its recorded checksum."""
+    try:
+        recorded = _checksum_path(path).read_text().split()[0]
+    except (FileNotFoundError, IndexError):
+        return False
+    return recorded == sha256_file(path)
+
+
+def _quick_check(path: Path):
+    con = sqlite3.connect(path)
+    try:
+        result = con.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        con.close()
+    if result != "ok":
+        raise BackupError(f"{path.name} failed its integrity check: {result}")
+
+
+def copy_database(source: Path, target: Path, pages: int = BACKUP_STEP_PAGES,
+                  sleep: float = BACKUP_STEP_SLEEP_MS / 1000, stopping=None) -> dict:
+    """Copy a live database to `target` in steps, from one consistent snapshot. Returns step stats."""
+    src = sqlite3.connect(source, isolation_level=None)
+    dst = sqlite3.connect(target)
+    steps = 0
+
+    def progress(status, remaining, total):
+        nonlocal steps
+        steps += 1
+        if stopping is not None and stopping():
+            raise _Stopped()
+
+    try:
+        # Pin one snapshot: steps then never see (or restart for) other connections' writes
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=max(1, pages), progress=progress, sleep=sleep)
+        src.execute("COMMIT")
+        page_count = dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    return {"steps": steps, "pages": page_count}
+
+
+def _lower_priority():
+    # On Linux the nice value is per thread, and this thread only ever runs backups
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), os.getpriority(os.PRIO_PROCESS, 0) + BACKUP_NICE)
+    except (AttributeError, OSError):
+        pass
+
+
+class BackupManager:
+    """Takes, rotates and schedules compressed online backups."""
+
+    def __init__(self, directory: Path = BACKUP_DIR, interval_hours: float = BACKUP_INTERVAL_HOURS,
+                 keep: int = BACKUP_KEEP, db_path: Path = DB_PATH):
+        self.directory = directory
+        self.interval = interval_hours * 3600
+        self.keep = max(1, keep)
+        self.db_path = db_path
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._stopping = False
+        self._stats = {"backups": 0, "failures": 0, "rotated": 0, "last_seconds": 0.0, "last_steps": 0,
+                       "last_db_bytes": 0, "last_bytes": 0, "last_backup": ""}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running or self.interval <= 0:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        # A copy in progress notices at its next step and cleans up
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _run(self):
+        while True:
+            newest = list_backups(self.directory)[-1:]
+            due = backup_time(newest[0]).timestamp() + self.interval if newest else 0
+            await asyncio.sleep(max(0.0, due - time.time()))
+            try:
+                await self.backup()
+            except Exception as exc:
+                self._stats["failures"] += 1
+                print(f"⚠️  Backup failed: {exc}")
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def backup(self) -> Path:
+        """Take a backup now (one at a time). Returns the new file."""
+        async with self._lock:
+            started = time.perf_counter()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(1, "es117-backup", initializer=_lower_priority)
+            path, info = await asyncio.get_running_loop().run_in_executor(self._executor, self._backup)
+            self._stats["backups"] += 1
+            self._stats["last_seconds"] = round(time.perf_counter() - started, 3)
+            self._stats["last_steps"] = info["steps"]
+            self._stats["last_db_bytes"] = info["db_bytes"]
+            self._stats["last_bytes"] = path.stat().st_size
+            self._stats["last_backup"] = path.name
+            return path
+
+    def _backup(self) -> tuple[Path, dict]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        now = datetime.now(timezone.utc)
+        path = self.directory / f"{PREFIX}{now.strftime(TIME_FORMAT)}{SUFFIX}"
+        raw = path.with_name(f".{path.name}.db")
+        packed = path.with_name(f".{path.name}.tmp")
+        try:
+            info = copy_database(self.db_path, raw, stopping=lambda: self._stopping)
+            _quick_check(raw)
+            info["db_bytes"] = raw.stat().st_size
+            with open(raw, "rb") as src, gzip.GzipFile(packed, "wb", compresslevel=BACKUP_GZIP_LEVEL, mtime=0) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            digest = sha256_file(packed)
+            with open(packed, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(packed, path)
+            _checksum_path(path).write_text(f"{digest}  {path.name}\n")
+        finally:
+            raw.unlink(missing_ok=True)
+            packed.unlink(missing_ok=True)
+        self._rotate()
+        return path, info
+
+    def _rotate(self):
+        for old in list_backups(self.directory)[:-self.keep]:
+            old.unlink(missing_ok=True)
+            _checksum_path(old).unlink(missing_ok=True)
+            self._stats["rotated"] += 1
+
+    def stats(self) -> dict:
+        return {"scheduled": self.running, "interval_hours": self.interval / 3600, "keep": self.keep,
+                "on_disk": len(list_backups(self.directory)), **self._stats}
+
+
+backup_manager = BackupManager()
+
+
+def pick_backup(name: str | None, at: datetime | None, directory: Path = BACKUP_DIR) -> Path:
+    """The named backup, the newest taken at or before `at`, or (for "latest") the newest."""
+    backups = list_backups(directory)
+    if at is not None:
+        backups = [p for p in backups if backup_time(p) <= at]
+    elif name and name != "latest":
+        path = Path(name) if os.sep in name else directory / name
+        if not path.is_file():
+            raise BackupError(f"No backup {path}")
+        return path
+    if not backups:
+        raise BackupError("No backup" + (f" taken at or before {at:%Y-%m-%d %H:%M:%S} UTC" if at else "s"))
+    return backups[-1]
+
+
+def restore(path: Path, target: Path = DB_PATH) -> Path | None:
+    """Verify a backup and put it in place of `target`. Returns where the replaced file was moved."""
+    if not verify(path):
+        raise BackupError(f"{path.name} doesn't match its checksum (or has none)")
+    staged = target.with_name(f".{target.name}.restore")
+    try:
+        with gzip.open(path, "rb") as src, open(staged, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+            dst.flush()
+            os.fsync(dst.fileno())
+        _quick_check(staged)
+        kept = None
+        if target.exists():
+            kept = target.with_name(f"{target.name}.pre-restore-{datetime.now(timezone.utc).strftime(TIME_FORMAT)}")
+            os.replace(target, kept)
+        # The old file's WAL must never be replayed onto the restored one
+        for suffix in ("-wal", "-shm"):
+            side = target.with_name(target.name + suffix)
+            if side.exists():
+                os.replace(side, kept.with_name(kept.name + suffix) if kept else side.with_name(side.name + ".old"))
+        os.replace(staged, target)
+    finally:
+        staged.unlink(missing_ok=True)
+    return kept
+
+
+async def _main(args) -> int:
+    if args.backup:
+        path = await BackupManager(keep=args.keep).backup()
+        print(f"✅ Backed up {DB_PATH} to {path} ({path.stat().st_size / 1e6:.1f} MB)")
+        return 0
+    if args.list or args.verify:
+        failed = 0
+        for path in list_backups():
+            status = ""
+            if args.verify:
+                ok = verify(path)
+                failed += not ok
+                status = "  ✅ ok" if ok else "  ❌ checksum mismatch"
+            print(f"{path.name}  {path.stat().st_size / 1e6:8.1f} MB{status}")
+        return 1 if failed else 0
+    at = datetime.fromisoformat(args.at).replace(tzinfo=timezone.utc) if args.at else None
+    try:
+        path = pick_backup(args.restore, at)
+        kept = restore(path, Path(args.to) if args.to else DB_PATH)
+    except BackupError as exc:
+        print(f"❌ {exc}")
+        return 1
+    print(f"✅ Restored {path.name} to {args.to or DB_PATH}" + (f" (previous file kept as {kept.name})" if kept else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up and restore the ES117 database")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--backup", action="store_true", help="Take a backup now")
+    action.add_argument("--list", action="store_true", help="List backups, oldest first")
+    action.add_argument("--verify", action="store_true", help="Check every backup against its checksum")
+    action.add_argument("--restore", nargs="?", const="latest", metavar="NAME",
+                        help="Restore a backup file (default: the newest; stop the server first)")
+    parser.add_argument("--at", help="With --restore: the newest backup taken at or before this UTC time")
+    parser.add_argument("--to", help="With --restore: write here instead of over the database")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="With --backup: backups to keep")
+    args = parser.parse_args()
+    if (args.at or args.to) and args.restore is None:
+        parser.error("--at and --to go with --restore")
+    raise SystemExit(asyncio.run(_main(args)))
@@ -0,0 +1,126 @@
+"""ES117 Backend — In-process Caches"""
+import json
+import time
+from collections import OrderedDict, defaultdict
+
+from fastapi import Response
+
+from app.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_MISSING = object()
+
+
+def dumps(obj) -> bytes:
+    """Serialize a response body the way FastAPI's JSONResponse does (with orjson when installed)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # ints over 64 bits, non-string keys, lone surrogates: let json decide
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(body: bytes, headers: dict | None = None, status_code: int = 200) -> Response:
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+class TTLCache:
+    """Bounded LRU map with per-entry expiry."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self._stats["misses"] += 1
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return default
+        self._data.move_to_end(key)
+        self._stats["hits"] += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "maxsize": self.maxsize, **self._stats}
+
+
+class ResponseCache:
+    """Pre-serialized response bodies, invalidated per namespace by generation counters.
+
+    Writers bump a namespace's generation instead of hunting down keys; an
+    entry stored under an older generation is treated as a miss. Readers
+    must read the generation *before* querying so a write that lands
+    mid-query is never masked.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL):
+        self._entries = TTLCache(maxsize, ttl)
+        self._generations: dict[str, int] = defaultdict(int)
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        # Set by the change feed in multi-worker mode so other workers invalidate too
+        self.relay = None
+
+    def generation(self, namespace: str) -> int:
+        return self._generations[namespace]
+
+    def get(self, namespace: str, key):
+        entry = self._entries.get((namespace, key))
+        if entry is None or entry[0] != self._generations[namespace]:
+            if entry is not None:
+                self._entries.pop((namespace, key))
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return entry[1]
+
+    def put(self, namespace: str, key, value, generation: int):
+        if generation == self._generations[namespace]:
+            self._entries.set((namespace, key), (generation, value))
+
+    def invalidate(self, namespace: str, propagate: bool = True):
+        self._generations[namespace] += 1
+        self._stats["invalidations"] += 1
+        if propagate and self.relay is not None:
+            self.relay(namespace)
+
+    def stats(self) -> dict:
+        entries = self._entries.stats()
+        return {
+            "entries": entries["entries"],
+            "maxsize": entries["maxsize"],
+            "evictions": entries["evictions"],
+            "expirations": entries["expirations"],
+            **self._stats,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,168 @@
+"""ES117 Backend — Cross-worker Change Feed
+
+Each uvicorn worker has its own response cache, user cache and event hub.
+In multi-worker mode, cache invalidations and live events are appended to
+the change_log table and every worker polls it, so a write handled by one
+worker is seen by all of them:
+
+  cache  response-cache namespace to invalidate (skipped by the worker that wrote it)
+  user   user id to drop from the profile cache (likewise)
+  event  SSE event; every worker delivers it, under the change_log id
+
+Entries are queued in memory and written in one batch as soon as the
+feed task wakes up; other workers pick them up within one poll interval.
+The writing worker invalidates its own caches immediately, so a client
+always reads its own writes.
+"""
+import asyncio
+import os
+import time
+
+from app.auth import user_cache
+from app.cache import response_cache
+from app.config import CHANGE_FEED_INTERVAL_MS, CHANGE_LOG_KEEP
+from app.database import pool
+from app.events import hub
+
+POLL_BATCH = 1000
+PRUNE_EVERY_SECONDS = 60
+
+CURSOR_SQL = "SELECT COALESCE(MAX(id), 0) FROM change_log"
+APPEND_SQL = "INSERT INTO change_log (origin, kind, topic, data, queued_at) VALUES (?, ?, ?, ?, ?)"
+ENTRIES_SQL = "SELECT id, origin, kind, topic, data, queued_at FROM change_log WHERE id > ? ORDER BY id LIMIT ?"
+PRUNE_SQL = "DELETE FROM change_log WHERE id <= ?"
+
+
+class ChangeFeed:
+    """Writes local changes to change_log and applies everyone's changes from it."""
+
+    def __init__(self, interval_ms: float = CHANGE_FEED_INTERVAL_MS, keep: int = CHANGE_LOG_KEEP):
+        self.interval = interval_ms / 1000
+        self.keep = keep
+        self.origin = os.getpid()
+        self._pending: list[tuple[str, str, str | None, float]] = []
+        self._cursor = 0
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._last_prune = 0.0
+        self._stats = {
+            "written": 0,
+            "applied": 0,
+            "events_delivered": 0,
+            "errors": 0,
+            "lag_seconds_last": 0.0,
+            "lag_seconds_max": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def record(self, kind: str, topic, data: str | None = None):
+        """Queue a change for every worker (no-op when the feed is off)."""
+        if not self.running:
+            return
+        self._pending.append((kind, str(topic), data, time.time()))
+        self._wake.set()
+
+    async def start(self):
+        """Start from the current end of the log and route the hub and response cache through it."""
+        if self.running:
+            return
+        self.origin = os.getpid()
+        async with pool.reader() as db:
+            row = await db.execute(CURSOR_SQL)
+            self._cursor = (await row.fetchone())[0]
+        hub.resume_from(self._cursor)
+        hub.relay = lambda event, payload: self.record("event", event, payload)
+        response_cache.relay = lambda namespace: self.record("cache", namespace)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write whatever is still queued, then stop."""
+        if not self.running:
+            return
+        hub.relay = None
+        response_cache.relay = None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._flush()
+                await self._poll()
+                if time.monotonic() - self._last_prune > PRUNE_EVERY_SECONDS:
+                    await self._prune()
+            except Exception as exc:
+                self._stats["errors"] += 1
+                print(f"⚠️  Change feed: {exc}")
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            async with pool.writer() as db:
+                await db.executemany(APPEND_SQL, [(self.origin, *entry) for entry in batch])
+                await db.commit()
+        except BaseException:
+            self._pending[:0] = batch  # retry on the next tick, in order
+            raise
+        self._stats["written"] += len(batch)
+
+    async def _poll(self):
+        while True:
+            async with pool.reader() as db:
+                rows = await db.execute(ENTRIES_SQL, (self._cursor, POLL_BATCH))
+                batch = await rows.fetchall()
+            for entry in batch:
+                self._apply(*entry)
+            if len(batch) < POLL_BATCH:
+                return
+
+    def _apply(self, entry_id: int, origin: int, kind: str, topic: str, data: str | None, queued_at: float):
+        self._cursor = entry_id
+        self._stats["applied"] += 1
+        if kind == "event":
+            hub.deliver(entry_id, topic, data)
+            self._stats["events_delivered"] += 1
+        elif origin == self.origin:
+            return  # already applied locally when it was recorded
+        elif kind == "cache":
+            response_cache.invalidate(topic, propagate=False)
+        elif kind == "user":
+            user_cache.pop(int(topic))
+        lag = max(0.0, time.time() - queued_at)
+        self._stats["lag_seconds_last"] = lag
+        self._stats["lag_seconds_max"] = max(self._stats["lag_seconds_max"], lag)
+
+    async def _prune(self):
+        """Drop entries every worker has long since applied."""
+        self._last_prune = time.monotonic()
+        async with pool.writer() as db:
+            await db.execute(PRUNE_SQL, (self._cursor - self.keep,))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "origin": self.origin,
+            "cursor": self._cursor,
+            "pending": len(self._pending),
+            **self._stats,
+        }
+
+
+change_feed = ChangeFeed()
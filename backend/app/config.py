@@ -5,19 +5,183 @@ from pathlib import Path
 # Paths
 BACKEND_DIR = Path(__file__).parent.parent
 PROJECT_ROOT = BACKEND_DIR.parent
-DB_PATH = BACKEND_DIR / "es117.db"
+DB_PATH = Path(os.getenv("ES117_DB_PATH", BACKEND_DIR / "es117.db"))
+# Held while a worker brings the schema up to date; the others wait their turn
+DB_INIT_LOCK_PATH = Path(os.getenv("ES117_DB_INIT_LOCK", f"{DB_PATH}.init.lock"))
+# Held for life by the worker that runs backups and snapshot export; the
+# others retry every LEADER_RETRY_SECONDS and take over when it exits
+LEADER_LOCK_PATH = Path(os.getenv("ES117_LEADER_LOCK", f"{DB_PATH}.leader.lock"))
+LEADER_RETRY_SECONDS = float(os.getenv("ES117_LEADER_RETRY_SECONDS", "5"))
+
+# Database connection pool
+DB_READERS = int(os.getenv("ES117_DB_READERS", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("ES117_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("ES117_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("ES117_DB_CACHE_SIZE_KB", "16384"))
+
+# Online backups (python -m app.backup): gzip snapshots with sha256 checksums
+BACKUP_DIR = Path(os.getenv("ES117_BACKUP_DIR", DB_PATH.parent / "backups"))
+# The leader worker takes one whenever the newest is older than this (0 = only by hand)
+BACKUP_INTERVAL_HOURS = float(os.getenv("ES117_BACKUP_INTERVAL_HOURS", "6"))
+BACKUP_KEEP = int(os.getenv("ES117_BACKUP_KEEP", "14"))
+# Pages copied per backup step, and the pause between steps
+BACKUP_STEP_PAGES = int(os.getenv("ES117_BACKUP_STEP_PAGES", "256"))
+BACKUP_STEP_SLEEP_MS = float(os.getenv("ES117_BACKUP_STEP_SLEEP_MS", "2"))
+# gzip -1 costs about a fifth of the CPU of -6 for ~15% larger files
+BACKUP_GZIP_LEVEL = int(os.getenv("ES117_BACKUP_GZIP_LEVEL", "1"))
+# Added to the backup thread's nice value, so requests win the CPU (Linux)
+BACKUP_NICE = int(os.getenv("ES117_BACKUP_NICE", "10"))
+
+# Rebuild materialized poll tallies from poll_votes when a worker becomes leader
+RECONCILE_TALLIES_ON_STARTUP = os.getenv("ES117_RECONCILE_TALLIES", "1") == "1"
 
 # Server
 API_PORT = int(os.getenv("ES117_PORT", "8000"))
+# uvicorn worker processes (run.sh passes this to --workers)
+WORKERS = max(1, int(os.getenv("ES117_WORKERS", "1")))
 ALLOWED_ORIGINS = os.getenv("ES117_ORIGINS", "https://amanpatni211.github.io,http://localhost:3000,http://127.0.0.1:3000").split(",")
 
+# Write-behind vote ingestion (group commit)
+VOTE_QUEUE_ENABLED = os.getenv("ES117_VOTE_QUEUE", "1") == "1"
+VOTE_BATCH_MAX = int(os.getenv("ES117_VOTE_BATCH_MAX", "500"))
+VOTE_BATCH_LATENCY_MS = float(os.getenv("ES117_VOTE_BATCH_LATENCY_MS", "5"))
+
+# Polls per POST /api/polls/bulk
+POLL_BULK_MAX = int(os.getenv("ES117_POLL_BULK_MAX", "500"))
+
+# Closed polls: delete the vote rows of polls closed this long ago (0 = keep them)
+POLL_COMPACT_AFTER_HOURS = float(os.getenv("ES117_POLL_COMPACT_AFTER_HOURS", "0"))
+POLL_COMPACT_INTERVAL_SECONDS = float(os.getenv("ES117_POLL_COMPACT_INTERVAL_SECONDS", "3600"))
+POLL_COMPACT_BATCH = int(os.getenv("ES117_POLL_COMPACT_BATCH", "5000"))
+
+# Write rate limits: token buckets per user and action, plus one per client IP
+# shared by all writes (generous: a campus NAT puts many students behind one IP)
+RATE_LIMIT_ENABLED = os.getenv("ES117_RATE_LIMIT", "1") == "1"
+SHOUTOUT_RATE_PER_MIN = float(os.getenv("ES117_SHOUTOUT_RATE_PER_MIN", "6"))
+SHOUTOUT_BURST = int(os.getenv("ES117_SHOUTOUT_BURST", "3"))
+VOTE_RATE_PER_MIN = float(os.getenv("ES117_VOTE_RATE_PER_MIN", "30"))
+VOTE_BURST = int(os.getenv("ES117_VOTE_BURST", "10"))
+IP_WRITE_RATE_PER_MIN = float(os.getenv("ES117_IP_WRITE_RATE_PER_MIN", "600"))
+IP_WRITE_BURST = int(os.getenv("ES117_IP_WRITE_BURST", "300"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("ES117_RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SWEEP_SECONDS = float(os.getenv("ES117_RATE_LIMIT_SWEEP_SECONDS", "60"))
+# Peers whose CF-Connecting-IP / X-Forwarded-For is believed (the Cloudflare tunnel runs locally)
+TRUSTED_PROXIES = set(os.getenv("ES117_TRUSTED_PROXIES", "127.0.0.1,::1").split(","))
+
+# Write admission control: shed writes (503) while the writer queue delay stays above target
+ADMISSION_ENABLED = os.getenv("ES117_ADMISSION", "1") == "1"
+ADMISSION_TARGET_MS = float(os.getenv("ES117_ADMISSION_TARGET_MS", "100"))
+ADMISSION_INTERVAL_MS = float(os.getenv("ES117_ADMISSION_INTERVAL_MS", "500"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ES117_ADMISSION_RETRY_AFTER", "2"))
+
+# Shoutout wall pagination
+SHOUTOUTS_PAGE_DEFAULT = int(os.getenv("ES117_SHOUTOUTS_PAGE_DEFAULT", "100"))
+SHOUTOUTS_PAGE_MAX = int(os.getenv("ES117_SHOUTOUTS_PAGE_MAX", "500"))
+# Rows per read (and per write to the socket) for /api/shoutouts/ndjson
+SHOUTOUTS_STREAM_CHUNK = int(os.getenv("ES117_SHOUTOUTS_STREAM_CHUNK", "500"))
+
+# Response cache for hot public reads
+RESPONSE_CACHE_TTL = float(os.getenv("ES117_RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("ES117_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+
+# Live event stream (SSE)
+EVENT_HISTORY = int(os.getenv("ES117_EVENT_HISTORY", "1000"))
+EVENT_QUEUE_SIZE = int(os.getenv("ES117_EVENT_QUEUE_SIZE", "256"))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("ES117_STREAM_HEARTBEAT", "15"))
+STREAM_MAX_CLIENTS = int(os.getenv("ES117_STREAM_MAX_CLIENTS", "2000"))
+
+# Cross-worker change feed: cache invalidations and live events go through
+# the change_log table so every worker sees them (on by default with >1 worker)
+CHANGE_FEED_ENABLED = os.getenv("ES117_CHANGE_FEED", "1" if WORKERS > 1 else "0") == "1"
+CHANGE_FEED_INTERVAL_MS = float(os.getenv("ES117_CHANGE_FEED_INTERVAL_MS", "50"))
+CHANGE_LOG_KEEP = int(os.getenv("ES117_CHANGE_LOG_KEEP", "10000"))
+
+# Team photos
+PHOTO_DIR = Path(os.getenv("ES117_PHOTO_DIR", BACKEND_DIR / "photos"))
+PHOTO_MAX_BYTES = int(os.getenv("ES117_PHOTO_MAX_BYTES", str(1024 * 1024)))
+PHOTO_WORKERS = int(os.getenv("ES117_PHOTO_WORKERS", "2"))
+PHOTO_THUMB_PX = int(os.getenv("ES117_PHOTO_THUMB_PX", "480"))
+PHOTO_WEB_PX = int(os.getenv("ES117_PHOTO_WEB_PX", "1600"))
+PHOTOS_PAGE_DEFAULT = int(os.getenv("ES117_PHOTOS_PAGE_DEFAULT", "60"))
+PHOTOS_PAGE_MAX = int(os.getenv("ES117_PHOTOS_PAGE_MAX", "200"))
+
+# Static site data served from memory (data/*.json, site-config.json)
+DATA_DIR = Path(os.getenv("ES117_DATA_DIR", PROJECT_ROOT / "data"))
+SITE_CONFIG_PATH = Path(os.getenv("ES117_SITE_CONFIG", PROJECT_ROOT / "site-config.json"))
+STATIC_WATCH_SECONDS = float(os.getenv("ES117_STATIC_WATCH_SECONDS", "2"))
+# site-config.json carries the maintenance kill switch, so browsers may only reuse it briefly
+SITE_CONFIG_MAX_AGE = int(os.getenv("ES117_SITE_CONFIG_MAX_AGE", "15"))
+
+# Team directory (/api/teams)
+TEAMS_PAGE_DEFAULT = int(os.getenv("ES117_TEAMS_PAGE_DEFAULT", "50"))
+TEAMS_PAGE_MAX = int(os.getenv("ES117_TEAMS_PAGE_MAX", "200"))
+
+# Static snapshot export: live shoutouts and closed polls written into the data
+# files the static site falls back to (off by default: it overwrites data/)
+EXPORT_ENABLED = os.getenv("ES117_EXPORT", "0") == "1"
+EXPORT_DIR = Path(os.getenv("ES117_EXPORT_DIR", DATA_DIR))
+# Export once writes have been quiet this long, but never later than the max delay
+EXPORT_DEBOUNCE_SECONDS = float(os.getenv("ES117_EXPORT_DEBOUNCE_SECONDS", "5"))
+EXPORT_MAX_DELAY_SECONDS = float(os.getenv("ES117_EXPORT_MAX_DELAY_SECONDS", "60"))
+EXPORT_SHOUTOUTS_MAX = int(os.getenv("ES117_EXPORT_SHOUTOUTS_MAX", "500"))
+EXPORT_POLLS_MAX = int(os.getenv("ES117_EXPORT_POLLS_MAX", "200"))
+# Shell command run from the project root after files change (e.g. commit and push them to Pages)
+EXPORT_PUBLISH_CMD = os.getenv("ES117_EXPORT_PUBLISH_CMD", "")
+
+# Full-text search (/api/search)
+SEARCH_PAGE_DEFAULT = int(os.getenv("ES117_SEARCH_PAGE_DEFAULT", "20"))
+SEARCH_PAGE_MAX = int(os.getenv("ES117_SEARCH_PAGE_MAX", "50"))
+SEARCH_MAX_OFFSET = int(os.getenv("ES117_SEARCH_MAX_OFFSET", "1000"))
+# Shoutout matches are BM25-ranked among the newest this many (ranking costs ~2 µs per match)
+SEARCH_RANK_WINDOW = int(os.getenv("ES117_SEARCH_RANK_WINDOW", "5000"))
+
+# Activity rollups (/api/analytics)
+# Minute buckets older than this are merged into hourly ones
+ANALYTICS_MINUTE_RETENTION_HOURS = float(os.getenv("ES117_ANALYTICS_MINUTE_RETENTION_HOURS", "48"))
+ANALYTICS_COMPACT_INTERVAL_SECONDS = float(os.getenv("ES117_ANALYTICS_COMPACT_INTERVAL_SECONDS", "900"))
+# Who was active on which day is kept this long; the daily unique counts are kept for good
+ANALYTICS_ACTIVE_USERS_RETENTION_DAYS = int(os.getenv("ES117_ANALYTICS_ACTIVE_USERS_RETENTION_DAYS", "35"))
+# Days start at local midnight: minutes east of UTC (IST by default)
+ANALYTICS_DAY_OFFSET_MINUTES = int(os.getenv("ES117_ANALYTICS_DAY_OFFSET_MINUTES", "330"))
+ANALYTICS_MAX_POINTS = int(os.getenv("ES117_ANALYTICS_MAX_POINTS", "2880"))
+
+# Instrumentation (/metrics, Server-Timing)
+SLOW_QUERY_MS = float(os.getenv("ES117_SLOW_QUERY_MS", "50"))
+METRICS_MAX_STATEMENTS = int(os.getenv("ES117_METRICS_MAX_STATEMENTS", "200"))
+# /metrics and /health/details answer this machine (no forwarded client), or
+# a caller sending "Authorization: Bearer <token>" when a token is set
+OPS_TOKEN = os.getenv("ES117_OPS_TOKEN", "")
+# EXPLAIN QUERY PLAN check: full scans are only flagged on tables at least this big
+QUERY_PLAN_MIN_ROWS = int(os.getenv("ES117_QUERY_PLAN_MIN_ROWS", "1000"))
+# Opt-in sampling profiler: folded stacks of slow requests for flamegraph.pl / speedscope
+PROFILE_ENABLED = os.getenv("ES117_PROFILE", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("ES117_PROFILE_INTERVAL_MS", "5"))
+PROFILE_SLOW_MS = float(os.getenv("ES117_PROFILE_SLOW_MS", "250"))
+PROFILE_DIR = Path(os.getenv("ES117_PROFILE_DIR", BACKEND_DIR / "profiles"))
+
 # Auth
 GOOGLE_CLIENT_ID = os.getenv("ES117_GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET = os.getenv("ES117_GOOGLE_CLIENT_SECRET", "")
 GOOGLE_REDIRECT_URI = os.getenv("ES117_GOOGLE_REDIRECT_URI", f"http://localhost:{API_PORT}/api/auth/callback")
+GOOGLE_TOKEN_URL = os.getenv("ES117_GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token")
+GOOGLE_USERINFO_URL = os.getenv("ES117_GOOGLE_USERINFO_URL", "https://www.googleapis.com/oauth2/v2/userinfo")
+GOOGLE_CERTS_URL = os.getenv("ES117_GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v3/certs")
 JWT_SECRET = os.getenv("ES117_JWT_SECRET", "change-me-in-production-please")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_HOURS = 72
 
+# Verified-JWT and user-profile caches
+TOKEN_CACHE_SIZE = int(os.getenv("ES117_TOKEN_CACHE_SIZE", "4096"))
+USER_CACHE_SIZE = int(os.getenv("ES117_USER_CACHE_SIZE", "2048"))
+USER_CACHE_TTL = float(os.getenv("ES117_USER_CACHE_TTL", "300"))
+
+# Outbound OAuth HTTP client
+OAUTH_TIMEOUT_SECONDS = float(os.getenv("ES117_OAUTH_TIMEOUT", "10"))
+OAUTH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("ES117_OAUTH_CONNECT_TIMEOUT", "5"))
+OAUTH_RETRIES = int(os.getenv("ES117_OAUTH_RETRIES", "2"))
+OAUTH_BACKOFF_SECONDS = float(os.getenv("ES117_OAUTH_BACKOFF", "0.2"))
+# Verify Google's id_token locally (cached signing keys) and skip the userinfo call
+OAUTH_VERIFY_ID_TOKEN = os.getenv("ES117_OAUTH_VERIFY_ID_TOKEN", "1") == "1"
+
 # Allowed email domain
 ALLOWED_DOMAIN = "iitgn.ac.in"
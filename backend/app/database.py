@@ -1,57 +1,373 @@
 """ES117 Backend — SQLite Database"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, single worker only
+    fcntl = None
+
 import aiosqlite
-from app.config import DB_PATH
+from fastapi import Request
+
+from app.config import (
+    DB_PATH, DB_INIT_LOCK_PATH, DB_READERS, DB_BUSY_TIMEOUT_MS, DB_MMAP_SIZE, DB_CACHE_SIZE_KB,
+    LEADER_LOCK_PATH, LEADER_RETRY_SECONDS, WORKERS,
+)
+from app.metrics import charge, metrics, request_phases
+from app.migrations import migrate
+from app.ratelimit import admission
+
+# Methods served from a reader connection; everything else gets the writer.
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _record(sql: str, started: float):
+    """Charge an awaited statement to the current request and to its SQL metrics."""
+    elapsed = time.perf_counter() - started
+    charge("db", elapsed)
+    metrics.observe_statement(sql, elapsed)
+
+
+class TimedCursor:
+    """aiosqlite cursor proxy that charges fetch time to the statement that produced it."""
+    __slots__ = ("_cursor", "_sql")
+
+    def __init__(self, cursor: aiosqlite.Cursor, sql: str):
+        self._cursor = cursor
+        self._sql = sql
+
+    async def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return await self._cursor.fetchone()
+        finally:
+            _record(self._sql, started)
+
+    async def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return await self._cursor.fetchall()
+        finally:
+            _record(self._sql, started)
+
+    async def fetchmany(self, size: int | None = None):
+        started = time.perf_counter()
+        try:
+            return await (self._cursor.fetchmany(size) if size else self._cursor.fetchmany())
+        finally:
+            _record(self._sql, started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    """aiosqlite connection proxy that times every statement.
+
+    Time is measured around each await, so it includes the hop to
+    aiosqlite's worker thread as well as SQLite itself. It is charged to
+    the current request's "db" phase and to per-statement SQL metrics.
+    """
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self._conn = conn
+
+    async def execute(self, sql: str, parameters=None) -> TimedCursor:
+        started = time.perf_counter()
+        try:
+            return TimedCursor(await self._conn.execute(sql, parameters), sql)
+        finally:
+            _record(sql, started)
+
+    async def executemany(self, sql: str, parameters) -> TimedCursor:
+        started = time.perf_counter()
+        try:
+            return TimedCursor(await self._conn.executemany(sql, parameters), sql)
+        finally:
+            _record(sql, started)
+
+    async def commit(self):
+        started = time.perf_counter()
+        try:
+            await self._conn.commit()
+        finally:
+            _record("COMMIT", started)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+async def _connect(readonly: bool = False) -> TimedConnection:
+    """Open a connection and apply the per-connection pragmas once."""
+    db = await aiosqlite.connect(DB_PATH)
+    db.row_factory = aiosqlite.Row
+    await db.executescript(f"""
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS};
+        PRAGMA mmap_size = {DB_MMAP_SIZE};
+        PRAGMA cache_size = -{DB_CACHE_SIZE_KB};
+        PRAGMA temp_store = MEMORY;
+        PRAGMA query_only = {1 if readonly else 0};
+    """)
+    return TimedConnection(db)
+
+
+async def _release(db: TimedConnection):
+    """Return a connection to a clean state before it goes back to the pool."""
+    if db.in_transaction:
+        await db.rollback()
+
+
+class ConnectionPool:
+    """Bounded set of reader connections plus one serialized writer connection.
+
+    SQLite in WAL mode allows many concurrent readers but only one writer, so
+    writes are funnelled through a single connection guarded by a lock instead
+    of letting requests fight over the database lock.
+
+    With several worker processes each has its own writer, so a checkout
+    starts with BEGIN IMMEDIATE: the database write lock is taken up front
+    (waiting up to busy_timeout for other workers) and read-then-write code
+    such as apply_votes never works from a stale snapshot.
+    """
+
+    def __init__(self, readers: int = DB_READERS, immediate: bool = WORKERS > 1):
+        self.size = max(1, readers)
+        self.immediate = immediate
+        self._readers: asyncio.Queue | None = None
+        self._writer: TimedConnection | None = None
+        self._write_lock = asyncio.Lock()
+        self._stats = {
+            "reader_checkouts": 0,
+            "writer_checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "readers_in_use": 0,
+            "writer_in_use": 0,
+            "writer_waiting": 0,
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def open(self):
+        """Open the writer and all reader connections."""
+        if self.is_open:
+            return
+        self._writer = await _connect()
+        self._readers = asyncio.Queue(maxsize=self.size)
+        for _ in range(self.size):
+            self._readers.put_nowait(await _connect(readonly=True))
+
+    async def close(self):
+        """Close every pooled connection."""
+        if not self.is_open:
+            return
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
+        await self._writer.close()
+        self._writer = None
+        self._readers = None
+
+    def _record_wait(self, started: float):
+        waited = time.perf_counter() - started
+        charge("pool_wait", waited)
+        if waited > 0.001:
+            self._stats["waits"] += 1
+        self._stats["wait_seconds_total"] += waited
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+
+    @asynccontextmanager
+    async def reader(self):
+        """Check out a read-only connection."""
+        if not self.is_open:
+            # No pool (scripts, one-off tools) — fall back to a private connection
+            db = await _connect(readonly=True)
+            try:
+                yield db
+            finally:
+                await db.close()
+            return
+
+        readers = self._readers
+        started = time.perf_counter()
+        db = await readers.get()
+        self._record_wait(started)
+        self._stats["reader_checkouts"] += 1
+        self._stats["readers_in_use"] += 1
+        try:
+            yield db
+        finally:
+            self._stats["readers_in_use"] -= 1
+            await _release(db)
+            readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self, queued_since: float | None = None):
+        """Check out the writer connection (one holder at a time).
+
+        `queued_since` is when the work first queued (perf_counter), for
+        callers like the vote writer that batch before asking for the lock.
+        """
+        if not self.is_open:
+            db = await _connect()
+            try:
+                yield db
+            finally:
+                await _release(db)
+                await db.close()
+            return
+
+        started = time.perf_counter()
+        self._stats["writer_waiting"] += 1
+        async with self._write_lock:
+            self._stats["writer_waiting"] -= 1
+            self._record_wait(started)
+            self._stats["writer_checkouts"] += 1
+            self._stats["writer_in_use"] = 1
+            try:
+                if self.immediate:
+                    await self._writer.execute("BEGIN IMMEDIATE")
+                # Write-queue delay of requests (not background jobs) drives admission control
+                if queued_since is not None:
+                    admission.observe(time.perf_counter() - queued_since)
+                elif request_phases.get() is not None:
+                    admission.observe(time.perf_counter() - started)
+                yield self._writer
+            finally:
+                self._stats["writer_in_use"] = 0
+                await _release(self._writer)
+
+    def stats(self) -> dict:
+        """Pool-wait and checkout metrics."""
+        return {
+            "readers": self.size,
+            "readers_idle": self._readers.qsize() if self._readers else 0,
+            **self._stats,
+        }
+
+
+pool = ConnectionPool()
+
+
+async def get_db(request: Request):
+    """Yield a pooled connection: a reader for safe methods, the writer otherwise."""
+    if request.method in READ_METHODS:
+        async with pool.reader() as db:
+            yield db
+    else:
+        async with pool.writer() as db:
+            yield db
+
+
+@asynccontextmanager
+async def startup_lock(path=DB_INIT_LOCK_PATH):
+    """Hold an exclusive file lock so workers bring the schema up to date one at a time.
+
+    The first one through applies any pending migrations; the rest find
+    none left, so every worker (including ones restarted later) can run it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            await asyncio.to_thread(fcntl.flock, f.fileno(), fcntl.LOCK_EX)
+        yield
+    # Closing the file releases the lock
+
+
+class LeaderLock:
+    """Elects the one worker that runs the singleton background jobs.
+
+    Every worker keeps the lock file open and tries a non-blocking flock
+    every `retry` seconds until it gets it; the leader then holds it for
+    its whole life. The kernel releases the lock however the leader exits,
+    so a surviving worker, or the leader's replacement, takes over.
+    """
+
+    def __init__(self, path: Path = LEADER_LOCK_PATH, retry: float = LEADER_RETRY_SECONDS):
+        self.path = path
+        self.retry = retry
+        self.is_leader = False
+        self._file = None
+        self._task: asyncio.Task | None = None
+        self._on_elected = None
+        self._stats = {"elections": 0, "elected_at": ""}
+
+    def _try_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    async def start(self, on_elected) -> bool:
+        """Stand for leader; `on_elected()` is awaited if and when this worker wins.
+
+        Returns True if it won straight away.
+        """
+        if self._file is not None:
+            return self.is_leader
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a+")
+        self._on_elected = on_elected
+        if self._try_lock():
+            await self._elected()
+        else:
+            self._task = asyncio.create_task(self._campaign())
+        return self.is_leader
+
+    async def _campaign(self):
+        while not self._try_lock():
+            await asyncio.sleep(self.retry)
+        await self._elected()
+
+    async def _elected(self):
+        self.is_leader = True
+        self._stats["elections"] += 1
+        self._stats["elected_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        # For whoever looks at the lock file: the leader's pid
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(os.getpid()))
+        self._file.flush()
+        try:
+            await self._on_elected()
+        except Exception as exc:
+            print(f"⚠️  Leader jobs failed to start: {exc}")
+
+    async def stop(self):
+        """Leave the election; a leader releases the lock (stop its jobs first)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.is_leader = False
+
+    def stats(self) -> dict:
+        return {"leader": self.is_leader, **self._stats}
+
+
+leader = LeaderLock()
 
-async def get_db():
-    """Yield an aiosqlite connection for dependency injection."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        yield db
 
-async def init_db():
-    """Create tables if they don't exist."""
+async def init_db() -> list[str]:
+    """Bring the schema up to date. Returns the migrations applied."""
     async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                picture TEXT DEFAULT '',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS shoutouts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message TEXT NOT NULL,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-
-            CREATE TABLE IF NOT EXISTS polls (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            CREATE TABLE IF NOT EXISTS poll_options (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                poll_id INTEGER NOT NULL,
-                text TEXT NOT NULL,
-                FOREIGN KEY (poll_id) REFERENCES polls(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS poll_votes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                poll_id INTEGER NOT NULL,
-                option_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(poll_id, user_id),
-                FOREIGN KEY (poll_id) REFERENCES polls(id) ON DELETE CASCADE,
-                FOREIGN KEY (option_id) REFERENCES poll_options(id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-        """)
-        await db.commit()
+        await db.execute("PRAGMA journal_mode = WAL")
+        return await migrate(db)
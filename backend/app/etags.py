@@ -0,0 +1,17 @@
+"""ES117 Backend — ETag / Conditional GET helpers"""
+from fastapi import Request, Response
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str = "no-cache") -> Response:
+    """An empty 304 carrying the validator headers."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
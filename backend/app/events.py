@@ -0,0 +1,112 @@
+"""ES117 Backend — In-process Live Event Hub
+
+Write handlers publish small incremental events (new shoutout, tally
+deltas, poll created/closed); every connected /api/stream client gets a
+bounded queue. Clients that fall behind are dropped and reconnect with
+Last-Event-ID, which is replayed from a ring buffer of recent events.
+
+With several workers, publish() hands events to the change feed instead;
+it stores them in change_log and every worker (this one included)
+delivers them under the change_log id, so ids agree across workers and a
+client can resume on any of them.
+"""
+import asyncio
+import json
+from collections import deque
+
+from app.config import EVENT_HISTORY, EVENT_QUEUE_SIZE
+
+
+class Subscriber:
+    """One connected stream client."""
+    __slots__ = ("queue",)
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+
+class EventHub:
+    """Async pub/sub fan-out with per-client bounded queues."""
+
+    def __init__(self, history: int = EVENT_HISTORY, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._last_id = 0
+        # Highest id no longer replayable (evicted from history, or from before start)
+        self._horizon = 0
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: set[Subscriber] = set()
+        self._stats = {"published": 0, "dropped_clients": 0}
+        # Set by the change feed in multi-worker mode
+        self.relay = None
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def resume_from(self, event_id: int):
+        """Continue numbering after `event_id`; earlier ids can only be answered with a reset."""
+        self._last_id = self._horizon = event_id
+        self._history.clear()
+
+    def publish(self, event: str, data) -> int | None:
+        """Fan an event out to every subscriber. Returns the event id (None when relayed)."""
+        payload = json.dumps(data, separators=(",", ":"))
+        if self.relay is not None:
+            self.relay(event, payload)
+            return None
+        return self.deliver(self._last_id + 1, event, payload)
+
+    def deliver(self, event_id: int, event: str, payload: str) -> int:
+        """Record an event under `event_id` and queue it for every subscriber."""
+        self._last_id = event_id
+        item = (event_id, event, payload)
+        if len(self._history) == self._history.maxlen:
+            self._horizon = self._history[0][0]
+        self._history.append(item)
+        self._stats["published"] += 1
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Slow consumer — cut it loose; it will resume via Last-Event-ID
+                self._disconnect(sub)
+                self._stats["dropped_clients"] += 1
+        return event_id
+
+    def subscribe(self, last_event_id: int | None = None) -> tuple[Subscriber, list | None]:
+        """Register a client. Returns it with the events it missed, or None if they are gone."""
+        sub = Subscriber(self.queue_size)
+        self._subscribers.add(sub)
+        if last_event_id is None:
+            return sub, []
+        if last_event_id > self._last_id:
+            return sub, None  # id from before a restart
+        if last_event_id < self._horizon:
+            return sub, None  # fell out of the ring buffer
+        return sub, [item for item in self._history if item[0] > last_event_id]
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subscribers.discard(sub)
+
+    def _disconnect(self, sub: Subscriber):
+        """Drop a subscriber and wake its stream so it can close."""
+        self._subscribers.discard(sub)
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+
+    def close(self):
+        """End every open stream (app shutdown)."""
+        for sub in list(self._subscribers):
+            self._disconnect(sub)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._subscribers),
+            "last_event_id": self._last_id,
+            "history": len(self._history),
+            **self._stats,
+        }
+
+
+hub = EventHub()
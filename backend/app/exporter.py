@@ -0,0 +1,223 @@
+"""ES117 Backend — Static Snapshot Export
+
+GitHub Pages serves data/*.json from its CDN, and js/app.js falls back to
+those files when the backend is unreachable. The exporter keeps two of
+them in step with the database, so most reads never reach the backend:
+
+  shoutouts.json     the newest EXPORT_SHOUTOUTS_MAX shoutouts in the file's
+                     {message, timestamp} shape, plus id and author_name
+                     (the wall then asks the API only for newer ones)
+  polls-closed.json  closed polls with their final results, exactly as
+                     /api/polls/closed returns them
+
+It listens on the event hub like a stream client. A write marks the
+snapshot dirty; the export runs once writes have been quiet for
+EXPORT_DEBOUNCE_SECONDS, and at most EXPORT_MAX_DELAY_SECONDS after the
+first one. Files are minified, written to a temp file and renamed into
+place, and only when their bytes change; EXPORT_PUBLISH_CMD then runs
+(e.g. to commit and push them). shoutouts.json is left alone while the
+database has no shoutouts, so the hand-written file is never emptied;
+--import-static copies its entries into the database first.
+
+Usage:
+    python -m app.exporter                   # export once now
+    python -m app.exporter --import-static   # adopt hand-written shoutouts.json entries, then export
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+from app.cache import dumps
+from app.config import (
+    EXPORT_DEBOUNCE_SECONDS, EXPORT_DIR, EXPORT_MAX_DELAY_SECONDS, EXPORT_POLLS_MAX, EXPORT_PUBLISH_CMD,
+    EXPORT_SHOUTOUTS_MAX, PROJECT_ROOT,
+)
+from app.database import pool
+from app.events import hub
+
+SHOUTOUTS_FILE = "shoutouts.json"
+CLOSED_POLLS_FILE = "polls-closed.json"
+# Events that change what the files would contain
+EVENTS = frozenset({"shoutout.created", "poll.closed", "poll.reopened"})
+
+SHOUTOUTS_SQL = """
+    SELECT s.id, s.message, u.name, s.created_at
+    FROM shoutouts s LEFT JOIN users u ON s.user_id = u.id
+    ORDER BY s.id DESC LIMIT ?
+"""
+CLOSED_POLLS_SQL = "SELECT data FROM poll_snapshots ORDER BY poll_id DESC LIMIT ?"
+
+
+def write_if_changed(path: Path, body: bytes) -> bool:
+    """Atomically replace `path` with `body` unless it already holds exactly that. Returns True if written."""
+    try:
+        if path.read_bytes() == body:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return True
+
+
+class SnapshotExporter:
+    """Background task that rewrites the static fallback files after writes settle."""
+
+    def __init__(self, directory: Path = EXPORT_DIR, debounce: float = EXPORT_DEBOUNCE_SECONDS,
+                 max_delay: float = EXPORT_MAX_DELAY_SECONDS, publish_cmd: str = EXPORT_PUBLISH_CMD):
+        self.directory = directory
+        self.debounce = debounce
+        self.max_delay = max(debounce, max_delay)
+        self.publish_cmd = publish_cmd
+        self._task: asyncio.Task | None = None
+        self._sub = None
+        self._pending = False
+        self._recent: deque = deque(maxlen=10)
+        self._stats = {"exports": 0, "files_written": 0, "unchanged": 0, "errors": 0,
+                       "last_export_ms": 0.0, "max_export_ms": 0.0, "publishes": 0, "publish_failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running:
+            return
+        self._sub, _ = hub.subscribe()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        hub.unsubscribe(self._sub)
+        if self._pending:
+            # Writes from the last few seconds before shutdown still make it out
+            await self._export_logged()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        # The files may predate this process: export once at startup
+        first = last = loop.time()
+        self._pending = True
+        while True:
+            timeout = None
+            if first is not None:
+                timeout = max(0.0, min(last + self.debounce, first + self.max_delay) - loop.time())
+            try:
+                item = await asyncio.wait_for(self._sub.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._export_logged()
+                first, self._pending = None, False
+                continue
+            if item is None:
+                # Dropped for falling behind: resubscribe and assume something changed
+                self._sub, _ = hub.subscribe()
+            elif item[1] not in EVENTS:
+                continue
+            last = loop.time()
+            if first is None:
+                first, self._pending = last, True
+
+    async def _export_logged(self):
+        try:
+            await self.export()
+        except Exception as exc:
+            self._stats["errors"] += 1
+            print(f"⚠️  Snapshot export: {exc}")
+
+    async def export(self) -> list[str]:
+        """Regenerate both files now. Returns the names actually rewritten."""
+        started = time.perf_counter()
+        async with pool.reader() as db:
+            rows = await db.execute(SHOUTOUTS_SQL, (EXPORT_SHOUTOUTS_MAX,))
+            shoutouts = await rows.fetchall()
+            rows = await db.execute(CLOSED_POLLS_SQL, (EXPORT_POLLS_MAX,))
+            snapshots = await rows.fetchall()
+        files = {CLOSED_POLLS_FILE: b"[" + b",".join(r[0] for r in snapshots) + b"]"}
+        if shoutouts:
+            files[SHOUTOUTS_FILE] = dumps([
+                {"id": r[0], "message": r[1], "author_name": r[2], "timestamp": r[3]} for r in shoutouts
+            ])
+        written = await asyncio.to_thread(
+            lambda: [name for name, body in files.items() if write_if_changed(self.directory / name, body)]
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        self._stats["exports"] += 1
+        self._stats["files_written"] += len(written)
+        self._stats["unchanged"] += len(files) - len(written)
+        self._stats["last_export_ms"] = round(elapsed, 3)
+        self._stats["max_export_ms"] = max(self._stats["max_export_ms"], round(elapsed, 3))
+        self._recent.append({"at": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()), "ms": round(elapsed, 3),
+                             "written": written, "bytes": {name: len(body) for name, body in files.items()}})
+        if written and self.publish_cmd:
+            await self._publish(written)
+        return written
+
+    async def _publish(self, written: list[str]):
+        proc = await asyncio.create_subprocess_shell(
+            self.publish_cmd, cwd=PROJECT_ROOT, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "ES117_EXPORTED": " ".join(written)},
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode:
+            self._stats["publish_failures"] += 1
+            print(f"⚠️  Export publish command exited {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+        else:
+            self._stats["publishes"] += 1
+
+    def stats(self) -> dict:
+        return {"enabled": self.running, **self._stats, "recent": list(self._recent)}
+
+
+snapshot_exporter = SnapshotExporter()
+
+
+async def import_static(path: Path) -> int:
+    """Insert the hand-written entries (those without an id) of a shoutouts.json. Returns rows added."""
+    entries = json.loads(path.read_bytes()) if path.is_file() else []
+    legacy = [e for e in entries if isinstance(e, dict) and "id" not in e and e.get("message")]
+    async with pool.writer() as db:
+        rows = await db.execute("SELECT message FROM shoutouts WHERE user_id IS NULL")
+        existing = {r[0] for r in await rows.fetchall()}
+        # The file lists newest first; insert oldest first so ids follow time
+        new = [(e["message"], str(e.get("timestamp") or "")) for e in reversed(legacy) if e["message"] not in existing]
+        await db.executemany(
+            "INSERT INTO shoutouts (message, user_id, created_at) VALUES (?, NULL, COALESCE(datetime(NULLIF(?, '')), CURRENT_TIMESTAMP))",
+            new
+        )
+        await db.commit()
+    return len(new)
+
+
+async def _main(import_first: bool) -> int:
+    if import_first:
+        added = await import_static(EXPORT_DIR / SHOUTOUTS_FILE)
+        print(f"✅ Imported {added} hand-written shoutouts")
+    written = await snapshot_exporter.export()
+    stats = snapshot_exporter.stats()
+    print(f"✅ Export took {stats['last_export_ms']:.1f} ms; "
+          f"{', '.join(written) if written else 'nothing changed'}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write live data into the static site's fallback files")
+    parser.add_argument("--import-static", action="store_true",
+                        help="First copy hand-written shoutouts.json entries into the database")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.import_static)))
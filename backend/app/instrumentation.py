@@ -0,0 +1,168 @@
+"""ES117 Backend — Request Instrumentation
+
+InstrumentationMiddleware times every request, feeds the /metrics
+registry and adds a Server-Timing header breaking the request down into
+db / pool_wait / auth / oauth / app time (browser devtools show it next
+to the network timing, which makes tunnel latency easy to tell apart).
+
+The opt-in SamplingProfiler (ES117_PROFILE=1) samples the event-loop
+thread's stack from a background thread, attributes each sample to the
+request whose middleware frame is on the stack, and appends the stacks of
+slow requests to a folded-stack file for flamegraph.pl or speedscope.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+from app.config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_SLOW_MS
+from app.metrics import metrics, request_phases
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Statistical stack sampler for requests on the event-loop thread."""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, slow_ms: float = PROFILE_SLOW_MS,
+                 out_dir=PROFILE_DIR):
+        self.interval = interval_ms / 1000
+        self.slow_seconds = slow_ms / 1000
+        self.path = out_dir / "slow-requests.folded"
+        self._active: dict = {}  # middleware frame -> {stack tuple: count}
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._loop_thread: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._stats = {"samples": 0, "attributed": 0, "profiled_requests": 0}
+        self._slowest: list[tuple[float, str]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Start sampling the calling (event-loop) thread."""
+        if self.running:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="es117-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._write_pending()
+
+    def begin(self, frame):
+        self._active[frame] = {}
+
+    def end(self, frame, label: str, seconds: float):
+        """Stop attributing samples to a request; queue its stacks if it was slow."""
+        samples = self._active.pop(frame, None)
+        if samples and seconds >= self.slow_seconds:
+            self._pending.put((label, seconds, samples))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if not self._pending.empty():
+                self._write_pending()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._loop_thread)
+        self._stats["samples"] += 1
+        stack = []
+        while frame is not None:
+            samples = self._active.get(frame)
+            if samples is not None:
+                key = tuple(reversed(stack))
+                samples[key] = samples.get(key, 0) + 1
+                self._stats["attributed"] += 1
+                return
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+
+    def _write_pending(self):
+        lines = []
+        while not self._pending.empty():
+            label, seconds, samples = self._pending.get()
+            self._stats["profiled_requests"] += 1
+            self._slowest = sorted([*self._slowest, (seconds, label)], reverse=True)[:10]
+            root = label.replace(" ", "_").replace(";", ":")
+            for stack, count in samples.items():
+                lines.append(";".join((root, *stack)) + f" {count}\n")
+        if lines:
+            with open(self.path, "a") as f:
+                f.writelines(lines)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "output": str(self.path),
+            "slowest": [{"request": label, "ms": round(s * 1000, 1)} for s, label in self._slowest],
+            **self._stats,
+        }
+
+
+profiler = SamplingProfiler()
+
+
+class InstrumentationMiddleware:
+    """Per-request metrics and a Server-Timing header.
+
+    Pure ASGI (no BaseHTTPMiddleware) so streaming responses pass through
+    untouched and the per-request overhead stays at a few counters.
+    Latency is measured to the response headers, so long-lived streams
+    don't skew the histograms.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        phases: dict[str, float] = {}
+        token = request_phases.set(phases)
+        started = time.perf_counter()
+        response = {"status": 500, "seconds": None}
+        frame = sys._getframe() if profiler.running else None
+        if frame is not None:
+            profiler.begin(frame)
+        metrics.in_flight += 1
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                response["status"] = message["status"]
+                response["seconds"] = elapsed
+                timing = ", ".join(
+                    [f"{name};dur={spent * 1000:.2f}" for name, spent in phases.items()]
+                    + [f"app;dur={elapsed * 1000:.2f}"]
+                ).encode()
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.in_flight -= 1
+            request_phases.reset(token)
+            seconds = response["seconds"]
+            if seconds is None:
+                seconds = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.observe_request(scope["method"], route, response["status"], seconds, phases)
+            if frame is not None:
+                profiler.end(frame, f"{scope['method']} {route}", seconds)
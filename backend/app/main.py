@@ -1,19 +1,107 @@
 """ES117 Backend — FastAPI Application"""
+import os
+import secrets
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import ALLOWED_ORIGINS
-from app.database import init_db
-from app.routers import auth_routes, shoutouts, polls
+from app.analytics import activity
+from app.auth import open_http_client, close_http_client, token_cache, user_cache
+from app.backup import backup_manager
+from app.cache import response_cache
+from app.change_feed import change_feed
+from app.config import (
+    ALLOWED_ORIGINS, CHANGE_FEED_ENABLED, EXPORT_ENABLED, OPS_TOKEN, PROFILE_ENABLED, RECONCILE_TALLIES_ON_STARTUP,
+    VOTE_QUEUE_ENABLED, WORKERS,
+)
+from app.database import init_db, leader, pool, startup_lock
+from app.events import hub
+from app.exporter import snapshot_exporter
+from app.instrumentation import InstrumentationMiddleware, profiler
+from app.metrics import metrics
+from app.migrations import SCHEMA_VERSION
+from app.photos import photo_pipeline
+from app.poll_archive import poll_compactor
+from app.ratelimit import admission, client_ip, limiter
+from app.routers import auth_routes, shoutouts, polls, stream, photos, site_data, search, teams, analytics
+from app.search import on_site_data_change
+from app.static_data import static_data
+from app.teams import team_directory, on_teams_change
+from app.tallies import rebuild_tallies
+from app.vote_queue import vote_writer
+
+
+async def _start_leader_jobs():
+    """Start the jobs that must run in exactly one worker (this one, now the leader)."""
+    print(f"👑 Worker {os.getpid()} leads: tally reconciliation, compaction, backups and export run here")
+    if RECONCILE_TALLIES_ON_STARTUP:
+        # On every election, not just at boot, so a worker that takes over later reconciles too
+        async with pool.writer() as db:
+            drift = await rebuild_tallies(db)
+        if drift:
+            print(f"⚠️  Rebuilt {len(drift)} drifted poll tallies")
+    poll_compactor.start()
+    if poll_compactor.running:
+        print(f"✅ Compacting votes of polls closed over {poll_compactor.after_hours:g} h ago")
+    activity.start()
+    backup_manager.start()
+    if backup_manager.running:
+        print(f"✅ Backing up every {backup_manager.interval / 3600:g} h to {backup_manager.directory}")
+    if EXPORT_ENABLED:
+        # One worker is enough: every worker's hub sees every write
+        snapshot_exporter.start()
+        print(f"✅ Exporting static snapshots to {snapshot_exporter.directory}")
+
+
+async def _stop_leader_jobs():
+    await snapshot_exporter.stop()
+    await backup_manager.stop()
+    await activity.stop()
+    await poll_compactor.stop()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
-    await init_db()
-    print("✅ Database initialized")
+    """Initialize the database and shared resources on startup; release them on shutdown."""
+    # With several workers they take turns; only the first has migrations left to apply
+    async with startup_lock():
+        applied = await init_db()
+        for name in applied:
+            print(f"  applied migration {name}")
+        print(f"✅ Database schema at version {SCHEMA_VERSION}")
+        await pool.open()
+        print(f"✅ Connection pool ready ({pool.size} readers + 1 writer)")
+    # One worker leads and runs the singleton jobs; another takes over if it exits
+    await leader.start(_start_leader_jobs)
+    if CHANGE_FEED_ENABLED:
+        await change_feed.start()
+        print(f"✅ Change feed on (worker {change_feed.origin} of {WORKERS})")
+    if VOTE_QUEUE_ENABLED:
+        await vote_writer.start()
+        print(f"✅ Vote writer started (batch ≤ {vote_writer.max_batch}, ≤ {vote_writer.max_latency * 1000:g} ms)")
+    await photo_pipeline.start()
+    if photo_pipeline.enabled:
+        print(f"✅ Photo pipeline ready ({photo_pipeline.workers} thumbnail workers)")
+    else:
+        print("⚠️  Pillow not importable (run uv sync) — photos will be served without thumbnails")
+    await static_data.start()
+    print(f"✅ Serving {static_data.stats()['files']} site data files from memory")
+    await open_http_client()
+    if PROFILE_ENABLED:
+        profiler.start()
+        print(f"✅ Sampling profiler on (slow requests → {profiler.path})")
     yield
+    profiler.stop()
+    await _stop_leader_jobs()
+    await leader.stop()
+    await vote_writer.stop()
+    await photo_pipeline.stop()
+    await static_data.stop()
+    await change_feed.stop()
+    hub.close()
+    await close_http_client()
+    await pool.close()
 
 
 app = FastAPI(
@@ -30,28 +118,121 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Where to resume the live stream after GET /api/polls
+    expose_headers=["X-Event-Id"],
 )
 
+app.add_middleware(InstrumentationMiddleware)
+
+metrics.register_collector("db_pool", pool.stats)
+metrics.register_collector("stream", hub.stats)
+metrics.register_collector("response_cache", response_cache.stats)
+metrics.register_collector("vote_queue", vote_writer.stats)
+metrics.register_collector("poll_compactor", poll_compactor.stats)
+metrics.register_collector("analytics", activity.stats)
+metrics.register_collector("token_cache", token_cache.stats)
+metrics.register_collector("user_cache", user_cache.stats)
+metrics.register_collector("photos", photo_pipeline.stats)
+metrics.register_collector("site_data", static_data.stats)
+metrics.register_collector("teams", team_directory.stats)
+metrics.register_collector("change_feed", change_feed.stats)
+metrics.register_collector("exporter", snapshot_exporter.stats)
+metrics.register_collector("backup", backup_manager.stats)
+metrics.register_collector("leader", leader.stats)
+metrics.register_collector("rate_limit", limiter.stats)
+metrics.register_collector("admission", admission.stats)
+static_data.listeners.append(on_site_data_change)
+static_data.listeners.append(on_teams_change)
+
 # Register routers
 app.include_router(auth_routes.router)
 app.include_router(shoutouts.router)
 app.include_router(polls.router)
+app.include_router(stream.router)
+app.include_router(photos.router)
+app.include_router(site_data.router)
+app.include_router(search.router)
+app.include_router(teams.router)
+app.include_router(analytics.router)
+
+
+def require_ops(request: Request):
+    """Let through this machine, or a caller with the ops token. Raises 403 otherwise.
+
+    The diagnostics show SQL text, pool and queue internals and per-route
+    latency, so they are not served to the public tunnel.
+    """
+    if client_ip(request) is None:
+        return  # from this machine, not forwarded by the tunnel
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if OPS_TOKEN and scheme.lower() == "bearer" and secrets.compare_digest(token, OPS_TOKEN):
+        return
+    raise HTTPException(403, "Diagnostics are only available locally or with the ops token")
 
 
 @app.get("/health")
 async def health():
+    """Liveness (public)."""
     return {"status": "ok", "service": "ES117 Backend"}
 
 
+@app.get("/health/details", dependencies=[Depends(require_ops)])
+async def health_details():
+    """Worker, pool, queue, cache and job state (local or ops token only)."""
+    return {
+        "status": "ok",
+        "service": "ES117 Backend",
+        "worker": {"pid": os.getpid(), "workers": WORKERS, **leader.stats()},
+        "change_feed": change_feed.stats(),
+        "db_pool": pool.stats(),
+        "stream": hub.stats(),
+        "cache": response_cache.stats(),
+        "vote_queue": vote_writer.stats(),
+        "poll_compactor": poll_compactor.stats(),
+        "analytics": activity.stats(),
+        "rate_limit": limiter.stats(),
+        "admission": admission.stats(),
+        "photos": photo_pipeline.stats(),
+        "site_data": static_data.stats(),
+        "exporter": snapshot_exporter.stats(),
+        "backup": backup_manager.stats(),
+        "teams": team_directory.stats(),
+        "slow_queries": metrics.slow_queries(5),
+        "profiler": profiler.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_ops)])
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (local or ops token only)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api")
 async def api_root():
     return {
         "service": "ES117 Backend",
         "endpoints": {
             "health": "/health",
+            "health_details": "/health/details",
+            "metrics": "/metrics",
             "auth_login": "/api/auth/login",
             "auth_me": "/api/auth/me",
             "shoutouts": "/api/shoutouts",
+            "shoutouts_ndjson": "/api/shoutouts/ndjson",
             "polls": "/api/polls",
+            "polls_bulk": "/api/polls/bulk",
+            "closed_polls": "/api/polls/closed",
+            "poll": "/api/polls/{poll_id}",
+            "stream": "/api/stream",
+            "teams": "/api/teams?type=&phase=&fields=",
+            "team": "/api/teams/{team_id}",
+            "team_photos": "/api/teams/{team_id}/photos",
+            "gallery": "/api/photos/all",
+            "site_data": "/api/data/{name}",
+            "search": "/api/search?q=",
+            "analytics_daily": "/api/analytics/daily",
+            "analytics_activity": "/api/analytics/activity",
+            "analytics_poll": "/api/analytics/polls/{poll_id}",
         }
     }
@@ -0,0 +1,222 @@
+"""ES117 Backend — Metrics Registry
+
+In-process counters and histograms rendered in the Prometheus text format
+at /metrics. Everything here is plain dict arithmetic on the event-loop
+thread, so recording a sample costs well under a microsecond.
+"""
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config import METRICS_MAX_STATEMENTS, SLOW_QUERY_MS
+
+# Request latency buckets (seconds): 1 ms .. 10 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Seconds spent per phase ("db", "auth", ...) in the current request; set by the middleware
+request_phases: ContextVar[dict | None] = ContextVar("request_phases", default=None)
+
+
+def charge(phase: str, seconds: float):
+    """Add time to a phase of the current request (no-op outside a request)."""
+    phases = request_phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed_phase(phase: str):
+    """Charge the time spent inside the block to `phase`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        charge(phase, time.perf_counter() - started)
+
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SQL_VALUES_LIST = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_SQL_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse literals and whitespace so the same statement shape shares one series."""
+    sql = _SQL_STRING.sub("?", sql)
+    sql = _SQL_NUMBER.sub("?", sql)
+    sql = _SQL_IN_LIST.sub("IN (?, ...)", sql)
+    sql = _SQL_VALUES_LIST.sub(r"VALUES \1, ...", sql)
+    return _SQL_SPACE.sub(" ", sql).strip()
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics)."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class StatementStats:
+    """Per normalized-SQL timing totals, plus one raw statement for EXPLAIN."""
+    __slots__ = ("count", "sum", "max", "slow", "sample", "from_request")
+
+    def __init__(self, sample: str):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.sample = sample
+        self.from_request = False
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Metrics:
+    """Registry for request, phase and SQL metrics plus pluggable gauge collectors."""
+
+    def __init__(self, max_statements: int = METRICS_MAX_STATEMENTS, slow_query_ms: float = SLOW_QUERY_MS):
+        self.max_statements = max_statements
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.in_flight = 0
+        self._latency: dict[tuple[str, str], Histogram] = {}
+        self._responses: dict[tuple[str, str, int], int] = {}
+        self._phases: dict[str, float] = {}
+        self._statements: dict[str, StatementStats] = {}
+        self._normalized: dict[str, str] = {}
+        self._collectors: dict[str, callable] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, phases: dict):
+        hist = self._latency.get((method, route))
+        if hist is None:
+            hist = self._latency[(method, route)] = Histogram()
+        hist.observe(seconds)
+        key = (method, route, status)
+        self._responses[key] = self._responses.get(key, 0) + 1
+        for phase, spent in phases.items():
+            self._phases[phase] = self._phases.get(phase, 0.0) + spent
+
+    def observe_statement(self, sql: str, seconds: float):
+        shape = self._normalized.get(sql)
+        if shape is None:
+            shape = normalize_sql(sql)
+            if len(self._normalized) < self.max_statements * 4:
+                self._normalized[sql] = shape
+        stats = self._statements.get(shape)
+        if stats is None:
+            if len(self._statements) >= self.max_statements:
+                shape = "other"
+                stats = self._statements.get(shape)
+            if stats is None:
+                stats = self._statements[shape] = StatementStats(sql)
+        if not stats.from_request and request_phases.get() is not None:
+            stats.from_request = True
+        stats.count += 1
+        stats.sum += seconds
+        if seconds > stats.max:
+            stats.max = seconds
+        if seconds >= self.slow_query_seconds:
+            stats.slow += 1
+
+    def request_statements(self) -> list[str]:
+        """One raw example of every statement shape executed while serving a request."""
+        return [s.sample for shape, s in self._statements.items() if s.from_request and shape != "other"]
+
+    def register_collector(self, name: str, collect):
+        """Expose a stats() dict as `es117_<name>_<key>` gauges on /metrics."""
+        self._collectors[name] = collect
+
+    def slow_queries(self, limit: int = 20) -> list[dict]:
+        """Statements that crossed the slow threshold, worst first."""
+        slow = [(sql, s) for sql, s in self._statements.items() if s.slow]
+        slow.sort(key=lambda item: item[1].max, reverse=True)
+        return [
+            {"sql": sql, "slow": s.slow, "count": s.count, "max_ms": round(s.max * 1000, 3),
+             "mean_ms": round(s.sum / s.count * 1000, 3)}
+            for sql, s in slow[:limit]
+        ]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out = [
+            "# HELP es117_http_requests_in_flight Requests currently being served.",
+            "# TYPE es117_http_requests_in_flight gauge",
+            f"es117_http_requests_in_flight {self.in_flight}",
+            "# HELP es117_http_requests_total Responses by route template and status.",
+            "# TYPE es117_http_requests_total counter",
+        ]
+        for (method, route, status), n in sorted(self._responses.items()):
+            out.append(f"es117_http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+
+        out += [
+            "# HELP es117_http_request_duration_seconds Time to the response headers, by route template.",
+            "# TYPE es117_http_request_duration_seconds histogram",
+        ]
+        for (method, route), hist in sorted(self._latency.items()):
+            cumulative = 0
+            for bound, n in zip((*hist.buckets, "+Inf"), hist.counts):
+                cumulative += n
+                out.append(f"es117_http_request_duration_seconds_bucket"
+                           f"{_labels(method=method, route=route, le=bound)} {cumulative}")
+            labels = _labels(method=method, route=route)
+            out.append(f"es117_http_request_duration_seconds_sum{labels} {hist.sum:.6f}")
+            out.append(f"es117_http_request_duration_seconds_count{labels} {hist.count}")
+
+        out += [
+            "# HELP es117_request_phase_seconds_total Request time attributed to db, auth, ...",
+            "# TYPE es117_request_phase_seconds_total counter",
+        ]
+        for phase, spent in sorted(self._phases.items()):
+            out.append(f"es117_request_phase_seconds_total{_labels(phase=phase)} {spent:.6f}")
+
+        out += [
+            "# HELP es117_db_statement_seconds Time awaiting SQLite per normalized statement.",
+            "# TYPE es117_db_statement_seconds summary",
+        ]
+        for sql, s in sorted(self._statements.items()):
+            labels = _labels(sql=sql)
+            out.append(f"es117_db_statement_seconds_sum{labels} {s.sum:.6f}")
+            out.append(f"es117_db_statement_seconds_count{labels} {s.count}")
+        out += [
+            "# HELP es117_db_statement_max_seconds Slowest single execution per normalized statement.",
+            "# TYPE es117_db_statement_max_seconds gauge",
+        ]
+        for sql, s in sorted(self._statements.items()):
+            out.append(f"es117_db_statement_max_seconds{_labels(sql=sql)} {s.max:.6f}")
+        out += [
+            f"# HELP es117_db_slow_queries_total Statements slower than {self.slow_query_seconds * 1000:g} ms.",
+            "# TYPE es117_db_slow_queries_total counter",
+        ]
+        for sql, s in sorted(self._statements.items()):
+            if s.slow:
+                out.append(f"es117_db_slow_queries_total{_labels(sql=sql)} {s.slow}")
+
+        for name, collect in self._collectors.items():
+            for key, value in collect().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"es117_{name}_{key}"
+                out.append(f"# TYPE {metric} gauge")
+                out.append(f"{metric} {value}")
+        out.append("")
+        return "\n".join(out)
+
+
+metrics = Metrics()
@@ -0,0 +1,374 @@
+"""ES117 Backend — Schema Migrations
+
+Migrations are applied in order at startup, each in its own transaction,
+and recorded in schema_version. Add new ones at the end of MIGRATIONS;
+never edit one that has shipped. The early ones use IF NOT EXISTS so
+databases created before versioning adopt the history without changes.
+
+check_query_plans() runs EXPLAIN QUERY PLAN over statements and reports
+any that scan a whole table once it has grown past QUERY_PLAN_MIN_ROWS.
+app.query_plans.QUERY_PLAN_STATEMENTS collects what the routers and
+background jobs run, from the constants they run it from; a new query
+gets its own constant and entry there. tests/test_query_plans.py checks
+them on every test run.
+
+Usage:
+    python -m app.migrations                 # apply pending migrations
+    python -m app.migrations --status        # list applied and pending migrations
+    python -m app.migrations --check-plans   # EXPLAIN app.query_plans statements against this database
+"""
+import argparse
+import asyncio
+import re
+
+import aiosqlite
+
+from app.config import ANALYTICS_DAY_OFFSET_MINUTES, DB_PATH, QUERY_PLAN_MIN_ROWS
+from app.tallies import snapshot_poll
+
+
+async def _add_vote_count(db: aiosqlite.Connection):
+    # Databases created before tallies were materialized lack vote_count;
+    # the startup reconciliation fills it in.
+    cols = await db.execute("PRAGMA table_info(poll_options)")
+    if "vote_count" not in [c[1] for c in await cols.fetchall()]:
+        await db.execute("ALTER TABLE poll_options ADD COLUMN vote_count INTEGER NOT NULL DEFAULT 0")
+
+
+async def _add_poll_snapshots(db: aiosqlite.Connection):
+    await db.execute("""CREATE TABLE IF NOT EXISTS poll_snapshots (
+        poll_id INTEGER PRIMARY KEY,
+        total_votes INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        compacted INTEGER NOT NULL DEFAULT 0,
+        closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (poll_id) REFERENCES polls(id) ON DELETE CASCADE
+    )""")
+    # Polls closed before snapshots existed get one now
+    rows = await db.execute("SELECT id FROM polls WHERE is_active = 0")
+    for (poll_id,) in await rows.fetchall():
+        await snapshot_poll(db, poll_id)
+
+
+async def _add_activity_rollups(db: aiosqlite.Connection):
+    # See app/analytics.py. grain is the bucket width in seconds, bucket its
+    # start (unix time); scope is a poll id for per-poll votes, else 0.
+    await db.execute("""CREATE TABLE IF NOT EXISTS activity_rollups (
+        grain INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        scope INTEGER NOT NULL DEFAULT 0,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (grain, kind, scope, bucket)
+    ) WITHOUT ROWID""")
+    await db.execute("""CREATE TABLE IF NOT EXISTS active_users (
+        day INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (day, user_id)
+    ) WITHOUT ROWID""")
+    # Existing activity goes straight into hourly and daily buckets. A vote
+    # row only remembers when it was first cast, so changed votes count once.
+    offset = ANALYTICS_DAY_OFFSET_MINUTES * 60
+    day = f"((CAST(strftime('%s', created_at) AS INTEGER) + {offset}) / 86400 * 86400 - {offset})"
+    hour = "(CAST(strftime('%s', created_at) AS INTEGER) / 3600 * 3600)"
+    events = """
+        SELECT 'shoutout' AS kind, 0 AS scope, user_id, created_at FROM shoutouts
+        UNION ALL SELECT 'vote', poll_id, user_id, created_at FROM poll_votes
+        UNION ALL SELECT 'vote', 0, user_id, created_at FROM poll_votes
+    """
+    for grain, bucket in ((3600, hour), (86400, day)):
+        await db.execute(f"""
+            INSERT INTO activity_rollups (grain, kind, scope, bucket, count)
+            SELECT {grain}, kind, scope, {bucket}, COUNT(*) FROM ({events}) WHERE created_at IS NOT NULL
+            GROUP BY kind, scope, {bucket}
+        """)
+    await db.execute(f"""
+        INSERT OR IGNORE INTO active_users (day, user_id)
+        SELECT {day}, user_id FROM (
+            SELECT user_id, created_at FROM shoutouts UNION ALL SELECT user_id, created_at FROM poll_votes
+        ) WHERE user_id IS NOT NULL AND created_at IS NOT NULL
+    """)
+    await db.execute("""
+        INSERT INTO activity_rollups (grain, kind, scope, bucket, count)
+        SELECT 86400, 'active_users', 0, day, COUNT(*) FROM active_users GROUP BY day
+    """)
+
+
+MIGRATIONS = (
+    (1, "initial schema", (
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            picture TEXT DEFAULT '',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS shoutouts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS polls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS poll_options (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            poll_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            vote_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (poll_id) REFERENCES polls(id) ON DELETE CASCADE
+        )""",
+        """CREATE TABLE IF NOT EXISTS poll_votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            poll_id INTEGER NOT NULL,
+            option_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(poll_id, user_id),
+            FOREIGN KEY (poll_id) REFERENCES polls(id) ON DELETE CASCADE,
+            FOREIGN KEY (option_id) REFERENCES poll_options(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""",
+    )),
+    (2, "materialized vote counts", _add_vote_count),
+    (3, "team photos", (
+        """CREATE TABLE IF NOT EXISTS photos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            team_id TEXT NOT NULL,
+            user_id INTEGER,
+            sha256 TEXT NOT NULL,
+            content_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            caption TEXT DEFAULT '',
+            width INTEGER,
+            height INTEGER,
+            has_variants INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(team_id, sha256),
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_photos_team ON photos(team_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_photos_sha256 ON photos(sha256)",
+    )),
+    (4, "cross-worker change log", (
+        # See app/change_feed.py; ids double as SSE event ids
+        """CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            data TEXT,
+            queued_at REAL NOT NULL
+        )""",
+    )),
+    (5, "indexes for poll reads and tally reconciliation", (
+        # GET /api/polls: WHERE is_active = 1 ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_polls_active ON polls(is_active, created_at)",
+        # Options of a page of polls (WHERE poll_id IN ...); also the ON DELETE CASCADE from polls
+        "CREATE INDEX IF NOT EXISTS idx_poll_options_poll ON poll_options(poll_id)",
+        # find_drift joins votes by option; also the ON DELETE CASCADE from poll_options
+        "CREATE INDEX IF NOT EXISTS idx_poll_votes_option ON poll_votes(option_id)",
+    )),
+    (6, "closed poll snapshots", _add_poll_snapshots),
+    (7, "full-text search", (
+        # Mirror of data/teams.json, synced by app/search.py
+        """CREATE TABLE IF NOT EXISTS teams (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            captain TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            data BLOB NOT NULL
+        )""",
+        # External-content FTS5 indexes: the text lives in the base tables, triggers keep them in step
+        """CREATE VIRTUAL TABLE IF NOT EXISTS shoutouts_fts USING fts5(
+            message, content='shoutouts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS shoutouts_fts_insert AFTER INSERT ON shoutouts BEGIN
+            INSERT INTO shoutouts_fts (rowid, message) VALUES (new.id, new.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shoutouts_fts_delete AFTER DELETE ON shoutouts BEGIN
+            INSERT INTO shoutouts_fts (shoutouts_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS shoutouts_fts_update AFTER UPDATE OF message ON shoutouts BEGIN
+            INSERT INTO shoutouts_fts (shoutouts_fts, rowid, message) VALUES ('delete', old.id, old.message);
+            INSERT INTO shoutouts_fts (rowid, message) VALUES (new.id, new.message);
+        END""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS teams_fts USING fts5(
+            name, captain, description, content='teams', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS teams_fts_insert AFTER INSERT ON teams BEGIN
+            INSERT INTO teams_fts (rowid, name, captain, description)
+            VALUES (new.rowid, new.name, new.captain, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS teams_fts_delete AFTER DELETE ON teams BEGIN
+            INSERT INTO teams_fts (teams_fts, rowid, name, captain, description)
+            VALUES ('delete', old.rowid, old.name, old.captain, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS teams_fts_update AFTER UPDATE ON teams BEGIN
+            INSERT INTO teams_fts (teams_fts, rowid, name, captain, description)
+            VALUES ('delete', old.rowid, old.name, old.captain, old.description);
+            INSERT INTO teams_fts (rowid, name, captain, description)
+            VALUES (new.rowid, new.name, new.captain, new.description);
+        END""",
+        "INSERT INTO shoutouts_fts (shoutouts_fts) VALUES ('rebuild')",
+    )),
+    (8, "activity rollups", _add_activity_rollups),
+    (9, "index for vote compaction", (
+        # poll_archive.compact_candidates: one index range per branch of its OR
+        "CREATE INDEX IF NOT EXISTS idx_poll_snapshots_compaction ON poll_snapshots(compacted, closed_at)",
+    )),
+    (10, "index for photos missing variants", (
+        # photos.PhotoPipeline.start: reads only the photos still waiting for thumbnails
+        """CREATE INDEX IF NOT EXISTS idx_photos_pending_variants ON photos(sha256, content_type)
+            WHERE has_variants = 0""",
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+async def applied_versions(db: aiosqlite.Connection) -> dict[int, str]:
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.commit()
+    rows = await db.execute("SELECT version, applied_at FROM schema_version ORDER BY version")
+    return {r[0]: r[1] for r in await rows.fetchall()}
+
+
+async def migrate(db: aiosqlite.Connection) -> list[str]:
+    """Apply pending migrations in order. Returns the ones applied."""
+    applied = await applied_versions(db)
+    if applied and max(applied) > SCHEMA_VERSION:
+        raise RuntimeError(f"Database is at schema version {max(applied)}, "
+                           f"newer than this code ({SCHEMA_VERSION})")
+    done = []
+    for version, name, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            if callable(steps):
+                await steps(db)
+            else:
+                for sql in steps:
+                    await db.execute(sql)
+            await db.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        done.append(f"{version:03d} {name}")
+    return done
+
+
+# --- Query plan check ---
+
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+_USING_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIAS = {"WHERE", "JOIN", "LEFT", "INNER", "CROSS", "ON", "ORDER", "GROUP", "LIMIT", "SET", "VALUES",
+              "USING", "HAVING", "UNION", "AS"}
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def _tables(sql: str) -> dict[str, str]:
+    """Map the names that can appear in a plan (aliases and tables) to table names."""
+    names = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        names[table] = table
+        if alias and alias.upper() not in _NOT_ALIAS:
+            names[alias] = table
+    return names
+
+
+async def _approx_rows(db: aiosqlite.Connection, table: str, cache: dict) -> int | None:
+    """Row count estimate from the largest rowid (an index lookup, not a count); None if not a table."""
+    if table not in cache:
+        try:
+            row = await db.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}")
+            cache[table] = (await row.fetchone())[0]
+        except aiosqlite.OperationalError:
+            cache[table] = None  # a subquery, CTE or table-valued function
+    return cache[table]
+
+
+async def _is_partial(db: aiosqlite.Connection, table: str, index: str) -> bool:
+    rows = await db.execute("SELECT partial FROM pragma_index_list(?) WHERE name = ?", (table, index))
+    row = await rows.fetchone()
+    return bool(row and row[0])
+
+
+async def check_query_plans(db: aiosqlite.Connection, statements, min_rows: int = QUERY_PLAN_MIN_ROWS) -> list[dict]:
+    """EXPLAIN each statement; report full scans of tables with at least `min_rows` rows.
+
+    A scan that walks the table in the ORDER BY's order and stops at a
+    LIMIT (no temp b-tree) is fine: it reads one page of rows, not all.
+    """
+    problems, sizes = [], {}
+    for sql in statements:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            continue
+        params = (None,) * sql.count("?")
+        rows = await db.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        plan = [r[3] for r in await rows.fetchall()]
+        bounded = re.search(r"\bLIMIT\b", sql, re.IGNORECASE) and not any("TEMP B-TREE" in p for p in plan)
+        names = _tables(sql)
+        for step in plan:
+            match = _SCAN.match(step)
+            if not match or "VIRTUAL TABLE" in match.group(2) or match.group(1) == "CONSTANT":
+                continue
+            table = names.get(match.group(1), match.group(1))
+            index = _USING_INDEX.search(match.group(2))
+            if index and await _is_partial(db, table, index.group(1)):
+                continue  # walks only the rows the index's WHERE admits
+            rows_estimate = await _approx_rows(db, table, sizes)
+            if rows_estimate is None or rows_estimate < min_rows or bounded:
+                continue
+            problems.append({"table": table, "rows": rows_estimate, "plan": plan,
+                             "sql": re.sub(r"\s+", " ", sql).strip()})
+    return problems
+
+
+async def _main(status_only: bool, check_plans: bool) -> int:
+    async with aiosqlite.connect(DB_PATH) as db:
+        if check_plans:
+            from app.query_plans import QUERY_PLAN_STATEMENTS, WHOLE_TABLE_READS
+            statements = [sql for name, sql in QUERY_PLAN_STATEMENTS.items() if name not in WHOLE_TABLE_READS]
+            scans = await check_query_plans(db, statements)
+            for scan in scans:
+                print(f"❌ full scan of {scan['table']} ({scan['rows']} rows): {scan['sql']}")
+            print(f"{'❌' if scans else '✅'} {len(statements)} statements, {len(scans)} full scans "
+                  f"of tables over {QUERY_PLAN_MIN_ROWS} rows")
+            return 1 if scans else 0
+        if status_only:
+            applied = await applied_versions(db)
+            for version, name, _ in MIGRATIONS:
+                state = f"applied {applied[version]}" if version in applied else "pending"
+                print(f"  {version:03d} {name}: {state}")
+            return 0
+        done = await migrate(db)
+    for name in done:
+        print(f"  applied {name}")
+    print(f"✅ Schema at version {SCHEMA_VERSION} ({len(done)} migrations applied)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or list schema migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations without applying them")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="Fail if a listed statement scans a table over QUERY_PLAN_MIN_ROWS rows")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.status, args.check_plans)))
@@ -32,6 +32,9 @@ class PollCreate(BaseModel):
     question: str
     options: list[PollOptionCreate]
 
+class PollBulkCreate(BaseModel):
+    polls: list[PollCreate]
+
 class PollOptionOut(BaseModel):
     id: int
     text: str
@@ -47,3 +50,15 @@ class PollOut(BaseModel):
 
 class VoteCreate(BaseModel):
     option_id: int
+
+# --- Photos ---
+class PhotoOut(BaseModel):
+    id: int
+    team_id: str
+    caption: str = ""
+    thumb_url: str
+    full_url: str
+    original_url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    created_at: str
@@ -0,0 +1,326 @@
+"""ES117 Backend — Team Photo Storage
+
+Uploads are parsed straight off the request stream and written to disk in
+chunks while being hashed, so an upload never sits in memory. Files are
+stored under their sha256 (identical photos are kept once) and never
+change, which lets them be served with immutable cache headers.
+
+Thumbnail and web-size WebP variants are rendered by Pillow in a process
+pool after the upload has been answered; until they exist the listing
+points at the original. Without Pillow installed, originals are served
+for both.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.cache import response_cache
+from app.config import PHOTO_DIR, PHOTO_MAX_BYTES, PHOTO_WORKERS, PHOTO_THUMB_PX, PHOTO_WEB_PX
+from app.database import pool
+
+try:
+    from PIL import Image, ImageOps
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+MEDIA_TYPES = {ext: media for media, ext in EXTENSIONS.items()}
+
+# Largest first: each variant is downscaled from the previous one
+VARIANTS = (("web", PHOTO_WEB_PX), ("thumb", PHOTO_THUMB_PX))
+
+FILE_NAME = re.compile(r"^([0-9a-f]{64})(?:-(thumb|web))?(\.(?:jpg|png|webp|gif))$")
+
+MAX_FIELD_BYTES = 4096
+
+# Uses the partial index idx_photos_pending_variants (migration 10)
+PENDING_VARIANTS_SQL = "SELECT DISTINCT sha256, content_type FROM photos WHERE has_variants = 0"
+VARIANTS_DONE_SQL = "UPDATE photos SET has_variants = 1, width = ?, height = ? WHERE sha256 = ?"
+
+
+def sniff_image(head: bytes) -> str | None:
+    """Media type from the file's magic bytes (the client's Content-Type is not trusted)."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return None
+
+
+def original_name(digest: str, media_type: str) -> str:
+    return f"{digest}{EXTENSIONS[media_type]}"
+
+
+def variant_name(digest: str, variant: str) -> str:
+    return f"{digest}-{variant}.webp"
+
+
+def file_path(name: str) -> Path | None:
+    """Map a public file name to its location on disk (None if the name is not ours)."""
+    match = FILE_NAME.match(name)
+    if not match:
+        return None
+    digest, variant, _ = match.groups()
+    return PHOTO_DIR / (variant or "original") / digest[:2] / name
+
+
+class StoredUpload:
+    """Result of streaming one multipart upload to content-addressed storage."""
+    __slots__ = ("digest", "media_type", "size", "fields", "duplicate")
+
+    def __init__(self, digest: str, media_type: str, size: int, fields: dict, duplicate: bool):
+        self.digest = digest
+        self.media_type = media_type
+        self.size = size
+        self.fields = fields
+        self.duplicate = duplicate
+
+
+class _StreamingForm:
+    """MultipartParser callbacks: the "file" part goes to a temp file, other fields to memory."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.fields: dict[str, str] = {}
+        self.file = None
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name: str | None = None
+        self._value = bytearray()
+        self._to_file = False
+        self._seen_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._headers = {}
+        self._name = None
+        self._value = bytearray()
+        self._to_file = False
+
+    def _header_field_data(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = params.get(b"name", b"").decode("utf-8", "replace")
+        self._to_file = self._name == "file" and b"filename" in params and not self._seen_file
+        if self._to_file:
+            self._seen_file = True
+            (PHOTO_DIR / "tmp").mkdir(parents=True, exist_ok=True)
+            self.file = tempfile.NamedTemporaryFile(dir=PHOTO_DIR / "tmp", delete=False)
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        if self._to_file:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise HTTPException(413, f"Photo too large (max {self.max_bytes // 1024} KB)")
+            if len(self.head) < 16:
+                self.head += chunk[:16 - len(self.head)]
+            self.hasher.update(chunk)
+            self.file.write(chunk)
+        elif self._name:
+            if len(self._value) + len(chunk) > MAX_FIELD_BYTES:
+                raise HTTPException(400, f"Field '{self._name}' too long")
+            self._value += chunk
+
+    def _part_end(self):
+        if self._to_file:
+            self.file.flush()
+        elif self._name:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            Path(self.file.name).unlink(missing_ok=True)
+            self.file = None
+
+
+async def receive_upload(request: Request, max_bytes: int = PHOTO_MAX_BYTES) -> StoredUpload:
+    """Stream a multipart/form-data upload (field "file") into content-addressed storage."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(400, "Expected a multipart/form-data upload")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise HTTPException(413, f"Photo too large (max {max_bytes // 1024} KB)")
+
+    form = _StreamingForm(max_bytes)
+    parser = MultipartParser(boundary, form.callbacks())
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except MultipartParseError:
+            raise HTTPException(400, "Malformed multipart upload")
+        if form.file is None or form.size == 0:
+            raise HTTPException(400, "No photo in the 'file' field")
+        media_type = sniff_image(form.head)
+        if media_type is None:
+            raise HTTPException(415, "Only JPEG, PNG, WebP or GIF images are accepted")
+        form.file.close()
+
+        digest = form.hasher.hexdigest()
+        dest = file_path(original_name(digest, media_type))
+        duplicate = dest.exists()
+        if duplicate:
+            form.discard()
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(form.file.name, dest)
+            form.file = None
+    finally:
+        form.discard()
+    return StoredUpload(digest, media_type, form.size, form.fields, duplicate)
+
+
+def _worker_init():
+    """Render at low CPU priority so thumbnailing never starves request handling."""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _render_variants(src: str, targets: list[tuple[str, int]]) -> tuple[int, int]:
+    """Write downscaled WebP variants of `src` (runs in a worker process). Returns the original size."""
+    with Image.open(src) as im:
+        size = im.size
+        # JPEG can decode at 1/2, 1/4, 1/8 scale directly, which is far cheaper than resizing
+        im.draft("RGB", (targets[0][1], targets[0][1]))
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.mode in ("P", "LA", "PA") else "RGB")
+        for dest, px in targets:
+            im.thumbnail((px, px), Image.LANCZOS)
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.tmp"  # workers of another server process may render it too
+            im.save(tmp, "WEBP", quality=80, method=4)
+            os.replace(tmp, dest)
+    return size
+
+
+class PhotoPipeline:
+    """Background variant rendering in a process pool."""
+
+    def __init__(self, workers: int = PHOTO_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._inflight: set[str] = set()
+        self._stats = {"uploads": 0, "duplicates": 0, "bytes_stored": 0, "rendered": 0, "render_failures": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    async def start(self):
+        """Start the worker pool and render variants that are still missing."""
+        (PHOTO_DIR / "tmp").mkdir(parents=True, exist_ok=True)
+        if not PILLOW_AVAILABLE or self.enabled:
+            return
+        methods = multiprocessing.get_all_start_methods()
+        # Never fork the server process: it has live SQLite and event-loop threads
+        if "forkserver" in methods:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["app.photos"])  # workers start with Pillow already imported
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_worker_init)
+        async with pool.reader() as db:
+            rows = await db.execute(PENDING_VARIANTS_SQL)
+            for digest, media_type in await rows.fetchall():
+                self.schedule(digest, media_type)
+
+    async def stop(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def record_upload(self, upload: StoredUpload):
+        self._stats["uploads"] += 1
+        if upload.duplicate:
+            self._stats["duplicates"] += 1
+        else:
+            self._stats["bytes_stored"] += upload.size
+
+    def variants_ready(self, digest: str) -> bool:
+        return all(file_path(variant_name(digest, v)).exists() for v, _ in VARIANTS)
+
+    def schedule(self, digest: str, media_type: str):
+        """Render variants for a stored original in the background."""
+        if not self.enabled or digest in self._inflight:
+            return
+        self._inflight.add(digest)
+        task = asyncio.create_task(self._render(digest, media_type))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _render(self, digest: str, media_type: str):
+        src = file_path(original_name(digest, media_type))
+        targets = [(str(file_path(variant_name(digest, v))), px) for v, px in VARIANTS]
+        try:
+            loop = asyncio.get_running_loop()
+            width, height = await loop.run_in_executor(self._executor, _render_variants, str(src), targets)
+            async with pool.writer() as db:
+                await db.execute(VARIANTS_DONE_SQL, (width, height, digest))
+                await db.commit()
+            response_cache.invalidate("photos")
+            self._stats["rendered"] += 1
+        except Exception as exc:
+            self._stats["render_failures"] += 1
+            print(f"⚠️  Could not render variants for {digest[:12]}: {exc}")
+        finally:
+            self._inflight.discard(digest)
+
+    def stats(self) -> dict:
+        return {
+            "pillow": PILLOW_AVAILABLE,
+            "workers": self.workers if self.enabled else 0,
+            "pending": len(self._inflight),
+            **self._stats,
+        }
+
+
+photo_pipeline = PhotoPipeline()
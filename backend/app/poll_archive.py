@@ -0,0 +1,131 @@
+"""ES117 Backend — Closed Poll Compaction
+
+A closed poll's results live in its poll_snapshots row, so once it has
+been closed for POLL_COMPACT_AFTER_HOURS its poll_votes rows are only
+dead weight. The compactor marks the snapshot compacted (which also takes
+the poll out of tally reconciliation), then deletes the vote rows in
+small transactions so votes on live polls never wait long for the
+writer. A pass interrupted halfway is finished by the next one. Only the
+leader worker compacts: a compactor started anywhere else skips its passes.
+Compacted polls can't be reopened: who voted is gone.
+
+Usage:
+    python -m app.poll_archive --hours 24   # one compaction pass
+"""
+import argparse
+import asyncio
+import time
+
+import aiosqlite
+
+from app.config import POLL_COMPACT_AFTER_HOURS, POLL_COMPACT_INTERVAL_SECONDS, POLL_COMPACT_BATCH
+from app.database import leader, pool
+
+# One index range (idx_poll_snapshots_compaction) per branch of the OR
+CANDIDATES_SQL = """
+    SELECT poll_id FROM poll_snapshots s
+    WHERE (s.compacted = 0 AND s.closed_at <= datetime('now', ?))
+       OR (s.compacted = 1 AND EXISTS (SELECT 1 FROM poll_votes v WHERE v.poll_id = s.poll_id))
+"""
+MARK_COMPACTED_SQL = "UPDATE poll_snapshots SET compacted = 1 WHERE poll_id = ?"
+DROP_VOTES_SQL = "DELETE FROM poll_votes WHERE id IN (SELECT id FROM poll_votes WHERE poll_id = ? LIMIT ?)"
+
+
+async def compact_candidates(db: aiosqlite.Connection, after_hours: float) -> list[int]:
+    """Polls closed long enough ago, plus compacted ones a previous pass didn't finish."""
+    rows = await db.execute(CANDIDATES_SQL, (f"-{after_hours} hours",))
+    return [r[0] for r in await rows.fetchall()]
+
+
+class PollCompactor:
+    """Background job that drops the vote rows of long-closed polls."""
+
+    def __init__(self, after_hours: float = POLL_COMPACT_AFTER_HOURS,
+                 interval: float = POLL_COMPACT_INTERVAL_SECONDS, batch: int = POLL_COMPACT_BATCH):
+        self.after_hours = after_hours
+        self.interval = interval
+        self.batch = max(1, batch)
+        self._task: asyncio.Task | None = None
+        self._stats = {"passes": 0, "skipped_passes": 0, "polls_compacted": 0, "votes_deleted": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self.running or self.after_hours <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            if not leader.is_leader:
+                # Several compactors would fight over the writer to delete the same rows
+                self._stats["skipped_passes"] += 1
+                await asyncio.sleep(self.interval)
+                continue
+            try:
+                await self.compact()
+            except Exception as exc:
+                self._stats["errors"] += 1
+                print(f"⚠️  Poll compaction: {exc}")
+            await asyncio.sleep(self.interval)
+
+    async def compact(self) -> int:
+        """One pass over every eligible poll. Returns the vote rows deleted."""
+        async with pool.reader() as db:
+            poll_ids = await compact_candidates(db, self.after_hours)
+        deleted = 0
+        for poll_id in poll_ids:
+            async with pool.writer() as db:
+                marked = await db.execute(MARK_COMPACTED_SQL, (poll_id,))
+                await db.commit()
+            if not marked.rowcount:
+                continue  # reopened since the candidates were read
+            while True:
+                # Short transactions: the writer is shared with live votes
+                async with pool.writer() as db:
+                    cursor = await db.execute(DROP_VOTES_SQL, (poll_id, self.batch))
+                    await db.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < self.batch:
+                    break
+                await asyncio.sleep(0)
+            self._stats["polls_compacted"] += 1
+        self._stats["passes"] += 1
+        self._stats["votes_deleted"] += deleted
+        return deleted
+
+    def stats(self) -> dict:
+        return {"enabled": self.running, "after_hours": self.after_hours, **self._stats}
+
+
+poll_compactor = PollCompactor()
+
+
+async def _main(after_hours: float) -> int:
+    compactor = PollCompactor(after_hours=after_hours)
+    started = time.perf_counter()
+    deleted = await compactor.compact()
+    stats = compactor.stats()
+    print(f"✅ Compacted {stats['polls_compacted']} closed polls, deleted {deleted} vote rows "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete the vote rows of long-closed polls")
+    parser.add_argument("--hours", type=float, default=POLL_COMPACT_AFTER_HOURS or 24,
+                        help="Only polls closed at least this long ago")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.hours)))
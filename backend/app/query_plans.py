@@ -0,0 +1,97 @@
+"""ES117 Backend — Statements for the Query Plan Check
+
+Every statement a router or background job runs, keyed "module: purpose".
+Each is imported from the module that runs it, so a query changed there
+is checked as changed here. Templates are filled in the way their callers
+fill them. app.migrations.check_query_plans() EXPLAINs them, from
+`python -m app.migrations --check-plans` and tests/test_query_plans.py.
+"""
+from app import analytics, change_feed, exporter, photos, poll_archive, search, tallies
+from app.routers import analytics as analytics_routes
+from app.routers import auth_routes
+from app.routers import photos as photo_routes
+from app.routers import polls, shoutouts
+
+
+def _marks(n: int) -> str:
+    return ",".join("?" * n)
+
+
+QUERY_PLAN_STATEMENTS = {
+    # routers/shoutouts.py
+    "shoutouts: page": shoutouts.PAGE_SQL.format(where="WHERE s.id < ? AND s.id > ?"),
+    "shoutouts: first page": shoutouts.PAGE_SQL.format(where=""),
+    "shoutouts: insert": shoutouts.INSERT_SQL,
+    "shoutouts: created": shoutouts.CREATED_SQL,
+    # routers/polls.py
+    "polls: active": polls.POLLS_SQL.format(where="is_active = 1"),
+    "polls: one": polls.POLLS_SQL.format(where="id = ?"),
+    "polls: options": polls.OPTIONS_SQL,
+    "polls: caller's votes": polls.USER_VOTES_SQL,
+    "polls: snapshot": polls.SNAPSHOT_SQL,
+    "polls: closed first page": polls.CLOSED_PAGE_SQL.format(where=""),
+    "polls: closed page": polls.CLOSED_PAGE_SQL.format(where="WHERE poll_id < ?"),
+    "polls: vote target": polls.VOTE_TARGET_SQL,
+    "polls: close": polls.CLOSE_SQL,
+    "polls: reopen check": polls.REOPEN_CHECK_SQL,
+    "polls: reopen": polls.REOPEN_SQL,
+    "polls: drop snapshot": polls.DROP_SNAPSHOT_SQL,
+    # tallies.py (votes, closing, reconciliation)
+    "tallies: open polls": tallies.OPEN_POLLS_SQL,
+    "tallies: previous votes": tallies.PREVIOUS_VOTES_SQL,
+    "tallies: upsert vote": tallies.UPSERT_VOTE_SQL,
+    "tallies: move count": tallies.MOVE_COUNT_SQL,
+    "tallies: snapshot poll": tallies.SNAPSHOT_POLL_SQL,
+    "tallies: snapshot counts": tallies.SNAPSHOT_COUNTS_SQL,
+    "tallies: save snapshot": tallies.SAVE_SNAPSHOT_SQL,
+    "tallies: drift": tallies.DRIFT_SQL,
+    "tallies: set count": tallies.SET_COUNT_SQL,
+    # routers/auth_routes.py
+    "auth: user by email": auth_routes.USER_BY_EMAIL_SQL,
+    "auth: update profile": auth_routes.UPDATE_PROFILE_SQL,
+    "auth: insert user": auth_routes.INSERT_USER_SQL,
+    "auth: me": auth_routes.ME_SQL,
+    # routers/photos.py, photos.py
+    "photos: team page": photo_routes.PAGE_SQL.format(where="WHERE team_id = ? AND id < ?"),
+    "photos: all page": photo_routes.PAGE_SQL.format(where="WHERE id < ?"),
+    "photos: insert": photo_routes.INSERT_SQL,
+    "photos: uploaded": photo_routes.UPLOADED_SQL,
+    "photos: pending variants": photos.PENDING_VARIANTS_SQL,
+    "photos: variants done": photos.VARIANTS_DONE_SQL,
+    # search.py
+    "search: rank window floor": search.RANK_FLOOR_SQL,
+    "search: shoutouts": search.SHOUTOUT_HITS_SQL,
+    "search: teams": search.TEAM_HITS_SQL,
+    "search: current teams": search.CURRENT_TEAMS_SQL,
+    "search: upsert team": search.UPSERT_TEAM_SQL,
+    "search: drop team": search.DROP_TEAM_SQL,
+    # analytics.py, routers/analytics.py
+    "analytics: record": analytics.UPSERT_ROLLUP_SQL,
+    "analytics: record active user": analytics.ACTIVE_USER_SQL,
+    "analytics: daily series": analytics.SERIES_SQL.format(grains=_marks(1), kinds=_marks(3)),
+    "analytics: hourly series": analytics.SERIES_SQL.format(grains=_marks(2), kinds=_marks(2)),
+    "analytics: poll exists": analytics_routes.POLL_EXISTS_SQL,
+    "analytics: poll span": analytics_routes.POLL_SPAN_SQL.format(grains=_marks(2)),
+    "analytics: compact minutes": analytics.COMPACT_MINUTES_SQL,
+    "analytics: drop minutes": analytics.DROP_MINUTES_SQL,
+    "analytics: prune active users": analytics.PRUNE_ACTIVE_USERS_SQL,
+    # poll_archive.py
+    "poll_archive: candidates": poll_archive.CANDIDATES_SQL,
+    "poll_archive: mark compacted": poll_archive.MARK_COMPACTED_SQL,
+    "poll_archive: drop votes": poll_archive.DROP_VOTES_SQL,
+    # exporter.py
+    "exporter: shoutouts": exporter.SHOUTOUTS_SQL,
+    "exporter: closed polls": exporter.CLOSED_POLLS_SQL,
+    # change_feed.py
+    "change_feed: cursor": change_feed.CURSOR_SQL,
+    "change_feed: append": change_feed.APPEND_SQL,
+    "change_feed: poll": change_feed.ENTRIES_SQL,
+    "change_feed: trim": change_feed.PRUNE_SQL,
+}
+
+# Statements that read a whole table on purpose, and that table: reconciliation
+# is a full pass, and the teams table only ever holds teams.json
+WHOLE_TABLE_READS = {
+    "tallies: drift": "poll_options",
+    "search: current teams": "teams",
+}
@@ -0,0 +1,168 @@
+"""ES117 Backend — Write Rate Limiting and Admission Control
+
+Two layers in front of shoutout and vote writes:
+
+  RateLimiter          token buckets per user (per action) and per client IP.
+                       Over the limit → 429 with Retry-After.
+  AdmissionController  watches how long writes queue for SQLite's single
+                       writer. While even the shortest wait in a window is
+                       above target, the queue is not draining and new
+                       writes are shed → 503 with Retry-After.
+
+Buckets are stored GCRA-style as one float per key (the time the bucket
+will be full again), and keys whose bucket has refilled are swept out.
+"""
+import math
+import time
+
+from fastapi import Depends, HTTPException, Request
+
+from app.auth import require_user
+from app.config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_SWEEP_SECONDS, TRUSTED_PROXIES,
+    SHOUTOUT_RATE_PER_MIN, SHOUTOUT_BURST, VOTE_RATE_PER_MIN, VOTE_BURST, IP_WRITE_RATE_PER_MIN, IP_WRITE_BURST,
+    ADMISSION_ENABLED, ADMISSION_TARGET_MS, ADMISSION_INTERVAL_MS, ADMISSION_RETRY_AFTER,
+)
+
+# action -> (tokens per minute, burst)
+USER_LIMITS = {
+    "shoutout": (SHOUTOUT_RATE_PER_MIN, SHOUTOUT_BURST),
+    "vote": (VOTE_RATE_PER_MIN, VOTE_BURST),
+}
+
+
+def client_ip(request: Request) -> str | None:
+    """The caller's address; behind the local tunnel, the one it forwarded.
+
+    Requests from a trusted proxy without a forwarding header come from
+    the machine itself (scripts, benchmarks) and get no IP limit.
+    """
+    peer = request.client.host if request.client else None
+    if peer not in TRUSTED_PROXIES:
+        return peer
+    forwarded = request.headers.get("cf-connecting-ip") or request.headers.get("x-forwarded-for", "")
+    return forwarded.split(",")[0].strip() or None
+
+
+class RateLimiter:
+    """Token buckets keyed by (scope, id), one float of state per key."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, sweep_seconds: float = RATE_LIMIT_SWEEP_SECONDS):
+        self.max_keys = max_keys
+        self.sweep_seconds = sweep_seconds
+        self._full_at: dict[tuple, float] = {}
+        self._next_sweep = time.monotonic() + sweep_seconds
+        self._stats = {"allowed": 0, "limited_user": 0, "limited_ip": 0, "evictions": 0}
+
+    def take(self, limits: list[tuple[tuple, float, int]]) -> tuple[str | None, float]:
+        """Spend one token from every (key, per_minute, burst) bucket, or from none.
+
+        Returns (None, 0) if allowed, else (scope of the first empty bucket,
+        seconds until it has a token again).
+        """
+        now = time.monotonic()
+        if now >= self._next_sweep or len(self._full_at) > self.max_keys:
+            self._sweep(now)
+        updates = []
+        for key, per_minute, burst in limits:
+            interval = 60.0 / per_minute
+            full_at = max(self._full_at.get(key, now), now)
+            # Room for one more token's worth of debt, up to `burst` tokens
+            wait = full_at + interval - now - burst * interval
+            if wait > 0:
+                self._stats["limited_ip" if key[0] == "ip" else "limited_user"] += 1
+                return key[0], wait
+            updates.append((key, full_at + interval))
+        for key, full_at in updates:
+            self._full_at[key] = full_at
+        self._stats["allowed"] += 1
+        return None, 0.0
+
+    def _sweep(self, now: float):
+        """Forget buckets that have refilled; if still near max_keys, drop the oldest."""
+        self._next_sweep = now + self.sweep_seconds
+        before = len(self._full_at)
+        self._full_at = {k: t for k, t in self._full_at.items() if t > now}
+        while len(self._full_at) > self.max_keys * 0.9:
+            del self._full_at[next(iter(self._full_at))]
+        self._stats["evictions"] += before - len(self._full_at)
+
+    def stats(self) -> dict:
+        return {"enabled": RATE_LIMIT_ENABLED, "keys": len(self._full_at), **self._stats}
+
+
+class AdmissionController:
+    """Sheds writes while the writer queue stays above its target delay (CoDel-style).
+
+    Writers report how long each write waited for the SQLite writer. The
+    minimum over an interval ignores short bursts; if even that is above
+    target, the backlog is standing and new writes are refused until an
+    interval passes with a short wait (or no queued writes at all).
+    """
+
+    def __init__(self, target_ms: float = ADMISSION_TARGET_MS, interval_ms: float = ADMISSION_INTERVAL_MS,
+                 retry_after: int = ADMISSION_RETRY_AFTER):
+        self.target = target_ms / 1000
+        self.interval = interval_ms / 1000
+        self.retry_after = retry_after
+        self.overloaded = False
+        self._window_end = time.monotonic() + self.interval
+        self._window_min = math.inf
+        self._stats = {"admitted": 0, "shed": 0, "overload_episodes": 0, "last_window_min_ms": 0.0}
+
+    def observe(self, delay: float):
+        """Record how long one write queued before it got the writer."""
+        self._roll(time.monotonic())
+        if delay < self._window_min:
+            self._window_min = delay
+
+    def _roll(self, now: float):
+        if now < self._window_end:
+            return
+        # No samples at all means nothing was queued: not overloaded
+        overloaded = self._window_min > self.target and self._window_min != math.inf
+        if overloaded and not self.overloaded:
+            self._stats["overload_episodes"] += 1
+        self.overloaded = overloaded
+        if self._window_min != math.inf:
+            self._stats["last_window_min_ms"] = round(self._window_min * 1000, 3)
+        self._window_min = math.inf
+        self._window_end = now + self.interval
+
+    def admit(self) -> bool:
+        self._roll(time.monotonic())
+        if self.overloaded:
+            self._stats["shed"] += 1
+            return False
+        self._stats["admitted"] += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"enabled": ADMISSION_ENABLED, "overloaded": self.overloaded,
+                "target_ms": self.target * 1000, **self._stats}
+
+
+limiter = RateLimiter()
+admission = AdmissionController()
+
+
+def write_guard(action: str):
+    """Dependency for a write route: require a user, then apply admission control and rate limits."""
+    per_minute, burst = USER_LIMITS[action]
+
+    async def guard(request: Request, user=Depends(require_user)) -> dict:
+        if ADMISSION_ENABLED and not admission.admit():
+            raise HTTPException(503, "Server is busy, try again shortly",
+                                headers={"Retry-After": str(admission.retry_after)})
+        if RATE_LIMIT_ENABLED:
+            limits = [((action, user["sub"]), per_minute, burst)]
+            ip = client_ip(request)
+            if ip:
+                limits.append((("ip", ip), IP_WRITE_RATE_PER_MIN, IP_WRITE_BURST))
+            scope, wait = limiter.take(limits)
+            if scope is not None:
+                raise HTTPException(429, "Too many requests, slow down",
+                                    headers={"Retry-After": str(max(1, math.ceil(wait)))})
+        return user
+
+    return guard
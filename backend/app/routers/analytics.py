@@ -0,0 +1,92 @@
+"""ES117 Backend — Instructor Analytics Routes"""
+import time
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+import aiosqlite
+
+from app.analytics import DAY, HOUR, MINUTE, bucket_start, day_start, local_day, series, timestamp
+from app.auth import require_user
+from app.cache import dumps, json_response
+from app.config import ANALYTICS_MAX_POINTS
+from app.database import get_db
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+GRAINS = {"minute": MINUTE, "hour": HOUR}
+
+POLL_EXISTS_SQL = "SELECT 1 FROM polls WHERE id = ?"
+# {grains}: one "?" per grain, comma-separated
+POLL_SPAN_SQL = """
+    SELECT MIN(bucket), MAX(bucket) FROM activity_rollups
+    WHERE grain IN ({grains}) AND kind = 'vote' AND scope = ?
+"""
+
+
+@router.get("/daily")
+async def daily(
+    days: int = Query(14, ge=1, le=366),
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Shoutouts, votes and unique active users per day, oldest first (login required, intended for instructors)."""
+    end = day_start(time.time()) + DAY
+    start = end - days * DAY
+    counts = await series(db, ("shoutout", "vote", "active_users"), 0, DAY, start, end)
+    body = {
+        "grain_seconds": DAY,
+        "days": [local_day(start + i * DAY) for i in range(days)],
+        "shoutouts": counts["shoutout"],
+        "votes": counts["vote"],
+        "active_users": counts["active_users"],
+    }
+    return json_response(dumps(body), {"Cache-Control": "no-cache"})
+
+
+@router.get("/activity")
+async def activity_series(
+    grain: Literal["minute", "hour"] = Query("minute"),
+    points: int = Query(60, ge=1, le=ANALYTICS_MAX_POINTS),
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Shoutouts and votes per minute or hour, up to now (login required, intended for instructors).
+
+    Minutes older than the rollup retention have been merged into hours
+    and read as zero at minute grain.
+    """
+    width = GRAINS[grain]
+    end = bucket_start(time.time(), width) + width
+    start = end - points * width
+    counts = await series(db, ("shoutout", "vote"), 0, width, start, end)
+    body = {"grain_seconds": width, "start": timestamp(start),
+            "shoutouts": counts["shoutout"], "votes": counts["vote"]}
+    return json_response(dumps(body), {"Cache-Control": "no-cache"})
+
+
+@router.get("/polls/{poll_id}")
+async def poll_activity(
+    poll_id: int,
+    grain: Literal["minute", "hour"] = Query("minute"),
+    points: int = Query(ANALYTICS_MAX_POINTS, ge=1, le=ANALYTICS_MAX_POINTS),
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Votes cast on one poll per minute or hour, up to its latest vote (login required, intended for instructors).
+
+    Covers at most the last `points` buckets; start is null if nobody has voted.
+    """
+    row = await db.execute(POLL_EXISTS_SQL, (poll_id,))
+    if not await row.fetchone():
+        raise HTTPException(404, "Poll not found")
+    width = GRAINS[grain]
+    grains = (MINUTE, HOUR) if width == HOUR else (MINUTE,)
+    row = await db.execute(POLL_SPAN_SQL.format(grains=",".join("?" * len(grains))), (*grains, poll_id))
+    first, last = await row.fetchone()
+    body = {"poll_id": poll_id, "grain_seconds": width, "start": None, "votes": [], "total": 0}
+    if first is not None:
+        end = bucket_start(last, width) + width
+        start = max(bucket_start(first, width), end - points * width)
+        votes = (await series(db, ("vote",), poll_id, width, start, end))["vote"]
+        body.update(start=timestamp(start), votes=votes, total=sum(votes))
+    return json_response(dumps(body), {"Cache-Control": "no-cache"})
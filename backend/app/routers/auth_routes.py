@@ -1,15 +1,24 @@
 """ES117 Backend — Auth Routes"""
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import RedirectResponse
-import aiosqlite
 
-from app.auth import get_google_login_url, exchange_code, create_jwt, get_current_user, require_user
+from app.auth import (
+    get_google_login_url, exchange_code, create_jwt, get_current_user, require_user,
+    get_cached_user, cache_user, invalidate_user,
+)
+from app.cache import response_cache
+from app.change_feed import change_feed
 from app.config import ALLOWED_DOMAIN, GOOGLE_CLIENT_ID
-from app.database import get_db
+from app.database import pool
 from app.models import UserOut, TokenOut
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+USER_BY_EMAIL_SQL = "SELECT id, name FROM users WHERE email = ?"
+UPDATE_PROFILE_SQL = "UPDATE users SET name = ?, picture = ? WHERE id = ?"
+INSERT_USER_SQL = "INSERT INTO users (email, name, picture) VALUES (?, ?, ?)"
+ME_SQL = "SELECT id, email, name, picture FROM users WHERE id = ?"
+
 
 @router.get("/login")
 async def login(redirect: str = ""):
@@ -21,7 +30,7 @@ async def login(redirect: str = ""):
 
 
 @router.get("/callback")
-async def callback(code: str, state: str = "", db: aiosqlite.Connection = Depends(get_db)):
+async def callback(code: str, state: str = ""):
     """Handle Google OAuth callback."""
     # Exchange code for user info
     user_info = await exchange_code(code)
@@ -33,19 +42,22 @@ async def callback(code: str, state: str = "", db: aiosqlite.Connection = Depend
     if not email.endswith(f"@{ALLOWED_DOMAIN}"):
         raise HTTPException(403, f"Only @{ALLOWED_DOMAIN} emails are allowed")
 
-    # Upsert user
-    existing = await db.execute("SELECT id FROM users WHERE email = ?", (email,))
-    row = await existing.fetchone()
-    if row:
-        user_id = row[0]
-        await db.execute("UPDATE users SET name = ?, picture = ? WHERE id = ?", (name, picture, user_id))
-    else:
-        cursor = await db.execute(
-            "INSERT INTO users (email, name, picture) VALUES (?, ?, ?)",
-            (email, name, picture)
-        )
-        user_id = cursor.lastrowid
-    await db.commit()
+    # Upsert user — the writer is taken only now, not across the Google round-trips
+    async with pool.writer() as db:
+        existing = await db.execute(USER_BY_EMAIL_SQL, (email,))
+        row = await existing.fetchone()
+        if row:
+            user_id = row[0]
+            await db.execute(UPDATE_PROFILE_SQL, (name, picture, user_id))
+        else:
+            cursor = await db.execute(INSERT_USER_SQL, (email, name, picture))
+            user_id = cursor.lastrowid
+        await db.commit()
+    invalidate_user(user_id)
+    if row and row[1] != name:
+        # Shoutout pages show the author's name
+        response_cache.invalidate("shoutouts")
+    change_feed.record("user", user_id)
 
     # Create JWT
     token = create_jwt(user_id, email)
@@ -56,10 +68,18 @@ async def callback(code: str, state: str = "", db: aiosqlite.Connection = Depend
 
 
 @router.get("/me", response_model=UserOut)
-async def me(user=Depends(require_user), db: aiosqlite.Connection = Depends(get_db)):
+async def me(user=Depends(require_user)):
     """Get current user info."""
-    row = await db.execute("SELECT id, email, name, picture FROM users WHERE id = ?", (int(user["sub"]),))
-    u = await row.fetchone()
+    user_id = int(user["sub"])
+    cached = get_cached_user(user_id)
+    if cached:
+        return UserOut(**cached)
+    # A reader is checked out only on a cache miss
+    async with pool.reader() as db:
+        row = await db.execute(ME_SQL, (user_id,))
+        u = await row.fetchone()
     if not u:
         raise HTTPException(404, "User not found")
-    return UserOut(id=u[0], email=u[1], name=u[2], picture=u[3])
+    out = UserOut(id=u[0], email=u[1], name=u[2], picture=u[3])
+    cache_user(out.model_dump())
+    return out
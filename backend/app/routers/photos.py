@@ -0,0 +1,137 @@
+"""ES117 Backend — Team Photo Routes"""
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+
+from app.auth import require_user
+from app.cache import response_cache, dumps, json_response
+from app.config import PHOTOS_PAGE_DEFAULT, PHOTOS_PAGE_MAX
+from app.database import pool
+from app.etags import etag_matches, not_modified
+from app.events import hub
+from app.models import PhotoOut
+from app.photos import (
+    MEDIA_TYPES, file_path, original_name, variant_name, photo_pipeline, receive_upload,
+)
+
+router = APIRouter(tags=["photos"])
+
+TEAM_ID = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+FILES_URL = "/api/photos/files"
+
+PHOTO_COLUMNS = "id, team_id, sha256, content_type, caption, has_variants, width, height, created_at"
+# {where}: any of "team_id = ?" and "id < ?", ANDed
+PAGE_SQL = f"""
+    SELECT {PHOTO_COLUMNS} FROM photos
+    {{where}}
+    ORDER BY id DESC
+    LIMIT ?
+"""
+INSERT_SQL = """
+    INSERT INTO photos (team_id, user_id, sha256, content_type, size, caption, has_variants)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(team_id, sha256) DO NOTHING
+"""
+UPLOADED_SQL = f"SELECT {PHOTO_COLUMNS} FROM photos WHERE team_id = ? AND sha256 = ?"
+
+
+def _photo(r) -> PhotoOut:
+    original = f"{FILES_URL}/{original_name(r[2], r[3])}"
+    ready = bool(r[5])
+    return PhotoOut(
+        id=r[0], team_id=r[1], caption=r[4] or "",
+        thumb_url=f"{FILES_URL}/{variant_name(r[2], 'thumb')}" if ready else original,
+        full_url=f"{FILES_URL}/{variant_name(r[2], 'web')}" if ready else original,
+        original_url=original,
+        width=r[6], height=r[7], created_at=r[8],
+    )
+
+
+async def _list_photos(key, team_id: str | None, before: int | None, limit: int):
+    cached = response_cache.get("photos", key)
+    if cached is None:
+        generation = response_cache.generation("photos")
+        where, params = [], []
+        if team_id is not None:
+            where.append("team_id = ?")
+            params.append(team_id)
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        async with pool.reader() as db:
+            rows = await db.execute(PAGE_SQL.format(where="WHERE " + " AND ".join(where) if where else ""),
+                                    (*params, limit))
+            results = await rows.fetchall()
+        cached = dumps([_photo(r).model_dump() for r in results])
+        response_cache.put("photos", key, cached, generation)
+    return json_response(cached, {"Cache-Control": "no-cache"})
+
+
+@router.get("/api/teams/{team_id}/photos", response_model=list[PhotoOut])
+async def list_team_photos(
+    team_id: str,
+    before: int | None = Query(None, description="Only photos with id < before (next page)"),
+    limit: int = Query(PHOTOS_PAGE_DEFAULT, ge=1, le=PHOTOS_PAGE_MAX),
+):
+    """A team's photos, newest first, keyset-paginated by id."""
+    return await _list_photos(("team", team_id, before, limit), team_id, before, limit)
+
+
+@router.get("/api/photos/all", response_model=list[PhotoOut])
+async def list_all_photos(
+    team: str | None = Query(None, description="Only this team's photos"),
+    before: int | None = Query(None, description="Only photos with id < before (next page)"),
+    limit: int = Query(PHOTOS_PAGE_DEFAULT, ge=1, le=PHOTOS_PAGE_MAX),
+):
+    """Gallery of every team's photos, newest first, keyset-paginated by id."""
+    return await _list_photos(("all", team, before, limit), team, before, limit)
+
+
+@router.post("/api/teams/{team_id}/photos", response_model=PhotoOut, status_code=201)
+async def upload_photo(team_id: str, request: Request, response: Response, user=Depends(require_user)):
+    """Upload a team photo (multipart field "file", optional "caption"; login required).
+
+    Re-uploading a photo the team already has returns the existing one with 200.
+    """
+    if not TEAM_ID.match(team_id):
+        raise HTTPException(404, "Unknown team")
+    upload = await receive_upload(request)
+    photo_pipeline.record_upload(upload)
+    caption = upload.fields.get("caption", "").strip()[:200]
+    has_variants = photo_pipeline.variants_ready(upload.digest)
+
+    async with pool.writer() as db:
+        cursor = await db.execute(INSERT_SQL, (team_id, int(user["sub"]), upload.digest, upload.media_type, upload.size, caption, has_variants))
+        created = cursor.rowcount == 1
+        await db.commit()
+        row = await db.execute(UPLOADED_SQL, (team_id, upload.digest))
+        photo = _photo(await row.fetchone())
+
+    if created:
+        response_cache.invalidate("photos")
+        hub.publish("photo.created", photo.model_dump())
+    else:
+        response.status_code = 200
+    if not has_variants:
+        photo_pipeline.schedule(upload.digest, upload.media_type)
+    return photo
+
+
+@router.api_route("/api/photos/files/{name}", methods=["GET", "HEAD"], include_in_schema=False)
+async def photo_file(name: str, request: Request):
+    """Serve a stored photo. Names are content hashes, so responses never change."""
+    path = file_path(name)
+    if path is None:
+        raise HTTPException(404, "Photo not found")
+    etag = f'"{name.rsplit(".", 1)[0]}"'
+    if etag_matches(request, etag):
+        return not_modified(etag, IMMUTABLE)
+    if not path.is_file():
+        raise HTTPException(404, "Photo not found")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[path.suffix],
+        headers={"ETag": etag, "Cache-Control": IMMUTABLE},
+    )
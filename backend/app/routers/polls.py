@@ -1,54 +1,230 @@
 """ES117 Backend — Polls Routes"""
-from fastapi import APIRouter, Depends, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 import aiosqlite
 
+from app.analytics import activity
 from app.auth import get_current_user, require_user
-from app.database import get_db
-from app.models import PollCreate, PollOut, PollOptionOut, VoteCreate
+from app.cache import response_cache, dumps, json_response
+from app.config import POLL_BULK_MAX
+from app.database import get_db, pool
+from app.events import hub
+from app.models import PollBulkCreate, PollCreate, PollOut, VoteCreate
+from app.ratelimit import write_guard
+from app.tallies import PollClosed, apply_votes, announce_tallies, open_polls, snapshot_poll
+from app.vote_queue import vote_writer
 
 router = APIRouter(prefix="/api/polls", tags=["polls"])
 
+POLL_OPTIONS_MAX = 20
+# Rows per multi-row INSERT (two variables each, far below SQLite's limit)
+INSERT_CHUNK = 400
+
+# {where}: "is_active = 1" (the active list) or "id = ?" (one poll)
+POLLS_SQL = "SELECT id, question, is_active, created_at FROM polls WHERE {where} ORDER BY created_at DESC"
+OPTIONS_SQL = """
+    SELECT poll_id, id, text, vote_count FROM poll_options
+    WHERE poll_id IN (SELECT value FROM json_each(?)) ORDER BY id
+"""
+USER_VOTES_SQL = """
+    SELECT poll_id, option_id FROM poll_votes
+    WHERE user_id = ? AND poll_id IN (SELECT value FROM json_each(?))
+"""
+SNAPSHOT_SQL = "SELECT data FROM poll_snapshots WHERE poll_id = ?"
+# {where}: "WHERE poll_id < ?" after the first page
+CLOSED_PAGE_SQL = "SELECT data FROM poll_snapshots {where} ORDER BY poll_id DESC LIMIT ?"
+VOTE_TARGET_SQL = """
+    SELECT p.is_active, po.id
+    FROM polls p
+    LEFT JOIN poll_options po ON po.id = ? AND po.poll_id = p.id
+    WHERE p.id = ?
+"""
+CLOSE_SQL = "UPDATE polls SET is_active = 0 WHERE id = ?"
+REOPEN_CHECK_SQL = """
+    SELECT p.is_active, s.compacted
+    FROM polls p LEFT JOIN poll_snapshots s ON s.poll_id = p.id
+    WHERE p.id = ?
+"""
+REOPEN_SQL = "UPDATE polls SET is_active = 1 WHERE id = ?"
+DROP_SNAPSHOT_SQL = "DELETE FROM poll_snapshots WHERE poll_id = ?"
+
+
+async def _fetch_polls(db: aiosqlite.Connection, where: str, params: tuple, user_id: int | None) -> list[dict]:
+    """Load polls matching `where` plus their tallies and the caller's votes in three queries."""
+    polls_rows = await db.execute(POLLS_SQL.format(where=where), params)
+    polls = await polls_rows.fetchall()
+    if not polls:
+        return []
+    poll_ids = json.dumps([p[0] for p in polls])
+
+    opts_rows = await db.execute(OPTIONS_SQL, (poll_ids,))
+    opts = await opts_rows.fetchall()
+
+    votes = await _user_votes(db, user_id, poll_ids) if user_id is not None else {}
+    return _hydrate_polls(polls, opts, votes)
+
+
+async def _user_votes(db: aiosqlite.Connection, user_id: int, poll_ids: str) -> dict[int, int]:
+    """Map poll id -> option the user voted for, for a JSON array of poll ids."""
+    vote_rows = await db.execute(USER_VOTES_SQL, (user_id, poll_ids))
+    return {v[0]: v[1] for v in await vote_rows.fetchall()}
+
+
+async def _cached_polls(db: aiosqlite.Connection, key, where: str, params: tuple, single: bool = False):
+    """Shared (user-independent) poll payload, its serialized body and event id, via the response cache.
+
+    The event id is the stream's position when the read started: a client
+    that resumes /api/stream from it sees every tally committed after.
+    """
+    cached = response_cache.get("polls", key)
+    if cached is None:
+        generation, event_id = response_cache.generation("polls"), hub.last_id
+        payload = await _fetch_polls(db, where, params, None)
+        body = dumps(payload[0] if single and payload else payload)
+        cached = (payload, body, event_id)
+        response_cache.put("polls", key, cached, generation)
+    return cached
+
+
+async def _overlay_user_votes(db: aiosqlite.Connection, payload: list[dict], user_id: int) -> list[dict]:
+    """Copy the shared payload with this user's voted option filled in."""
+    if not payload:
+        return payload
+    votes = await _user_votes(db, user_id, json.dumps([p["id"] for p in payload]))
+    return [{**p, "user_voted_option": votes.get(p["id"])} for p in payload]
+
+
+async def _cached_snapshot(db: aiosqlite.Connection, poll_id: int) -> bytes | None:
+    """A closed poll's frozen results (one primary-key read), or None while it is open."""
+    cached = response_cache.get("polls", ("snapshot", poll_id))
+    if cached is None:
+        generation = response_cache.generation("polls")
+        row = await db.execute(SNAPSHOT_SQL, (poll_id,))
+        snapshot = await row.fetchone()
+        cached = snapshot[0] if snapshot else b""
+        response_cache.put("polls", ("snapshot", poll_id), cached, generation)
+    return cached or None
+
+
+def _hydrate_polls(polls, opts, votes: dict[int, int]) -> list[dict]:
+    """Assemble PollOut-shaped dicts from bulk-fetched poll, option and vote rows.
+
+    Plain dicts in model field order: the routes encode them directly, so
+    they skip building and re-validating thousands of Pydantic objects.
+    """
+    options: dict[int, list[dict]] = {p[0]: [] for p in polls}
+    for o in opts:
+        options[o[0]].append({"id": o[1], "text": o[2], "votes": o[3]})
+    return [
+        {"id": p[0], "question": p[1], "is_active": bool(p[2]),
+         "options": options[p[0]], "user_voted_option": votes.get(p[0]), "created_at": p[3]}
+        for p in polls
+    ]
+
 
 @router.get("", response_model=list[PollOut])
 async def list_polls(
     user=Depends(get_current_user),
     db: aiosqlite.Connection = Depends(get_db),
 ):
-    """Get all active polls with vote counts (public)."""
-    polls_rows = await db.execute(
-        "SELECT id, question, is_active, created_at FROM polls WHERE is_active = 1 ORDER BY created_at DESC"
-    )
-    polls = await polls_rows.fetchall()
-    result = []
-    for p in polls:
-        poll_id = p[0]
-        # Get options with vote counts
-        opts_rows = await db.execute("""
-            SELECT po.id, po.text, COUNT(pv.id) as votes
-            FROM poll_options po
-            LEFT JOIN poll_votes pv ON po.id = pv.option_id
-            WHERE po.poll_id = ?
-            GROUP BY po.id
-        """, (poll_id,))
-        opts = await opts_rows.fetchall()
-        options = [PollOptionOut(id=o[0], text=o[1], votes=o[2]) for o in opts]
-
-        # Check if current user already voted
-        user_voted = None
-        if user:
-            vote_row = await db.execute(
-                "SELECT option_id FROM poll_votes WHERE poll_id = ? AND user_id = ?",
-                (poll_id, int(user["sub"]))
-            )
-            v = await vote_row.fetchone()
-            if v:
-                user_voted = v[0]
-
-        result.append(PollOut(
-            id=poll_id, question=p[1], is_active=bool(p[2]),
-            options=options, user_voted_option=user_voted, created_at=p[3]
-        ))
-    return result
+    """Get all active polls with vote counts (public).
+
+    X-Event-Id is the live stream position to resume from (as Last-Event-ID).
+    """
+    payload, body, event_id = await _cached_polls(db, "active", "is_active = 1", ())
+    headers = {"X-Event-Id": str(event_id)}
+    if not user:
+        return json_response(body, headers)
+    return json_response(dumps(await _overlay_user_votes(db, payload, int(user["sub"]))), headers)
+
+
+@router.get("/closed", response_model=list[PollOut])
+async def list_closed_polls(
+    before: int | None = Query(None, description="Only polls with id < before (next page)"),
+    limit: int = Query(50, ge=1, le=200),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Get closed polls with their final results, newest first (public)."""
+    key = ("closed", before, limit)
+    body = response_cache.get("polls", key)
+    if body is None:
+        generation = response_cache.generation("polls")
+        where, params = ("WHERE poll_id < ?", (before,)) if before is not None else ("", ())
+        rows = await db.execute(CLOSED_PAGE_SQL.format(where=where), (*params, limit))
+        # Snapshots are stored encoded: the page is just their concatenation
+        body = b"[" + b",".join(r[0] for r in await rows.fetchall()) + b"]"
+        response_cache.put("polls", key, body, generation)
+    return json_response(body)
+
+
+@router.get("/{poll_id}", response_model=PollOut)
+async def get_poll(
+    poll_id: int,
+    user=Depends(get_current_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Get a single poll with vote counts (public).
+
+    Closed polls are served from their snapshot, without the caller's vote.
+    """
+    snapshot = await _cached_snapshot(db, poll_id)
+    if snapshot is not None:
+        return json_response(snapshot)
+    payload, body, _ = await _cached_polls(db, ("poll", poll_id), "id = ?", (poll_id,), single=True)
+    if not payload:
+        raise HTTPException(404, "Poll not found")
+    if not user:
+        return json_response(body)
+    return json_response(dumps((await _overlay_user_votes(db, payload, int(user["sub"])))[0]))
+
+
+def _poll_errors(poll: PollCreate) -> list[str]:
+    """What is wrong with a poll to be created (empty if nothing)."""
+    errors = []
+    if not 1 <= len(poll.question.strip()) <= 500:
+        errors.append("Question must be 1-500 characters")
+    if not 2 <= len(poll.options) <= POLL_OPTIONS_MAX:
+        errors.append(f"Poll needs 2-{POLL_OPTIONS_MAX} options")
+    if any(not 1 <= len(o.text.strip()) <= 200 for o in poll.options):
+        errors.append("Options must be 1-200 characters")
+    return errors
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def _insert_polls(db: aiosqlite.Connection, polls: list[PollCreate]) -> list[dict]:
+    """Insert polls and their options with multi-row INSERT ... RETURNING; caller commits.
+
+    Returns PollOut-shaped dicts in input order. executemany discards
+    RETURNING rows, so each chunk is one multi-row statement instead;
+    AUTOINCREMENT ids rise in insertion order, so sorting the returned
+    rows by id lines them up with the input.
+    """
+    created = []
+    for chunk in _chunks(polls, INSERT_CHUNK):
+        rows = await db.execute_fetchall(
+            f"INSERT INTO polls (question) VALUES {', '.join(['(?)'] * len(chunk))} RETURNING id, created_at",
+            [p.question.strip() for p in chunk]
+        )
+        for poll, (poll_id, created_at) in zip(chunk, sorted(rows, key=lambda r: r[0])):
+            created.append({"id": poll_id, "question": poll.question.strip(), "is_active": True,
+                            "options": [], "user_voted_option": None, "created_at": created_at})
+
+    by_id = {p["id"]: p for p in created}
+    options = [(c["id"], o.text.strip()) for c, poll in zip(created, polls) for o in poll.options]
+    for chunk in _chunks(options, INSERT_CHUNK):
+        rows = await db.execute_fetchall(
+            f"INSERT INTO poll_options (poll_id, text) VALUES {', '.join(['(?, ?)'] * len(chunk))} "
+            "RETURNING id, poll_id, text",
+            [v for option in chunk for v in option]
+        )
+        for option_id, poll_id, text in sorted(rows, key=lambda r: r[0]):
+            by_id[poll_id]["options"].append({"id": option_id, "text": text, "votes": 0})
+    return created
 
 
 @router.post("", response_model=PollOut, status_code=201)
@@ -58,69 +234,124 @@ async def create_poll(
     db: aiosqlite.Connection = Depends(get_db),
 ):
     """Create a new poll (login required, intended for instructors)."""
-    if len(data.options) < 2:
-        raise HTTPException(400, "Poll needs at least 2 options")
-
-    cursor = await db.execute("INSERT INTO polls (question) VALUES (?)", (data.question,))
-    poll_id = cursor.lastrowid
-    for opt in data.options:
-        await db.execute(
-            "INSERT INTO poll_options (poll_id, text) VALUES (?, ?)",
-            (poll_id, opt.text)
-        )
+    errors = _poll_errors(data)
+    if errors:
+        raise HTTPException(400, errors[0])
+
+    (poll,) = await _insert_polls(db, [data])
     await db.commit()
+    response_cache.invalidate("polls")
+    hub.publish("poll.created", poll)
+    return poll
 
-    # Return created poll
-    opts_rows = await db.execute("SELECT id, text FROM poll_options WHERE poll_id = ?", (poll_id,))
-    opts = await opts_rows.fetchall()
-    return PollOut(
-        id=poll_id, question=data.question, is_active=True,
-        options=[PollOptionOut(id=o[0], text=o[1], votes=0) for o in opts],
-        created_at="", user_voted_option=None
-    )
+
+@router.post("/bulk", response_model=list[PollOut], status_code=201)
+async def create_polls_bulk(
+    data: PollBulkCreate,
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Create many polls at once, all or nothing (login required, intended for instructors).
+
+    Every poll is validated before anything is written; any problem
+    rejects the whole batch with a 400 listing each bad poll by index.
+    """
+    if not 1 <= len(data.polls) <= POLL_BULK_MAX:
+        raise HTTPException(400, f"Send 1-{POLL_BULK_MAX} polls")
+    problems = [{"index": i, "errors": errors} for i, p in enumerate(data.polls) if (errors := _poll_errors(p))]
+    if problems:
+        raise HTTPException(400, problems)
+
+    polls = await _insert_polls(db, data.polls)
+    await db.commit()
+    response_cache.invalidate("polls")
+    for poll in polls:
+        hub.publish("poll.created", poll)
+    return json_response(dumps(polls), status_code=201)
 
 
 @router.post("/{poll_id}/vote")
 async def vote(
     poll_id: int,
     data: VoteCreate,
-    user=Depends(require_user),
-    db: aiosqlite.Connection = Depends(get_db),
+    user=Depends(write_guard("vote")),
 ):
     """Vote on a poll (login required, one vote per user)."""
     user_id = int(user["sub"])
 
-    # Verify poll exists and is active
-    poll = await db.execute("SELECT is_active FROM polls WHERE id = ?", (poll_id,))
-    p = await poll.fetchone()
+    # Verify poll exists, is active and owns the option. This runs on a
+    # reader that is released before the write, so queued votes don't pin
+    # pool connections while they wait for their batch.
+    async with pool.reader() as db:
+        row = await db.execute(VOTE_TARGET_SQL, (data.option_id, poll_id))
+        p = await row.fetchone()
     if not p:
         raise HTTPException(404, "Poll not found")
     if not p[0]:
         raise HTTPException(400, "Poll is closed")
-
-    # Verify option belongs to poll
-    opt = await db.execute(
-        "SELECT id FROM poll_options WHERE id = ? AND poll_id = ?",
-        (data.option_id, poll_id)
-    )
-    if not await opt.fetchone():
+    if p[1] is None:
         raise HTTPException(400, "Invalid option for this poll")
 
-    # Check if already voted
-    existing = await db.execute(
-        "SELECT id FROM poll_votes WHERE poll_id = ? AND user_id = ?",
-        (poll_id, user_id)
-    )
-    if await existing.fetchone():
-        # Update vote
-        await db.execute(
-            "UPDATE poll_votes SET option_id = ? WHERE poll_id = ? AND user_id = ?",
-            (data.option_id, poll_id, user_id)
-        )
-    else:
-        await db.execute(
-            "INSERT INTO poll_votes (poll_id, option_id, user_id) VALUES (?, ?, ?)",
-            (poll_id, data.option_id, user_id)
-        )
-    await db.commit()
+    try:
+        if vote_writer.running:
+            # Group-committed with other votes; returns once the batch is durable
+            await vote_writer.submit(poll_id, data.option_id, user_id)
+        else:
+            async with pool.writer() as db:
+                if not await open_polls(db, [poll_id]):
+                    raise PollClosed()
+                deltas, first = await apply_votes(db, [(poll_id, data.option_id, user_id)])
+                await activity.record(db, "vote", [(p, u) for p, _, u in first])
+                await db.commit()
+            announce_tallies(deltas)
+    except PollClosed:
+        raise HTTPException(400, "Poll is closed")
     return {"status": "ok", "voted": data.option_id}
+
+
+@router.post("/{poll_id}/close", response_model=PollOut)
+async def close_poll(
+    poll_id: int,
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Close a poll and freeze its final results (login required, intended for instructors).
+
+    Votes still queued for the poll are rejected once it closes. Closing
+    a closed poll returns its existing snapshot.
+    """
+    row = await db.execute(SNAPSHOT_SQL, (poll_id,))
+    existing = await row.fetchone()
+    if existing:
+        return json_response(existing[0])
+    snapshot = await snapshot_poll(db, poll_id)
+    if snapshot is None:
+        raise HTTPException(404, "Poll not found")
+    await db.execute(CLOSE_SQL, (poll_id,))
+    await db.commit()
+    response_cache.invalidate("polls")
+    hub.publish("poll.closed", snapshot)
+    return json_response(dumps(snapshot))
+
+
+@router.post("/{poll_id}/reopen", response_model=PollOut)
+async def reopen_poll(
+    poll_id: int,
+    user=Depends(require_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Reopen a closed poll for voting (login required, intended for instructors)."""
+    row = await db.execute(REOPEN_CHECK_SQL, (poll_id,))
+    p = await row.fetchone()
+    if not p:
+        raise HTTPException(404, "Poll not found")
+    if p[1]:
+        raise HTTPException(409, "Poll votes were archived; it can't be reopened")
+    if not p[0]:
+        await db.execute(REOPEN_SQL, (poll_id,))
+        await db.execute(DROP_SNAPSHOT_SQL, (poll_id,))
+        await db.commit()
+        response_cache.invalidate("polls")
+        hub.publish("poll.reopened", {"poll_id": poll_id})
+    payload, _, _ = await _cached_polls(db, ("poll", poll_id), "id = ?", (poll_id,), single=True)
+    return json_response(dumps((await _overlay_user_votes(db, payload, int(user["sub"])))[0]))
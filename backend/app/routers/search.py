@@ -0,0 +1,36 @@
+"""ES117 Backend — Search Routes"""
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+import aiosqlite
+
+from app.cache import dumps, json_response
+from app.config import SEARCH_PAGE_DEFAULT, SEARCH_PAGE_MAX, SEARCH_MAX_OFFSET
+from app.database import get_db
+from app.search import fts_query, search_shoutouts, search_teams
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+SEARCHES = {"shoutouts": search_shoutouts, "teams": search_teams}
+
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for"),
+    scope: Literal["all", "shoutouts", "teams"] = Query("all"),
+    limit: int = Query(SEARCH_PAGE_DEFAULT, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Search shoutouts and teams, best match first (public).
+
+    Each section carries next_offset for its next page (null on the last).
+    """
+    match = fts_query(q)
+    body = {"query": q}
+    for name, run in SEARCHES.items():
+        if scope not in ("all", name):
+            continue
+        results = await run(db, match, limit, offset) if match else []
+        body[name] = {"results": results[:limit], "next_offset": offset + limit if len(results) > limit else None}
+    return json_response(dumps(body), {"Cache-Control": "no-cache"})
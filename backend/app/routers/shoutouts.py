@@ -1,34 +1,115 @@
 """ES117 Backend — Shoutout Wall Routes"""
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 import aiosqlite
 
-from app.auth import get_current_user, require_user
-from app.database import get_db
+from app.analytics import activity
+from app.auth import get_current_user
+from app.cache import response_cache, dumps, json_response
+from app.config import SHOUTOUTS_PAGE_DEFAULT, SHOUTOUTS_PAGE_MAX, SHOUTOUTS_STREAM_CHUNK
+from app.database import get_db, pool
+from app.etags import etag_matches, not_modified
+from app.events import hub
 from app.models import ShoutoutCreate, ShoutoutOut
+from app.ratelimit import write_guard
 
 router = APIRouter(prefix="/api/shoutouts", tags=["shoutouts"])
 
+# {where}: any of "s.id < ?" and "s.id > ?", ANDed
+PAGE_SQL = """
+    SELECT s.id, s.message, u.name, s.created_at
+    FROM shoutouts s
+    LEFT JOIN users u ON s.user_id = u.id
+    {where}
+    ORDER BY s.id DESC
+    LIMIT ?
+"""
+INSERT_SQL = "INSERT INTO shoutouts (message, user_id) VALUES (?, ?)"
+CREATED_SQL = """
+    SELECT s.id, s.message, u.name, s.created_at
+    FROM shoutouts s JOIN users u ON s.user_id = u.id
+    WHERE s.id = ?
+"""
+
+
+def _row(r) -> dict:
+    """A ShoutoutOut-shaped dict straight from a (id, message, author_name, created_at) row."""
+    return {"id": r[0], "message": r[1], "author_name": r[2], "created_at": r[3]}
+
+
+async def _select(db: aiosqlite.Connection, before: int | None, since: int | None, limit: int) -> list:
+    """Shoutout rows newest first with id < before and id > since."""
+    where, params = [], []
+    if before is not None:
+        where.append("s.id < ?")
+        params.append(before)
+    if since is not None:
+        where.append("s.id > ?")
+        params.append(since)
+    rows = await db.execute(PAGE_SQL.format(where="WHERE " + " AND ".join(where) if where else ""), (*params, limit))
+    return await rows.fetchall()
+
 
 @router.get("", response_model=list[ShoutoutOut])
-async def list_shoutouts(db: aiosqlite.Connection = Depends(get_db)):
-    """Get all shoutouts (public, no auth needed)."""
-    rows = await db.execute("""
-        SELECT s.id, s.message, u.name, s.created_at
-        FROM shoutouts s
-        LEFT JOIN users u ON s.user_id = u.id
-        ORDER BY s.created_at DESC
-    """)
-    results = await rows.fetchall()
-    return [
-        ShoutoutOut(id=r[0], message=r[1], author_name=r[2], created_at=r[3])
-        for r in results
-    ]
+async def list_shoutouts(
+    request: Request,
+    before: int | None = Query(None, description="Only shoutouts with id < before (next page)"),
+    since: int | None = Query(None, description="Only shoutouts with id > since (delta refresh)"),
+    limit: int = Query(SHOUTOUTS_PAGE_DEFAULT, ge=1, le=SHOUTOUTS_PAGE_MAX),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    """Get shoutouts newest first, keyset-paginated by id (public, no auth needed)."""
+    key = (before, since, limit)
+    cached = response_cache.get("shoutouts", key)
+    if cached is None:
+        generation = response_cache.generation("shoutouts")
+        body = dumps([_row(r) for r in await _select(db, before, since, limit)])
+        # From the body, so a renamed author changes it as well as a new shoutout
+        etag = f'"s{hashlib.sha256(body).hexdigest()[:20]}"'
+        cached = (etag, body)
+        response_cache.put("shoutouts", key, cached, generation)
+
+    etag, body = cached
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(body, {"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@router.get("/ndjson")
+async def stream_shoutouts(
+    before: int | None = Query(None, description="Only shoutouts with id < before"),
+    since: int | None = Query(None, description="Only shoutouts with id > since"),
+    limit: int | None = Query(None, ge=1, description="Stop after this many (default: all)"),
+):
+    """Stream shoutouts newest first as NDJSON, one object per line (public).
+
+    Rows are read in keyset chunks, each on a reader that is released
+    before the chunk is sent, so a slow client never holds a connection.
+    Shoutouts are append-only, so chunks fit together without gaps.
+    """
+    async def lines():
+        cursor, remaining = before, limit
+        while remaining is None or remaining > 0:
+            size = SHOUTOUTS_STREAM_CHUNK if remaining is None else min(remaining, SHOUTOUTS_STREAM_CHUNK)
+            async with pool.reader() as db:
+                rows = await _select(db, cursor, since, size)
+            if rows:
+                yield b"".join([dumps(_row(r)) + b"\n" for r in rows])
+            if len(rows) < size:
+                return
+            cursor = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
 
 
 @router.post("", response_model=ShoutoutOut, status_code=201)
 async def create_shoutout(
     data: ShoutoutCreate,
-    user=Depends(require_user),
+    user=Depends(write_guard("shoutout")),
     db: aiosqlite.Connection = Depends(get_db),
 ):
     """Post a new shoutout (login required)."""
@@ -37,17 +118,13 @@ async def create_shoutout(
         raise HTTPException(400, "Message must be 1-500 characters")
 
     user_id = int(user["sub"])
-    cursor = await db.execute(
-        "INSERT INTO shoutouts (message, user_id) VALUES (?, ?)",
-        (msg, user_id)
-    )
+    cursor = await db.execute(INSERT_SQL, (msg, user_id))
+    await activity.record(db, "shoutout", [(0, user_id)])
     await db.commit()
+    response_cache.invalidate("shoutouts")
 
     # Fetch the created row
-    row = await db.execute("""
-        SELECT s.id, s.message, u.name, s.created_at
-        FROM shoutouts s JOIN users u ON s.user_id = u.id
-        WHERE s.id = ?
-    """, (cursor.lastrowid,))
-    r = await row.fetchone()
-    return ShoutoutOut(id=r[0], message=r[1], author_name=r[2], created_at=r[3])
+    row = await db.execute(CREATED_SQL, (cursor.lastrowid,))
+    shoutout = _row(await row.fetchone())
+    hub.publish("shoutout.created", shoutout)
+    return shoutout
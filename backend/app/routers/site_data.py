@@ -0,0 +1,21 @@
+"""ES117 Backend — Static Site Data Routes"""
+from fastapi import APIRouter, HTTPException, Request
+
+from app.static_data import static_data
+
+router = APIRouter(prefix="/api/data", tags=["site-data"])
+
+
+@router.get("")
+async def list_site_data():
+    """Names of the JSON files served under /api/data."""
+    return static_data.names()
+
+
+@router.api_route("/{name:path}", methods=["GET", "HEAD"])
+async def site_data(name: str, request: Request):
+    """Serve a site JSON file (e.g. teams.json, updates/week01.json, site-config.json)."""
+    asset = static_data.get(name)
+    if asset is None:
+        raise HTTPException(404, "No such data file")
+    return static_data.respond(request, asset)
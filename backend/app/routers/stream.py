@@ -0,0 +1,57 @@
+"""ES117 Backend — Live Event Stream (Server-Sent Events)"""
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import STREAM_HEARTBEAT_SECONDS, STREAM_MAX_CLIENTS
+from app.events import hub
+
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+
+def _frame(event_id: int, event: str, data: str) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+async def _event_stream(request: Request, sub, backlog):
+    """Yield SSE frames for one client until it disconnects or is dropped."""
+    try:
+        yield "retry: 3000\n\n"
+        if backlog is None:
+            # Missed events are no longer buffered — tell the client to refetch
+            yield _frame(hub.last_id, "reset", "{}")
+        else:
+            for item in backlog:
+                yield _frame(*item)
+        while True:
+            try:
+                item = await asyncio.wait_for(sub.queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if item is None:
+                break
+            yield _frame(*item)
+    finally:
+        hub.unsubscribe(sub)
+
+
+@router.get("")
+async def stream(request: Request):
+    """Push shoutout and poll events as they happen (public)."""
+    if hub.stats()["clients"] >= STREAM_MAX_CLIENTS:
+        raise HTTPException(503, "Too many live clients, try again later")
+    last_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    sub, backlog = hub.subscribe(last_id)
+    return StreamingResponse(
+        _event_stream(request, sub, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,73 @@
+"""ES117 Backend — Team Directory Routes"""
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.cache import dumps, json_response
+from app.config import TEAMS_PAGE_DEFAULT, TEAMS_PAGE_MAX
+from app.etags import etag_matches, not_modified
+from app.teams import team_directory
+
+router = APIRouter(prefix="/api/teams", tags=["teams"])
+
+
+def _fields(fields: str | None) -> tuple[str, ...] | None:
+    """Parse a fields= projection ("id" always comes first); 400 on names no team has."""
+    if not fields:
+        return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in team_directory.fields and n != "id"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown team field(s): {', '.join(unknown)}")
+    return ("id", *(n for n in names if n != "id"))
+
+
+def _etag() -> str:
+    return f'"teams-{team_directory.etag}"'
+
+
+@router.get("")
+async def list_teams(
+    request: Request,
+    type: str | None = Query(None, max_length=20, description="hardware or software"),
+    phase: int | None = Query(None, ge=0, description="currentPhase"),
+    idea_locked: bool | None = Query(None),
+    funding_needed: bool | None = Query(None),
+    fields: str | None = Query(None, max_length=300, description="Comma-separated fields to return"),
+    limit: int = Query(TEAMS_PAGE_DEFAULT, ge=1, le=TEAMS_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+):
+    """Teams matching every given filter, in teams.json order (public).
+
+    next_offset is null on the last page.
+    """
+    projection = _fields(fields)
+    etag = _etag()
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    positions = team_directory.select(
+        type=type, currentPhase=phase, ideaLocked=idea_locked, fundingNeeded=funding_needed,
+    )
+    page = positions[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(positions) else None
+    # Splice the pre-encoded teams into the envelope instead of re-encoding them
+    body = b"".join((
+        b'{"teams":[', b",".join(team_directory.body(p, projection) for p in page),
+        b'],"total":', dumps(len(positions)), b',"next_offset":', dumps(next_offset), b"}",
+    ))
+    return json_response(body, {"ETag": etag, "Cache-Control": "no-cache"})
+
+
+@router.get("/{team_id}")
+async def get_team(
+    team_id: str,
+    request: Request,
+    fields: str | None = Query(None, max_length=300, description="Comma-separated fields to return"),
+):
+    """One team (public)."""
+    projection = _fields(fields)
+    position = team_directory.get(team_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    etag = _etag()
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(team_directory.body(position, projection), {"ETag": etag, "Cache-Control": "no-cache"})
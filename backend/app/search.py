@@ -0,0 +1,183 @@
+"""ES117 Backend — Full-text Search
+
+Two FTS5 indexes (created by migration 7):
+
+  shoutouts_fts  over shoutouts.message, kept in step by triggers
+  teams_fts      over the name, captain and description of every team;
+                 the teams table mirrors data/teams.json and is re-synced
+                 whenever the static data watcher sees the file change
+
+Free text is turned into an FTS5 query of quoted terms (all must match,
+the last one as a prefix), so user input can never be a syntax error.
+Results are BM25-ranked; snippets are HTML-escaped with the matches
+wrapped in <mark>. A common word can match half the wall, so shoutouts
+are ranked among the newest SEARCH_RANK_WINDOW matches only.
+
+Usage:
+    python -m app.search --reindex   # rebuild both indexes and re-sync teams.json
+"""
+import argparse
+import asyncio
+import html
+import json
+import re
+import time
+
+import aiosqlite
+
+from app.cache import dumps
+from app.config import DATA_DIR, DB_PATH, SEARCH_RANK_WINDOW
+from app.database import pool
+from app.migrations import migrate
+from app.static_data import static_data
+
+TEAMS_FILE = "teams.json"
+MAX_TERMS = 8
+
+_TERM = re.compile(r"\w+")
+# Snippet delimiters that can't occur in stored text; swapped for <mark> after escaping
+_OPEN, _CLOSE = "\x02", "\x03"
+
+# Finding the rank window's oldest match walks the doclist in rowid order: no ranking needed
+RANK_FLOOR_SQL = "SELECT rowid FROM shoutouts_fts WHERE shoutouts_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?"
+SHOUTOUT_HITS_SQL = f"""
+    SELECT s.id, u.name, s.created_at, h.snippet, h.score
+    FROM (
+        SELECT rowid AS id, bm25(shoutouts_fts) AS score,
+               snippet(shoutouts_fts, 0, '{_OPEN}', '{_CLOSE}', '…', 16) AS snippet
+        FROM shoutouts_fts WHERE shoutouts_fts MATCH ? AND rowid >= ?
+        ORDER BY score LIMIT ? OFFSET ?
+    ) h
+    JOIN shoutouts s ON s.id = h.id
+    LEFT JOIN users u ON u.id = s.user_id
+    ORDER BY h.score
+"""
+TEAM_HITS_SQL = f"""
+    SELECT t.id, h.name, h.captain, h.snippet, h.score
+    FROM (
+        SELECT rowid, bm25(teams_fts, 10.0, 5.0, 1.0) AS score,
+               highlight(teams_fts, 0, '{_OPEN}', '{_CLOSE}') AS name,
+               highlight(teams_fts, 1, '{_OPEN}', '{_CLOSE}') AS captain,
+               snippet(teams_fts, 2, '{_OPEN}', '{_CLOSE}', '…', 24) AS snippet
+        FROM teams_fts WHERE teams_fts MATCH ?
+        ORDER BY score LIMIT ? OFFSET ?
+    ) h
+    JOIN teams t ON t.rowid = h.rowid
+    ORDER BY h.score
+"""
+# sync_teams compares every row with teams.json: the table is as small as the file
+CURRENT_TEAMS_SQL = "SELECT id, data FROM teams"
+UPSERT_TEAM_SQL = """
+    INSERT INTO teams (id, name, captain, description, data) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name, captain = excluded.captain,
+        description = excluded.description, data = excluded.data
+"""
+DROP_TEAM_SQL = "DELETE FROM teams WHERE id = ?"
+
+
+def fts_query(text: str) -> str | None:
+    """A safe FTS5 query for free text, or None if it has no searchable words."""
+    terms = _TERM.findall(text)[:MAX_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"  # search as you type
+    return " ".join(quoted)
+
+
+def _highlight(snippet: str | None) -> str:
+    return html.escape(snippet or "").replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+async def search_shoutouts(db: aiosqlite.Connection, match: str, limit: int, offset: int,
+                           window: int = SEARCH_RANK_WINDOW) -> list[dict]:
+    """Best-ranked shoutouts for an FTS5 query (up to limit + 1, to tell if there is a next page)."""
+    row = await db.execute(RANK_FLOOR_SQL, (match, window - 1))
+    floor = (await row.fetchone() or (0,))[0]
+    rows = await db.execute(SHOUTOUT_HITS_SQL, (match, floor, limit + 1, offset))
+    return [
+        {"id": r[0], "author_name": r[1], "created_at": r[2], "snippet": _highlight(r[3]),
+         "score": round(-r[4], 3)}
+        for r in await rows.fetchall()
+    ]
+
+
+async def search_teams(db: aiosqlite.Connection, match: str, limit: int, offset: int) -> list[dict]:
+    """Best-ranked teams for an FTS5 query (name matches weigh most; up to limit + 1)."""
+    rows = await db.execute(TEAM_HITS_SQL, (match, limit + 1, offset))
+    return [
+        {"id": r[0], "name": _highlight(r[1]), "captain": _highlight(r[2]), "snippet": _highlight(r[3]),
+         "score": round(-r[4], 3)}
+        for r in await rows.fetchall()
+    ]
+
+
+async def sync_teams(db: aiosqlite.Connection, teams: list[dict]) -> int:
+    """Make the teams table match teams.json; caller commits. Returns rows written or deleted.
+
+    Unchanged teams are left alone, so a re-sync after an unrelated edit
+    touches (and re-indexes) only the teams that differ.
+    """
+    rows = await db.execute(CURRENT_TEAMS_SQL)
+    current = {r[0]: r[1] for r in await rows.fetchall()}
+    wanted = {}
+    for team in teams:
+        if isinstance(team, dict) and team.get("id"):
+            wanted[str(team["id"])] = team
+    upserts = []
+    for team_id, team in wanted.items():
+        data = dumps(team)
+        if current.get(team_id) != data:
+            upserts.append((team_id, team.get("name") or "", team.get("captain") or "",
+                            team.get("description") or "", data))
+    stale = [(team_id,) for team_id in current if team_id not in wanted]
+    await db.executemany(UPSERT_TEAM_SQL, upserts)
+    await db.executemany(DROP_TEAM_SQL, stale)
+    return len(upserts) + len(stale)
+
+
+async def on_site_data_change(changed: list[str]):
+    """Static data listener: re-sync the teams table when teams.json changes."""
+    asset = static_data.get(TEAMS_FILE)
+    if TEAMS_FILE not in changed or asset is None:
+        return  # gone or unreadable: keep searching the last good copy
+    teams = json.loads(asset.bodies["identity"])
+    async with pool.writer() as db:
+        written = await sync_teams(db, teams if isinstance(teams, list) else [])
+        await db.commit()
+    if written:
+        print(f"✅ Search index: synced {written} teams from {TEAMS_FILE}")
+
+
+async def reindex(db: aiosqlite.Connection) -> int:
+    """Re-sync teams from disk and rebuild both FTS indexes from their tables. Returns teams synced."""
+    path = DATA_DIR / TEAMS_FILE
+    teams = json.loads(path.read_bytes()) if path.is_file() else []
+    synced = await sync_teams(db, teams)
+    await db.execute("INSERT INTO shoutouts_fts (shoutouts_fts) VALUES ('rebuild')")
+    await db.execute("INSERT INTO teams_fts (teams_fts) VALUES ('rebuild')")
+    await db.execute("INSERT INTO shoutouts_fts (shoutouts_fts) VALUES ('optimize')")
+    await db.commit()
+    return synced
+
+
+async def _main() -> int:
+    started = time.perf_counter()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await migrate(db)
+        synced = await reindex(db)
+        count = await db.execute("SELECT (SELECT COUNT(*) FROM shoutouts), (SELECT COUNT(*) FROM teams)")
+        shoutouts, teams = await count.fetchone()
+    print(f"✅ Reindexed {shoutouts} shoutouts and {teams} teams ({synced} team rows synced) "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the full-text search indexes")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild both indexes and re-sync teams.json")
+    args = parser.parse_args()
+    if not args.reindex:
+        parser.error("nothing to do (use --reindex)")
+    raise SystemExit(asyncio.run(_main()))
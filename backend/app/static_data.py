@@ -0,0 +1,205 @@
+"""ES117 Backend — Static Site Data
+
+The JSON the frontend loads on every page (data/*.json, data/updates/*,
+site-config.json) is read once, minified and pre-compressed (gzip, plus
+brotli when installed) in memory. A watcher re-reads a file when its
+mtime or size changes, so edits and csv_to_json.py runs show up without
+a restart. Responses carry ETag/Last-Modified, so a repeat visit costs
+a 304. Listeners (e.g. the team search index) are told which files
+changed.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi import Request, Response
+
+from app.cache import dumps
+from app.config import DATA_DIR, SITE_CONFIG_PATH, SITE_CONFIG_MAX_AGE, STATIC_WATCH_SECONDS
+from app.etags import etag_matches
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+SITE_CONFIG = "site-config.json"
+
+
+class StaticAsset:
+    """One JSON file, minified, with its pre-built encodings and validators."""
+    __slots__ = ("name", "path", "stamp", "bodies", "etag", "last_modified", "mtime", "cache_control")
+
+    def __init__(self, name: str, path: Path, stamp: tuple, body: bytes, mtime: float, cache_control: str):
+        self.name = name
+        self.path = path
+        self.stamp = stamp
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+
+def _accepts(header: str) -> set[str]:
+    """Encodings the client accepts (q=0 excluded)."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticDataStore:
+    """In-memory copies of the site's JSON files, kept fresh by polling their stat()."""
+
+    def __init__(self, data_dir: Path = DATA_DIR, site_config: Path = SITE_CONFIG_PATH,
+                 interval: float = STATIC_WATCH_SECONDS):
+        self.data_dir = data_dir
+        self.site_config = site_config
+        self.interval = interval
+        self._assets: dict[str, StaticAsset] = {}
+        self._failed: dict[str, tuple] = {}
+        self._task: asyncio.Task | None = None
+        self.listeners = []  # async callables taking the list of changed names
+        self._stats = {"reloads": 0, "reload_errors": 0, "responses": 0, "not_modified": 0}
+
+    def _sources(self) -> dict[str, Path]:
+        sources = {}
+        if self.data_dir.is_dir():
+            for path in sorted(self.data_dir.rglob("*.json")):
+                sources[path.relative_to(self.data_dir).as_posix()] = path
+        if self.site_config.is_file():
+            sources[SITE_CONFIG] = self.site_config
+        return sources
+
+    def _load(self, name: str, path: Path, stamp: tuple, mtime: float) -> StaticAsset:
+        body = dumps(json.loads(path.read_bytes()))
+        if name == SITE_CONFIG:
+            cache_control = f"public, max-age={SITE_CONFIG_MAX_AGE}"
+        else:
+            cache_control = "no-cache"
+        return StaticAsset(name, path, stamp, body, mtime, cache_control)
+
+    def refresh(self) -> list[str]:
+        """Reload files that appeared or changed; drop ones that are gone. Returns changed names."""
+        changed = []
+        sources = self._sources()
+        for name, path in sources.items():
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            current = self._assets.get(name)
+            if (current is not None and current.stamp == stamp) or self._failed.get(name) == stamp:
+                continue
+            try:
+                self._assets[name] = self._load(name, path, stamp, st.st_mtime)
+            except (OSError, ValueError) as exc:
+                # Half-written or broken file: keep serving the last good copy
+                self._failed[name] = stamp
+                self._stats["reload_errors"] += 1
+                print(f"⚠️  Could not load {path}: {exc}")
+                continue
+            self._failed.pop(name, None)
+            self._stats["reloads"] += 1
+            changed.append(name)
+        for name in set(self._assets) - set(sources):
+            del self._assets[name]
+            changed.append(name)
+        return changed
+
+    async def start(self):
+        """Load every file, then keep watching for changes."""
+        await self._notify(await asyncio.to_thread(self.refresh))
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            changed = await asyncio.to_thread(self.refresh)
+            if changed:
+                await self._notify(changed)
+
+    async def _notify(self, changed: list[str]):
+        for listener in self.listeners:
+            try:
+                await listener(changed)
+            except Exception as exc:
+                print(f"⚠️  Site data listener failed: {exc}")
+
+    def get(self, name: str) -> StaticAsset | None:
+        return self._assets.get(name)
+
+    def names(self) -> list[str]:
+        return sorted(self._assets)
+
+    def respond(self, request: Request, asset: StaticAsset) -> Response:
+        """Negotiate encoding and answer If-None-Match / If-Modified-Since."""
+        accepted = _accepts(request.headers.get("accept-encoding", ""))
+        if "br" in accepted and "br" in asset.bodies:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            encoding = "identity"
+        # Strong validators must differ per encoding
+        etag = f'"{asset.etag}"' if encoding == "identity" else f'"{asset.etag}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        self._stats["responses"] += 1
+        if self._not_modified(request, etag, asset):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type="application/json", headers=headers)
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str, asset: StaticAsset) -> bool:
+        if request.headers.get("if-none-match") is not None:
+            # If-None-Match wins over If-Modified-Since (RFC 9110 §13.2.2)
+            return etag_matches(request, etag)
+        since = request.headers.get("if-modified-since")
+        if since:
+            try:
+                return int(parsedate_to_datetime(since).timestamp()) >= asset.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._assets),
+            "brotli": brotli is not None,
+            "bytes": sum(len(a.bodies["identity"]) for a in self._assets.values()),
+            **self._stats,
+        }
+
+
+static_data = StaticDataStore()
@@ -0,0 +1,165 @@
+"""ES117 Backend — Materialized Poll Tallies
+
+poll_options.vote_count is maintained incrementally by apply_votes, in
+the same transaction as the vote rows. This module also rebuilds it from
+poll_votes and reports any drift, and freezes the final tally of a closed
+poll into poll_snapshots. Polls whose vote rows were compacted away (see
+app/poll_archive.py) are left out of the drift check.
+
+Usage:
+    python -m app.tallies           # rebuild and report drift
+    python -m app.tallies --check   # report drift only
+"""
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+
+import aiosqlite
+
+from app.cache import response_cache, dumps
+from app.config import DB_PATH
+from app.events import hub
+
+
+OPEN_POLLS_SQL = "SELECT id FROM polls WHERE is_active = 1 AND id IN (SELECT value FROM json_each(?))"
+PREVIOUS_VOTES_SQL = """
+    SELECT pv.poll_id, pv.user_id, pv.option_id
+    FROM json_each(?) j
+    JOIN poll_votes pv
+      ON pv.poll_id = json_extract(j.value, '$[0]') AND pv.user_id = json_extract(j.value, '$[1]')
+"""
+UPSERT_VOTE_SQL = """
+    INSERT INTO poll_votes (poll_id, option_id, user_id) VALUES (?, ?, ?)
+    ON CONFLICT(poll_id, user_id) DO UPDATE SET option_id = excluded.option_id
+"""
+MOVE_COUNT_SQL = "UPDATE poll_options SET vote_count = vote_count + ? WHERE id = ?"
+SNAPSHOT_POLL_SQL = "SELECT id, question, created_at FROM polls WHERE id = ?"
+SNAPSHOT_COUNTS_SQL = """
+    SELECT po.id, po.text, (SELECT COUNT(*) FROM poll_votes pv WHERE pv.option_id = po.id)
+    FROM poll_options po WHERE po.poll_id = ? ORDER BY po.id
+"""
+SAVE_SNAPSHOT_SQL = "INSERT OR REPLACE INTO poll_snapshots (poll_id, total_votes, data) VALUES (?, ?, ?)"
+# Reads every option of every poll not compacted yet: reconciliation is a full pass on purpose
+DRIFT_SQL = """
+    SELECT po.id, po.poll_id, po.vote_count, COUNT(pv.id) AS actual
+    FROM poll_options po
+    LEFT JOIN poll_votes pv ON pv.option_id = po.id
+    WHERE po.poll_id NOT IN (SELECT poll_id FROM poll_snapshots WHERE compacted = 1)
+    GROUP BY po.id
+    HAVING po.vote_count != COUNT(pv.id)
+"""
+SET_COUNT_SQL = "UPDATE poll_options SET vote_count = ? WHERE id = ?"
+
+
+class PollClosed(Exception):
+    """The poll was closed after the vote was validated but before it was written."""
+
+
+async def open_polls(db: aiosqlite.Connection, poll_ids) -> set[int]:
+    """The subset of poll_ids that still accept votes."""
+    rows = await db.execute(OPEN_POLLS_SQL, (json.dumps(list(poll_ids)),))
+    return {r[0] for r in await rows.fetchall()}
+
+
+async def apply_votes(
+    db: aiosqlite.Connection, votes: list[tuple[int, int, int]]
+) -> tuple[dict[int, dict[int, int]], list[tuple[int, int, int]]]:
+    """Upsert (poll_id, option_id, user_id) votes and move tallies; caller commits.
+
+    Later votes in the list win over earlier ones from the same user. Returns
+    {poll_id: {option_id: delta}} for the tallies that actually changed, and
+    the votes that are a user's first in their poll (not a changed vote).
+    """
+    latest = {}
+    for poll_id, option_id, user_id in votes:
+        latest[(poll_id, user_id)] = option_id
+
+    rows = await db.execute(PREVIOUS_VOTES_SQL, (json.dumps(list(latest)),))
+    previous = {(r[0], r[1]): r[2] for r in await rows.fetchall()}
+
+    changed, first = [], []
+    deltas: dict[int, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    for (poll_id, user_id), option_id in latest.items():
+        prev = previous.get((poll_id, user_id))
+        if prev == option_id:
+            continue
+        if prev is not None:
+            deltas[poll_id][prev] -= 1
+        deltas[poll_id][option_id] += 1
+        changed.append((poll_id, option_id, user_id))
+        if prev is None:
+            first.append((poll_id, option_id, user_id))
+
+    if changed:
+        await db.executemany(UPSERT_VOTE_SQL, changed)
+        await db.executemany(
+            MOVE_COUNT_SQL,
+            [(d, opt) for per_poll in deltas.values() for opt, d in per_poll.items() if d]
+        )
+    return {
+        poll_id: {opt: d for opt, d in per_poll.items() if d}
+        for poll_id, per_poll in deltas.items()
+        if any(per_poll.values())
+    }, first
+
+
+def announce_tallies(deltas: dict[int, dict[int, int]]):
+    """After commit: drop cached poll payloads and push tally deltas to live clients."""
+    if not deltas:
+        return
+    response_cache.invalidate("polls")
+    for poll_id, per_option in deltas.items():
+        hub.publish("poll.tally", {"poll_id": poll_id, "deltas": per_option})
+
+
+async def snapshot_poll(db: aiosqlite.Connection, poll_id: int) -> dict | None:
+    """Freeze a poll's results, counted from its vote rows, into poll_snapshots; caller commits.
+
+    Returns the PollOut-shaped snapshot, or None if there is no such poll.
+    """
+    row = await db.execute(SNAPSHOT_POLL_SQL, (poll_id,))
+    poll = await row.fetchone()
+    if not poll:
+        return None
+    rows = await db.execute(SNAPSHOT_COUNTS_SQL, (poll_id,))
+    options = [{"id": o[0], "text": o[1], "votes": o[2]} for o in await rows.fetchall()]
+    snapshot = {"id": poll[0], "question": poll[1], "is_active": False, "options": options,
+                "user_voted_option": None, "created_at": poll[2]}
+    await db.execute(SAVE_SNAPSHOT_SQL, (poll_id, sum(o["votes"] for o in options), dumps(snapshot)))
+    return snapshot
+
+
+async def find_drift(db: aiosqlite.Connection) -> list[dict]:
+    """Return options whose stored vote_count differs from the actual vote rows."""
+    rows = await db.execute(DRIFT_SQL)
+    return [
+        {"option_id": r[0], "poll_id": r[1], "stored": r[2], "actual": r[3]}
+        for r in await rows.fetchall()
+    ]
+
+
+async def rebuild_tallies(db: aiosqlite.Connection) -> list[dict]:
+    """Rewrite drifted vote_count values from poll_votes. Returns the drift found."""
+    drift = await find_drift(db)
+    if drift:
+        await db.executemany(SET_COUNT_SQL, [(d["actual"], d["option_id"]) for d in drift])
+        await db.commit()
+    return drift
+
+
+async def _main(check_only: bool):
+    async with aiosqlite.connect(DB_PATH) as db:
+        drift = await (find_drift(db) if check_only else rebuild_tallies(db))
+    for d in drift:
+        print(f"  poll {d['poll_id']} option {d['option_id']}: stored {d['stored']}, actual {d['actual']}")
+    verb = "found" if check_only else "fixed"
+    print(f"{'⚠️' if drift else '✅'} {verb} {len(drift)} drifted option tallies")
+    return 1 if (check_only and drift) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile materialized poll tallies")
+    parser.add_argument("--check", action="store_true", help="Report drift without fixing it")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.check)))
@@ -0,0 +1,119 @@
+"""ES117 Backend — Team Directory
+
+data/teams.json held in memory as a directory keyed by team id, so a
+team page or a filtered listing costs a dict lookup instead of every
+visitor downloading and filtering the whole file. Each team is encoded
+once per load; secondary indexes map a field's value to the (sorted)
+positions of the teams that have it, and filters intersect them.
+
+  type           "hardware" / "software" (matched case-insensitively)
+  currentPhase   the phase number
+  ideaLocked     true / false
+  fundingNeeded  true / false
+
+The directory is rebuilt whenever the static data watcher sees
+teams.json change; a missing or malformed file keeps the last good copy.
+"""
+import json
+
+from app.cache import dumps
+from app.static_data import static_data
+
+TEAMS_FILE = "teams.json"
+INDEXED = ("type", "currentPhase", "ideaLocked", "fundingNeeded")
+
+
+def _key(field: str, value):
+    """Normalized index key for a team's value (None if it can't be indexed)."""
+    if field == "type":
+        return value.strip().lower() if isinstance(value, str) else None
+    if field == "currentPhase":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return value if isinstance(value, bool) else None
+
+
+class TeamDirectory:
+    """Teams in file order, by id, with per-field indexes and pre-encoded bodies."""
+
+    def __init__(self):
+        self.teams: list[dict] = []
+        self.encoded: list[bytes] = []
+        self.fields: frozenset[str] = frozenset()
+        self.etag = ""
+        self._by_id: dict[str, int] = {}
+        self._indexes: dict[str, dict] = {field: {} for field in INDEXED}
+        self._stats = {"reloads": 0, "lookups": 0, "queries": 0}
+
+    def load(self, teams: list, etag: str = "") -> int:
+        """Replace the directory with `teams` (entries without an id are skipped). Returns the count."""
+        kept, by_id = [], {}
+        indexes = {field: {} for field in INDEXED}
+        for team in teams:
+            if not isinstance(team, dict) or not team.get("id") or str(team["id"]) in by_id:
+                continue
+            position = len(kept)
+            by_id[str(team["id"])] = position
+            kept.append(team)
+            for field in INDEXED:
+                key = _key(field, team.get(field))
+                if key is not None:
+                    indexes[field].setdefault(key, []).append(position)
+        encoded = [dumps(team) for team in kept]
+        # Swap everything in at once: requests in flight see the old or the new directory
+        self.teams, self.encoded, self._by_id, self._indexes = kept, encoded, by_id, indexes
+        self.fields = frozenset(k for team in kept for k in team)
+        self.etag = etag
+        self._stats["reloads"] += 1
+        return len(kept)
+
+    def get(self, team_id: str) -> int | None:
+        """Position of a team, or None."""
+        self._stats["lookups"] += 1
+        return self._by_id.get(team_id)
+
+    def select(self, **filters) -> list[int]:
+        """Positions of the teams matching every given (non-None) field filter, in file order."""
+        self._stats["queries"] += 1
+        matched = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            positions = self._indexes[field].get(_key(field, value), ())
+            if matched is None:
+                matched = set(positions)
+            else:
+                matched.intersection_update(positions)
+            if not matched:
+                return []
+        return list(range(len(self.teams))) if matched is None else sorted(matched)
+
+    def body(self, position: int, fields: tuple[str, ...] | None = None) -> bytes:
+        """One team as JSON: the pre-encoded bytes, or just `fields` of it."""
+        if fields is None:
+            return self.encoded[position]
+        team = self.teams[position]
+        return dumps({k: team[k] for k in fields if k in team})
+
+    def stats(self) -> dict:
+        return {
+            "teams": len(self.teams),
+            "bytes": sum(len(b) for b in self.encoded),
+            "indexed_values": {field: len(index) for field, index in self._indexes.items()},
+            **self._stats,
+        }
+
+
+team_directory = TeamDirectory()
+
+
+async def on_teams_change(changed: list[str]):
+    """Static data listener: rebuild the directory when teams.json changes."""
+    asset = static_data.get(TEAMS_FILE)
+    if TEAMS_FILE not in changed or asset is None:
+        return  # gone or unreadable: keep serving the last good copy
+    teams = json.loads(asset.bodies["identity"])
+    count = team_directory.load(teams if isinstance(teams, list) else [], asset.etag)
+    print(f"✅ Team directory: {count} teams from {TEAMS_FILE}")
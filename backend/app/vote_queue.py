@@ -0,0 +1,125 @@
+"""ES117 Backend — Write-behind Vote Ingestion
+
+Validated votes are queued and a single writer task drains them in
+batches: one upsert pass and one commit (one fsync) per batch instead of
+per vote. Each caller awaits a future that resolves once the batch that
+carried its vote is committed, so a 200 still means the vote is durable.
+Votes for a poll that was closed while they queued fail with PollClosed.
+"""
+import asyncio
+import time
+
+from app.analytics import activity
+from app.config import VOTE_BATCH_MAX, VOTE_BATCH_LATENCY_MS
+from app.database import pool
+from app.tallies import PollClosed, apply_votes, announce_tallies, open_polls
+
+
+class VoteWriter:
+    """Single consumer that group-commits queued votes."""
+
+    def __init__(self, max_batch: int = VOTE_BATCH_MAX, max_latency_ms: float = VOTE_BATCH_LATENCY_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_latency = max_latency_ms / 1000
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._stats = {
+            "batches": 0,
+            "votes": 0,
+            "largest_batch": 0,
+            "last_flush_seconds": 0.0,
+            "failed_batches": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything already queued, then stop the writer task."""
+        if not self.running:
+            return
+        self._queue.put_nowait(None)
+        task, self._task = self._task, None
+        await task
+
+    async def submit(self, poll_id: int, option_id: int, user_id: int):
+        """Queue a vote and wait until its batch is committed."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((poll_id, option_id, user_id, future, time.perf_counter()))
+        await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        started = time.perf_counter()
+        try:
+            # The oldest vote's wait is this queue's delay, for admission control
+            async with pool.writer(queued_since=batch[0][4]) as db:
+                accepting = await open_polls(db, {p for p, *_ in batch})
+                votes = [(p, o, u) for p, o, u, *_ in batch if p in accepting]
+                deltas, first = await apply_votes(db, votes)
+                # A user's vote in a poll is activity once, as in the migration backfill
+                await activity.record(db, "vote", [(p, u) for p, _, u in first])
+                await db.commit()
+        except Exception as exc:
+            self._stats["failed_batches"] += 1
+            for *_, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for poll_id, *_, future, _ in batch:
+            if future.done():
+                continue
+            if poll_id in accepting:
+                future.set_result(None)
+            else:
+                future.set_exception(PollClosed())
+        announce_tallies(deltas)
+        self._stats["batches"] += 1
+        self._stats["votes"] += len(batch)
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        self._stats["last_flush_seconds"] = time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_batch": self.max_batch,
+            "max_latency_ms": self.max_latency * 1000,
+            **self._stats,
+        }
+
+
+vote_writer = VoteWriter()
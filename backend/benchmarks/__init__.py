@@ -0,0 +1 @@
+"""ES117 Backend — Benchmarks and local stubs (run from backend/ with python -m benchmarks.<name>)"""
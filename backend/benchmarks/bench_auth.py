@@ -0,0 +1,95 @@
+"""ES117 Backend — Auth overhead micro-benchmark
+
+Compares per-request auth cost with and without the verified-token and
+user-profile caches:
+
+  decode_jwt   raw jose verification vs. a cache hit
+  /api/auth/me full request (temp DB, in-process ASGI), caches cleared
+               before every request vs. warm
+
+Usage:
+    python -m benchmarks.bench_auth --users 500 --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+
+def _per_call_us(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def main(args) -> int:
+    tmp = tempfile.mkdtemp(prefix="es117-auth-")
+    os.environ["ES117_DB_PATH"] = os.path.join(tmp, "bench.db")
+    import httpx
+    from jose import jwt
+    from app import auth
+    from app.config import JWT_SECRET, JWT_ALGORITHM
+    from app.main import app
+
+    tokens = [auth.create_jwt(i, f"student{i}@iitgn.ac.in") for i in range(1, args.users + 1)]
+
+    def uncached(i):
+        jwt.decode(tokens[i % len(tokens)], JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+    def cached(i):
+        auth.decode_jwt(tokens[i % len(tokens)])
+
+    for t in tokens:
+        auth.decode_jwt(t)  # warm
+    decode = {
+        "uncached_us": round(_per_call_us(uncached, args.iterations), 2),
+        "cached_us": round(_per_call_us(cached, args.iterations), 2),
+    }
+    decode["speedup"] = round(decode["uncached_us"] / decode["cached_us"], 1)
+
+    async with app.router.lifespan_context(app):
+        con = sqlite3.connect(os.environ["ES117_DB_PATH"])
+        con.executemany("INSERT INTO users (email, name) VALUES (?, ?)",
+                        [(f"student{i}@iitgn.ac.in", f"Student {i}") for i in range(1, args.users + 1)])
+        con.commit()
+        con.close()
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def run(clear: bool) -> float:
+                started = time.perf_counter()
+                for i in range(args.requests):
+                    if clear:
+                        auth.token_cache.clear()
+                        auth.user_cache.clear()
+                    resp = await client.get("/api/auth/me", headers={
+                        "Authorization": f"Bearer {tokens[i % len(tokens)]}"
+                    })
+                    assert resp.status_code == 200, resp.text
+                return (time.perf_counter() - started) / args.requests * 1e6
+
+            await run(clear=False)  # warm both caches
+            me = {"uncached_us": round(await run(clear=True), 1), "cached_us": round(await run(clear=False), 1)}
+            me["saved_us_per_request"] = round(me["uncached_us"] - me["cached_us"], 1)
+
+    report = {"benchmark": "auth_overhead", "users": args.users, "decode_jwt": decode, "auth_me": me,
+              "token_cache": auth.token_cache.stats(), "user_cache": auth.user_cache.stats()}
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark cached vs uncached auth")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
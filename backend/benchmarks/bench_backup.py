@@ -0,0 +1,138 @@
+"""ES117 Backend — Online backup under vote load
+
+Seeds a temporary database big enough that a backup takes a while, boots
+the app in-process and runs the load test's vote storm three times:
+
+  warmup    not reported
+  baseline  no backup running
+  backup    backups taken back to back for the whole storm
+
+and reports the vote endpoint's p50/p95/p99 for both, with what each
+backup cost (seconds, backup steps, bytes before and after gzip).
+The last backup is then checked like a restore would: checksum, gunzip
+into a scratch file, integrity check, and every table's row count at or
+below the live one (it is a snapshot from during the storm).
+
+Exits 1 if a backup failed or didn't restore cleanly, or if the backup
+storm's p99 grew by more than --max-p99-ratio (when given).
+
+Usage:
+    python -m benchmarks.bench_backup --users 3000 --shoutouts 200000 --votes 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+VOTE = "POST /api/polls/{id}/vote"
+TABLES = ("users", "shoutouts", "polls", "poll_options", "poll_votes", "activity_rollups")
+
+
+def _counts(path: str) -> dict[str, int]:
+    con = sqlite3.connect(path)
+    try:
+        return {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES}
+    finally:
+        con.close()
+
+
+async def main(args) -> int:
+    workdir = tempfile.mkdtemp(prefix="es117-backup-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ["ES117_DB_PATH"] = db_path
+    os.environ["ES117_BACKUP_INTERVAL_HOURS"] = "0"  # the benchmark takes them itself
+    # Import after ES117_DB_PATH is set: config reads it at import time
+    import httpx
+    from benchmarks import load
+    from app.auth import create_jwt
+    from app.backup import BackupManager, restore, verify
+    from app.database import init_db
+    from app.main import app
+
+    await init_db()
+    rng = random.Random(args.seed)
+    print(f"🌱 Seeding {db_path}", file=sys.stderr)
+    data = load.seed(db_path, args.users, args.shoutouts, args.polls, args.votes, rng)
+    tokens = {u: create_jwt(u, f"student{u}@iitgn.ac.in") for u in range(1, args.users + 1)}
+    manager = BackupManager(directory=Path(workdir) / "backups", keep=3)
+
+    report = {"benchmark": "backup", "db_bytes": os.path.getsize(db_path),
+              "config": {k: getattr(args, k) for k in ("users", "shoutouts", "votes", "concurrency", "seed")}}
+    backups, failures = [], []
+
+    async def back_to_back(done: asyncio.Event):
+        while not done.is_set():
+            try:
+                path = await manager.backup()
+            except Exception as exc:
+                failures.append(repr(exc))
+                return
+            stats = manager.stats()
+            backups.append({"seconds": stats["last_seconds"], "steps": stats["last_steps"],
+                            "db_bytes": stats["last_db_bytes"], "gzip_bytes": stats["last_bytes"], "file": path})
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60, limits=limits) as client:
+            await load.vote_storm(client, data, tokens, args, rng)  # warmup
+            baseline = await load.vote_storm(client, data, tokens, args, rng)
+
+            done = asyncio.Event()
+            backing_up = asyncio.create_task(back_to_back(done))
+            started = time.perf_counter()
+            during = await load.vote_storm(client, data, tokens, args, rng)
+            storm_seconds = time.perf_counter() - started
+            done.set()
+            await backing_up
+        live = _counts(db_path)
+
+    for label, result in (("baseline", baseline), ("during_backup", during)):
+        stats = result["endpoints"][VOTE]
+        report[label] = {k: stats[k] for k in ("count", "rps", "p50_ms", "p95_ms", "p99_ms", "errors", "statuses")}
+    report["p99_ratio"] = round(report["during_backup"]["p99_ms"] / report["baseline"]["p99_ms"], 2)
+    report["storm_seconds"] = round(storm_seconds, 2)
+    report["backups"] = [{k: v for k, v in b.items() if k != "file"} for b in backups]
+    report["backup_failures"] = failures
+
+    problems = list(failures)
+    if backups:
+        last = backups[-1]["file"]
+        scratch = os.path.join(workdir, "restored.db")
+        restore(last, Path(scratch))
+        restored = _counts(scratch)
+        report["restore_check"] = {"checksum_ok": verify(last), "restored_rows": restored, "live_rows": live}
+        problems += [f"{t}: restored {restored[t]} > live {live[t]}" for t in TABLES if restored[t] > live[t]]
+    else:
+        problems.append("no backup completed")
+    if args.max_p99_ratio and report["p99_ratio"] > args.max_p99_ratio:
+        problems.append(f"p99 grew {report['p99_ratio']}x during backups (limit {args.max_p99_ratio}x)")
+    report["ok"] = not problems
+    for p in problems:
+        print(f"❌ {p}", file=sys.stderr)
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure vote latency while online backups run")
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--shoutouts", type=int, default=200_000)
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--votes", type=int, default=200_000, help="Pre-existing votes to seed")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--max-p99-ratio", type=float, default=0, help="Fail if p99 grows more than this")
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,156 @@
+"""ES117 Backend — csv_to_json.py streaming import benchmark
+
+Generates Google Forms style exports and runs scripts/csv_to_json.py's
+pipeline on them:
+
+  full         first import of an N-row ideation export
+  incremental  the same export with rows appended, resumed from the checkpoint
+  edited       an earlier row changed, so the checkpoint is rejected and it rebuilds
+  weekly       an N-row weekly-update export
+
+Peak Python heap (tracemalloc) is reported next to the CSV size and for
+a 5x smaller export: with rows streamed it tracks the output, not the
+input. The incremental output is checked against a full rebuild.
+
+Usage:
+    python -m benchmarks.bench_csv_import --rows 50000 --projects 2000
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+_spec = importlib.util.spec_from_file_location("csv_to_json", PROJECT_ROOT / "scripts" / "csv_to_json.py")
+csv_to_json = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(csv_to_json)
+
+IDEATION_HEADER = ["Timestamp", "Email Address", "Captain name", "Project type", "Idea locked?",
+                   "Project name", "Description", "Idea status", "Funding needed?", "Comments"]
+WEEKLY_HEADER = ["Timestamp", "Email Address", "Team ID", "Progress summary", "Highlights", "Blockers"]
+
+
+def _timestamp(i: int) -> str:
+    return f"2/{1 + i // 100_000 % 28}/2026 {i // 3600 % 24}:{i // 60 % 60:02d}:{i % 60:02d}"
+
+
+def write_ideation(path: Path, rows: range, projects: int, rng: random.Random, mode: str = "w"):
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        if mode == "w":
+            writer.writerow(IDEATION_HEADER)
+        for i in rows:
+            p = rng.randrange(projects)
+            writer.writerow([
+                _timestamp(i), f"captain{p}@iitgn.ac.in", f"Captain {p}", rng.choice(("Hardware", "Software")),
+                rng.choice(("Yes", "No")), f"Project {p}", f"Revision {i} of idea {p}. " * rng.randint(2, 12),
+                "Submitted", rng.choice(("Yes", "No", "")), rng.choice(("", "no", "Need lab access")),
+            ])
+
+
+def write_weekly(path: Path, rows: int, teams: list[dict], rng: random.Random):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(WEEKLY_HEADER)
+        for i in range(rows):
+            t = rng.choice(teams)
+            writer.writerow([
+                _timestamp(i), t["email"], rng.choice((t["id"], t["name"])),
+                f"Week progress {i}", "Built chassis\nTested sensors; wrote firmware",
+                rng.choice(("None", "Waiting for parts", "")),
+            ])
+
+
+def measure(fn, setup=None) -> dict:
+    """Run twice: once for wall time, once under tracemalloc for peak heap (setup runs untimed)."""
+    with redirect_stdout(io.StringIO()):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - started
+        if setup:
+            setup()
+    tracemalloc.start()
+    with redirect_stdout(io.StringIO()) as out:
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_heap_mb": round(peak / 1e6, 2), "log": out.getvalue().strip()}
+
+
+def main(args) -> int:
+    rng = random.Random(args.seed)
+    tmp = Path(tempfile.mkdtemp(prefix="es117-csv-"))
+    data, check = tmp / "data", tmp / "checkpoints"
+    big, small, weekly = tmp / "ideation.csv", tmp / "ideation-small.csv", tmp / "weekly.csv"
+    write_ideation(big, range(args.rows), args.projects, random.Random(args.seed))
+    write_ideation(small, range(args.rows // 5), args.projects, random.Random(args.seed))
+    report = {"benchmark": "csv_import", "rows": args.rows, "csv_mb": round(big.stat().st_size / 1e6, 2)}
+
+    def ideation(csv_path, out_dir, full=False):
+        return lambda: csv_to_json.run_ideation(csv_path, out_dir, check / f"{out_dir.name}.json", full)
+
+    report["full"] = measure(ideation(big, data, full=True))
+    report["full_small"] = measure(ideation(small, tmp / "small", full=True))
+    report["full_small"]["rows"] = args.rows // 5
+
+    # Append rows, then resume: only the new rows are parsed and merged
+    before = big.read_bytes()
+    write_ideation(big, range(args.rows, args.rows + args.append), args.projects, rng, mode="a")
+    after = big.read_bytes()
+
+    def checkpoint_before_append():
+        big.write_bytes(before)
+        csv_to_json.run_ideation(big, data, check / "data.json", full=True)
+        big.write_bytes(after)
+
+    report["incremental"] = measure(lambda: csv_to_json.run_ideation(big, data, check / "data.json"),
+                                    setup=checkpoint_before_append)
+    report["incremental"]["appended_rows"] = args.append
+
+    rebuilt = tmp / "rebuilt"
+    with redirect_stdout(io.StringIO()):
+        csv_to_json.run_ideation(big, rebuilt, check / "rebuilt.json", full=True)
+    same = json.loads((data / "teams.json").read_text()) == json.loads((rebuilt / "teams.json").read_text())
+    report["incremental"]["matches_full_rebuild"] = same
+
+    # Edit an early row: the checkpoint digest no longer matches, so it rebuilds
+    saved_checkpoint = (check / "data.json").read_bytes()
+    lines = after.decode().split("\n")
+    lines[1] = lines[1].replace("Captain", "Captain (edited)", 1)
+    big.write_text("\n".join(lines))
+    report["edited"] = measure(lambda: csv_to_json.run_ideation(big, data, check / "data.json"),
+                               setup=lambda: (check / "data.json").write_bytes(saved_checkpoint))
+
+    teams = json.loads((data / "teams.json").read_text())
+    write_weekly(weekly, args.rows, teams, rng)
+    report["weekly"] = measure(
+        lambda: csv_to_json.run_weekly(weekly, data, 3, check / "weekly.json", full=True))
+
+    shutil.rmtree(tmp)
+    out = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(out)
+    print(out)
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming CSV → JSON importer")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--projects", type=int, default=2000, help="Distinct projects in the export")
+    parser.add_argument("--append", type=int, default=500, help="Rows appended before the incremental run")
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,126 @@
+"""ES117 Backend — OAuth callback benchmark against the local stub
+
+Drives /api/auth/callback end to end (temp SQLite DB, in-process ASGI) for
+a burst of concurrent logins in three modes:
+
+  per-login   a fresh httpx.AsyncClient per login (the original exchange_code)
+  shared      the app's pooled client, token + userinfo round-trips
+  id-token    the pooled client with local id_token verification (no userinfo)
+
+Every login is checked: it must redirect with a JWT and upsert the user.
+
+Usage:
+    python -m benchmarks.bench_oauth --logins 200 --concurrency 50 --delay-ms 20 --connect-delay-ms 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.stub_oauth import fetch_counts, run_in_subprocess
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _run_mode(app, auth, auth_routes, mode: str, logins: int, concurrency: int, offset: int) -> dict:
+    import httpx
+
+    original_exchange = auth_routes.exchange_code
+
+    async def legacy_exchange(code: str) -> dict:
+        async with httpx.AsyncClient() as client:
+            token_resp = await client.post(auth.GOOGLE_TOKEN_URL, data={"code": code})
+            tokens = token_resp.json()
+            user_resp = await client.get(auth.GOOGLE_USERINFO_URL, headers={
+                "Authorization": f"Bearer {tokens['access_token']}"
+            })
+            return user_resp.json()
+
+    auth_routes.exchange_code = legacy_exchange if mode == "per-login" else original_exchange
+    auth.OAUTH_VERIFY_ID_TOKEN = mode == "id-token"
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login(i: int):
+            async with sem:
+                started = time.perf_counter()
+                resp = await client.get("/api/auth/callback", params={"code": f"code-{offset + i}",
+                                                                       "state": "http://frontend"})
+                latencies.append(time.perf_counter() - started)
+                assert resp.status_code in (302, 307), resp.text
+                assert "token=" in resp.headers["location"], resp.headers["location"]
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+
+    auth_routes.exchange_code = original_exchange
+    return {
+        "mode": mode,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(logins / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+    }
+
+
+async def main(args) -> int:
+    stub = run_in_subprocess(args.stub_port, "stub-client", args.delay_ms / 1000, args.connect_delay_ms / 1000)
+    base_url = f"http://127.0.0.1:{args.stub_port}"
+    tmp = tempfile.mkdtemp(prefix="es117-oauth-")
+    os.environ.update({
+        "ES117_DB_PATH": os.path.join(tmp, "bench.db"),
+        "ES117_GOOGLE_CLIENT_ID": "stub-client",
+        "ES117_GOOGLE_TOKEN_URL": f"{base_url}/token",
+        "ES117_GOOGLE_USERINFO_URL": f"{base_url}/userinfo",
+        "ES117_GOOGLE_CERTS_URL": f"{base_url}/certs",
+    })
+    from app import auth
+    from app.main import app
+    from app.routers import auth_routes
+
+    results = []
+    async with app.router.lifespan_context(app):
+        for n, mode in enumerate(("per-login", "shared", "id-token")):
+            before = fetch_counts(args.stub_port)
+            result = await _run_mode(app, auth, auth_routes, mode, args.logins, args.concurrency, n * args.logins)
+            after = fetch_counts(args.stub_port)
+            result["upstream"] = {k: after[k] - before[k] for k in after}
+            results.append(result)
+
+        from app.database import pool
+        async with pool.reader() as db:
+            row = await db.execute("SELECT COUNT(*) FROM users")
+            users = (await row.fetchone())[0]
+    stub.terminate()
+
+    ok = users == 3 * args.logins
+    report = {"benchmark": "oauth_callback", "http2": auth.HTTP2_AVAILABLE, "users_upserted": users,
+              "ok": ok, "results": results}
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the OAuth callback against a local stub")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay-ms", type=float, default=20, help="Stub latency per request")
+    parser.add_argument("--connect-delay-ms", type=float, default=60, help="Stub cost per new connection")
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
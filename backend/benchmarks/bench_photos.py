@@ -0,0 +1,151 @@
+"""ES117 Backend — Concurrent photo upload benchmark
+
+Boots the app in-process against a temporary database and photo directory,
+then fires concurrent multipart uploads at POST /api/teams/{id}/photos.
+A share of the uploads repeat an earlier image so the content-addressed
+dedup path is exercised too. Reports upload latency and throughput, peak
+RSS (uploads are streamed, so it should not grow with image size) and how
+long the process pool takes to finish every thumbnail.
+
+Usage:
+    python -m benchmarks.bench_photos --uploads 400 --concurrency 32 --size-kb 900
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+
+def make_images(count: int, size_kb: int, rng: random.Random) -> list[bytes]:
+    """Distinct JPEGs of roughly size_kb (real ones when Pillow is installed)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        # Only the magic bytes are checked on upload; variants need Pillow anyway
+        return [b"\xff\xd8\xff\xe0" + rng.randbytes(size_kb * 1024) for _ in range(count)]
+    images = []
+    side = max(64, int((size_kb * 1024 / 0.9) ** 0.5))
+    for _ in range(count):
+        noise = Image.frombytes("RGB", (side // 4, side // 4), rng.randbytes((side // 4) ** 2 * 3))
+        buf = io.BytesIO()
+        noise.resize((side, side)).save(buf, "JPEG", quality=90)
+        images.append(buf.getvalue())
+    return images
+
+
+def _pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def main(args) -> int:
+    tmp = tempfile.mkdtemp(prefix="es117-photos-")
+    os.environ["ES117_DB_PATH"] = os.path.join(tmp, "bench.db")
+    os.environ["ES117_PHOTO_DIR"] = os.path.join(tmp, "photos")
+    os.environ.setdefault("ES117_PHOTO_MAX_BYTES", str(max(args.size_kb * 2, 1024) * 1024))
+    import httpx
+    import sqlite3
+    from app.auth import create_jwt
+    from app.main import app
+    from app.photos import photo_pipeline
+
+    rng = random.Random(args.seed)
+    unique = max(1, int(args.uploads * (1 - args.duplicates)))
+    print(f"🖼  Generating {unique} images (~{args.size_kb} KB)", file=sys.stderr)
+    images = make_images(unique, args.size_kb, rng)
+    plan = [(f"team{rng.randint(1, args.teams):02d}", images[i % unique]) for i in range(args.uploads)]
+    rng.shuffle(plan)
+
+    latencies, statuses = [], {}
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    async with app.router.lifespan_context(app):
+        con = sqlite3.connect(os.environ["ES117_DB_PATH"])
+        con.executemany("INSERT INTO users (email, name) VALUES (?, ?)",
+                        [(f"student{i}@iitgn.ac.in", f"Student {i}") for i in range(1, 101)])
+        con.commit()
+        con.close()
+        tokens = [create_jwt(i, f"student{i}@iitgn.ac.in") for i in range(1, 101)]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def upload(i, team, data):
+                async with sem:
+                    started = time.perf_counter()
+                    resp = await client.post(
+                        f"/api/teams/{team}/photos",
+                        files={"file": (f"photo{i}.jpg", data, "image/jpeg")},
+                        data={"caption": f"Week {i % 12 + 1}"},
+                        headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+                    )
+                    latencies.append(time.perf_counter() - started)
+                    statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(upload(i, team, data) for i, (team, data) in enumerate(plan)))
+            upload_seconds = time.perf_counter() - started
+
+            while photo_pipeline.stats()["pending"]:
+                await asyncio.sleep(0.05)
+            variants_seconds = time.perf_counter() - started
+            listing = (await client.get("/api/photos/all", params={"limit": 200})).json()
+        stats = photo_pipeline.stats()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report = {
+        "benchmark": "photos",
+        "config": {"uploads": args.uploads, "unique_images": unique, "size_kb": args.size_kb,
+                   "concurrency": args.concurrency, "teams": args.teams},
+        "upload": {
+            "seconds": round(upload_seconds, 3),
+            "uploads_per_s": round(args.uploads / upload_seconds, 1),
+            "mb_per_s": round(sum(len(d) for _, d in plan) / upload_seconds / 1e6, 1),
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(_pct(latencies, 95) * 1000, 2),
+            "p99_ms": round(_pct(latencies, 99) * 1000, 2),
+            "statuses": statuses,
+        },
+        "variants": {
+            "pillow": stats["pillow"],
+            "workers": args.workers,
+            "rendered": stats["rendered"],
+            "failures": stats["render_failures"],
+            "all_ready_after_s": round(variants_seconds, 3),
+            "listed_with_thumbnails": sum(1 for p in listing if p["thumb_url"] != p["original_url"]),
+        },
+        "storage": {
+            "stored_bytes": stats["bytes_stored"],
+            "duplicate_uploads": stats["duplicates"],
+        },
+        "peak_rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0 if stats["render_failures"] == 0 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent team photo uploads")
+    parser.add_argument("--uploads", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--size-kb", type=int, default=900)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Share of uploads repeating an image")
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ES117_PHOTO_WORKERS", "2")))
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+    os.environ["ES117_PHOTO_WORKERS"] = str(args.workers)
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,119 @@
+"""ES117 Backend — Bulk poll import benchmark
+
+Boots the app in-process against a temporary database and imports the
+same set of lecture polls three ways:
+
+  legacy_sql     the statements create_poll used to run, replayed on one
+                 connection: an INSERT per option, a re-SELECT, a commit per poll
+  per_poll       one POST /api/polls per poll
+  bulk           a single POST /api/polls/bulk (one transaction)
+
+Reports wall time per import (best of --repeat) and checks that the bulk
+import returns the same polls, in order, as the per-poll one.
+
+Usage:
+    python -m benchmarks.bench_poll_import --polls 100 --options 4 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def make_polls(count: int, options: int) -> list[dict]:
+    return [{"question": f"Lecture question {i + 1}?",
+             "options": [{"text": f"Option {chr(65 + j)}"} for j in range(options)]}
+            for i in range(count)]
+
+
+async def legacy_import(db_path: str, polls: list[dict]):
+    """The pre-bulk create_poll statements, per poll."""
+    import aiosqlite
+    async with aiosqlite.connect(db_path) as db:
+        for poll in polls:
+            cursor = await db.execute("INSERT INTO polls (question) VALUES (?)", (poll["question"],))
+            poll_id = cursor.lastrowid
+            for opt in poll["options"]:
+                await db.execute("INSERT INTO poll_options (poll_id, text) VALUES (?, ?)", (poll_id, opt["text"]))
+            await db.commit()
+            rows = await db.execute("SELECT id, text FROM poll_options WHERE poll_id = ?", (poll_id,))
+            await rows.fetchall()
+
+
+async def best_of(repeat: int, fn) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 2)
+
+
+def _shape(polls: list[dict]) -> list:
+    return [(p["question"], p["is_active"], [o["text"] for o in p["options"]], bool(p["created_at"]))
+            for p in polls]
+
+
+async def main(args) -> int:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="es117-polls-"), "bench.db")
+    os.environ["ES117_DB_PATH"] = db_path
+    # Import after ES117_DB_PATH is set: config reads it at import time
+    import httpx
+    from benchmarks import load
+    from app.auth import create_jwt
+    from app.database import init_db
+    from app.main import app
+
+    await init_db()
+    load.seed(db_path, 10, 0, 0, 0, random.Random(args.seed))
+    headers = {"Authorization": f"Bearer {create_jwt(1, 'student1@iitgn.ac.in')}"}
+    polls = make_polls(args.polls, args.options)
+
+    report = {"benchmark": "poll_import", "config": {k: getattr(args, k) for k in ("polls", "options", "repeat")}}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            per_poll_result, bulk_result = [], []
+
+            async def per_poll():
+                per_poll_result.clear()
+                for poll in polls:
+                    resp = await client.post("/api/polls", json=poll, headers=headers)
+                    resp.raise_for_status()
+                    per_poll_result.append(resp.json())
+
+            async def bulk():
+                resp = await client.post("/api/polls/bulk", json={"polls": polls}, headers=headers)
+                resp.raise_for_status()
+                bulk_result[:] = resp.json()
+
+            ms = {
+                "legacy_sql": await best_of(args.repeat, lambda: legacy_import(db_path, polls)),
+                "per_poll": await best_of(args.repeat, per_poll),
+                "bulk": await best_of(args.repeat, bulk),
+            }
+    report["ms"] = ms
+    report["speedup_vs_per_poll"] = round(ms["per_poll"] / ms["bulk"], 1)
+    report["speedup_vs_legacy_sql"] = round(ms["legacy_sql"] / ms["bulk"], 1)
+    report["same_result"] = _shape(bulk_result) == _shape(per_poll_result)
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0 if report["same_result"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk poll creation against per-poll creation")
+    parser.add_argument("--polls", type=int, default=100)
+    parser.add_argument("--options", type=int, default=4, help="Options per poll")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed imports per path (best is reported)")
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
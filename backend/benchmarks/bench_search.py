@@ -0,0 +1,125 @@
+"""ES117 Backend — Full-text search benchmark
+
+Seeds a temporary database with --shoutouts synthetic shoutouts (the
+triggers index them as they go; a few carry rare words) and the real
+data/teams.json, boots the app in-process and times GET /api/search for:
+
+  common    one word in a large share of all shoutouts (ranking the most rows)
+  two       two common words, both required
+  prefix    an unfinished word, as typed into a search box
+  rare      a word in a handful of shoutouts
+  page      the common query at offset 200
+
+Each query is compared with a newest-first LIKE '%word%' scan of the
+shoutouts table: unranked, and quick only when matches are common and
+recent. Also reports how long the --reindex rebuild takes.
+
+Usage:
+    python -m benchmarks.bench_search --shoutouts 100000 --iterations 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+QUERIES = {
+    "common": ("robot", {}),
+    "two": ("solar drone", {}),
+    "prefix": ("protot", {}),
+    "rare": ("quasar", {}),
+    "page": ("robot", {"offset": 200}),
+}
+RARE_ROWS = 25
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def main(args) -> int:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="es117-search-"), "bench.db")
+    os.environ["ES117_DB_PATH"] = db_path
+    # Import after ES117_DB_PATH is set: config reads it at import time
+    import aiosqlite
+    import httpx
+    from benchmarks import load
+    from app.config import SEARCH_RANK_WINDOW
+    from app.database import init_db
+    from app.main import app
+    from app.search import reindex
+
+    await init_db()
+    rng = random.Random(args.seed)
+    # The rare rows go in first, so a newest-first scan has to cross the whole wall to find them
+    async with aiosqlite.connect(db_path) as db:
+        await db.executemany("INSERT INTO shoutouts (message, user_id) VALUES (?, ?)",
+                             [(f"spotted a quasar during the night lab {i}", 1) for i in range(RARE_ROWS)])
+        await db.commit()
+    print(f"🌱 Seeding {args.shoutouts} shoutouts into {db_path}", file=sys.stderr)
+    started = time.perf_counter()
+    load.seed(db_path, args.users, args.shoutouts, 0, 0, rng)
+    seed_seconds = time.perf_counter() - started
+
+    report = {"benchmark": "search", "rank_window": SEARCH_RANK_WINDOW,
+              "config": {k: getattr(args, k) for k in ("shoutouts", "iterations", "limit")},
+              "seed_seconds_with_triggers": round(seed_seconds, 2), "queries": {}}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client, \
+                aiosqlite.connect(db_path) as db:
+            for label, (q, extra) in QUERIES.items():
+                params = {"q": q, "scope": "shoutouts", "limit": args.limit, **extra}
+                await client.get("/api/search", params=params)  # warm the page cache
+                fts, like, hits = [], [], 0
+                for _ in range(args.iterations):
+                    t = time.perf_counter()
+                    resp = await client.get("/api/search", params=params)
+                    fts.append(time.perf_counter() - t)
+                    hits = len(resp.json()["shoutouts"]["results"])
+                for _ in range(max(1, args.iterations // 5)):
+                    t = time.perf_counter()
+                    rows = await db.execute(
+                        "SELECT id, message FROM shoutouts WHERE " +
+                        " AND ".join(["message LIKE ?"] * len(q.split())) +
+                        " ORDER BY id DESC LIMIT ? OFFSET ?",
+                        (*[f"%{w}%" for w in q.split()], args.limit, extra.get("offset", 0)))
+                    await rows.fetchall()
+                    like.append(time.perf_counter() - t)
+                count = await db.execute("SELECT COUNT(*) FROM shoutouts_fts WHERE shoutouts_fts MATCH ?",
+                                         (" ".join(f'"{w}"' for w in q.split()) + "*",))
+                report["queries"][label] = {
+                    "q": q, **extra,
+                    "matches": (await count.fetchone())[0],
+                    "returned": hits,
+                    "p50_ms": round(statistics.median(fts) * 1000, 2),
+                    "p95_ms": round(_pct(fts, 95) * 1000, 2),
+                    "like_scan_p50_ms": round(statistics.median(like) * 1000, 2),
+                }
+
+            started = time.perf_counter()
+            await reindex(db)
+            report["reindex_seconds"] = round(time.perf_counter() - started, 2)
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /api/search over a large shoutout wall")
+    parser.add_argument("--shoutouts", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,144 @@
+"""ES117 Backend — Response serialization benchmark
+
+Seeds a temporary database, loads the shoutout wall and the polls the way
+the routers do, and times three ways of turning the rows into a body:
+
+  response_model  build Pydantic models, validate and dump them again, then
+                  json.dumps (what returning models through FastAPI costs)
+  model_dump      build models and model_dump() them (the old router path)
+  fast            dicts straight from the SQLite tuples, encoded by
+                  app.cache.dumps (orjson when installed)
+
+It then streams the whole wall from /api/shoutouts/ndjson and reports time
+to the first byte against the time to encode the full array. That the fast
+rows are schema-equivalent to ShoutoutOut / PollOut is asserted by
+tests/test_serialization.py, not measured here.
+
+Usage:
+    python -m benchmarks.bench_serialize --shoutouts 20000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def _stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def best_of(fn, repeat: int) -> float:
+    """Fastest of `repeat` runs, in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 3)
+
+
+async def first_byte(app, path: str, query: str = "") -> dict:
+    """GET path on the ASGI app directly (httpx's ASGI transport buffers), timing the first body chunk."""
+    started, first, size, chunks = time.perf_counter(), None, 0, 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # never disconnects
+
+    async def send(message):
+        nonlocal first, size, chunks
+        if message["type"] == "http.response.body" and message.get("body"):
+            first = first or time.perf_counter()
+            size += len(message["body"])
+            chunks += 1
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+             "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1),
+             "server": ("bench", 80)}
+    await app(scope, receive, send)
+    done = time.perf_counter()
+    return {"ttfb_ms": round((first - started) * 1000, 3), "total_ms": round((done - started) * 1000, 3),
+            "bytes": size, "chunks": chunks}
+
+
+async def main(args) -> int:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="es117-serialize-"), "bench.db")
+    os.environ["ES117_DB_PATH"] = db_path
+    # Import after ES117_DB_PATH is set: config reads it at import time
+    from benchmarks import load
+    from pydantic import TypeAdapter
+    from app.cache import dumps, orjson
+    from app.database import init_db, pool
+    from app.main import app
+    from app.models import PollOptionOut, PollOut, ShoutoutOut
+    from app.routers.polls import _fetch_polls
+    from app.routers.shoutouts import _row, _select
+
+    await init_db()
+    print(f"🌱 Seeding {db_path}", file=sys.stderr)
+    load.seed(db_path, args.users, args.shoutouts, args.polls, args.votes, random.Random(args.seed))
+
+    report = {"benchmark": "serialize", "encoder": "orjson" if orjson else "json",
+              "config": {k: getattr(args, k) for k in ("users", "shoutouts", "polls", "votes", "repeat", "seed")}}
+    async with app.router.lifespan_context(app):
+        async with pool.reader() as db:
+            rows = await _select(db, None, None, args.shoutouts)
+            polls = await _fetch_polls(db, "1 = 1", (), None)
+
+        shoutout_list = TypeAdapter(list[ShoutoutOut])
+        poll_list = TypeAdapter(list[PollOut])
+
+        def poll_models():
+            return [PollOut(**{**p, "options": [PollOptionOut(**o) for o in p["options"]]}) for p in polls]
+
+        report["shoutouts"] = {"rows": len(rows), "ms": {
+            "response_model": best_of(lambda: _stdlib_dumps(shoutout_list.dump_python(shoutout_list.validate_python(
+                [ShoutoutOut(id=r[0], message=r[1], author_name=r[2], created_at=r[3]) for r in rows]),
+                mode="json")), args.repeat),
+            "model_dump": best_of(lambda: _stdlib_dumps(
+                [ShoutoutOut(id=r[0], message=r[1], author_name=r[2], created_at=r[3]).model_dump()
+                 for r in rows]), args.repeat),
+            "fast_stdlib": best_of(lambda: _stdlib_dumps([_row(r) for r in rows]), args.repeat),
+            "fast": best_of(lambda: dumps([_row(r) for r in rows]), args.repeat),
+        }}
+        report["polls"] = {"rows": len(polls), "options": sum(len(p["options"]) for p in polls), "ms": {
+            "response_model": best_of(lambda: _stdlib_dumps(poll_list.dump_python(
+                poll_list.validate_python(poll_models()), mode="json")), args.repeat),
+            "model_dump": best_of(lambda: _stdlib_dumps([p.model_dump() for p in poll_models()]), args.repeat),
+            "fast": best_of(lambda: dumps(polls), args.repeat),
+        }}
+        for section in (report["shoutouts"], report["polls"]):
+            section["speedup_vs_response_model"] = round(section["ms"]["response_model"] / section["ms"]["fast"], 1)
+
+        await first_byte(app, "/api/shoutouts/ndjson")  # warm up
+        report["ndjson"] = await first_byte(app, "/api/shoutouts/ndjson")
+        report["ndjson"]["rows"] = len(rows)
+        report["ndjson"]["full_array_encode_ms"] = report["shoutouts"]["ms"]["fast"]
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response serialization paths")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--shoutouts", type=int, default=20000)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per path (best is reported)")
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,217 @@
+"""ES117 Backend — Multi-worker scaling benchmark
+
+For each worker count, starts `uvicorn app.main:app --workers N` on a
+fresh seeded database and drives one of the load.py workloads from
+several client processes at once (a single Python client tops out well
+below what a few workers can serve). Reports throughput and latency per
+worker count, then checks coherence: after a write through one worker,
+fresh connections (spread over all workers) must see it, and the report
+shows how long that took and the change-feed lag each worker measured.
+
+Throughput can only scale up to the number of cores; the report
+includes os.cpu_count() so runs are comparable.
+
+Usage:
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --clients 4 --requests 4000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _client(url: str, data: dict, args: dict, index: int, barrier, results):
+    """One load-generating process: waits for its siblings, then runs the workload."""
+    from benchmarks import load
+
+    async def run():
+        import httpx
+        from app.auth import create_jwt
+        tokens = {u: create_jwt(u, f"student{u}@iitgn.ac.in") for u in range(1, data["users"] + 1)}
+        ns = SimpleNamespace(requests=args["requests"], concurrency=args["concurrency"])
+        limits = httpx.Limits(max_connections=args["concurrency"], max_keepalive_connections=args["concurrency"])
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+            await client.get("/health")
+            barrier.wait()
+            started = time.time()
+            summary = await load.WORKLOADS[args["scenario"]](
+                client, data, tokens, ns, random.Random(args["seed"] + index))
+        summary["started"], summary["ended"] = started, time.time()
+        return summary
+
+    results.put(asyncio.run(run()))
+
+
+def drive(url: str, data: dict, args) -> dict:
+    """Run args.clients load processes in parallel and merge their summaries."""
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(args.clients), ctx.Queue()
+    spec = {"scenario": args.scenario, "requests": args.requests // args.clients,
+            "concurrency": max(1, args.concurrency // args.clients), "seed": args.seed}
+    procs = [ctx.Process(target=_client, args=(url, data, spec, i, barrier, results)) for i in range(args.clients)]
+    for p in procs:
+        p.start()
+    summaries = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    elapsed = max(s["ended"] for s in summaries) - min(s["started"] for s in summaries)
+    requests = sum(s["requests"] for s in summaries)
+    endpoints = {}
+    for s in summaries:
+        for label, e in s["endpoints"].items():
+            merged = endpoints.setdefault(label, {"count": 0, "p50_ms": 0.0, "p95_ms_worst_client": 0.0})
+            merged["count"] += e["count"]
+            merged["p50_ms"] += e["p50_ms"] * e["count"]
+            merged["p95_ms_worst_client"] = max(merged["p95_ms_worst_client"], e["p95_ms"])
+    for merged in endpoints.values():
+        merged["p50_ms"] = round(merged["p50_ms"] / merged["count"], 2)
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "errors": sum(s["errors"] for s in summaries),
+        "endpoints": endpoints,
+    }
+
+
+async def check_coherence(url: str, workers: int, token: str) -> dict:
+    """Write through one connection, then read on fresh ones until every worker serves the write."""
+    import httpx
+    async with httpx.AsyncClient(base_url=url, timeout=10) as client:
+        resp = await client.post("/api/shoutouts", json={"message": "coherence probe"},
+                                 headers={"Authorization": f"Bearer {token}"})
+        new_id = resp.json()["id"]
+    written = time.perf_counter()
+
+    needed, streak, stale_reads, converged = 4 * workers, 0, 0, 0.0
+    while streak < needed and time.perf_counter() - written < 10:
+        # A new connection each time, so the kernel spreads them over the workers
+        async with httpx.AsyncClient(base_url=url, timeout=10) as fresh:
+            newest = (await fresh.get("/api/shoutouts", params={"limit": 1})).json()[0]["id"]
+        if newest == new_id:
+            streak += 1
+        else:
+            streak, stale_reads = 0, stale_reads + 1
+            converged = time.perf_counter() - written  # last read that missed the write
+
+    seen = {}
+    for _ in range(8 * workers):
+        async with httpx.AsyncClient(base_url=url, timeout=10) as fresh:
+            health = (await fresh.get("/health/details")).json()
+        seen[health["worker"]["pid"]] = health["change_feed"]
+    return {
+        "consistent": streak >= needed,
+        "converged_ms": round(converged * 1000, 1),
+        "stale_reads": stale_reads,
+        "workers_seen": len(seen),
+        "feed_lag_ms_max": round(max(f["lag_seconds_max"] for f in seen.values()) * 1000, 1),
+        "feed_errors": sum(f["errors"] for f in seen.values()),
+    }
+
+
+def run_one(workers: int, args) -> dict:
+    from benchmarks import load
+    tmp = tempfile.mkdtemp(prefix=f"es117-workers{workers}-")
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "ES117_DB_PATH": os.path.join(tmp, "bench.db"),
+        "ES117_PHOTO_DIR": os.path.join(tmp, "photos"),
+        "ES117_WORKERS": str(workers),
+        "ES117_PHOTO_WORKERS": "1",
+        "ES117_PROFILE": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        import httpx
+        deadline = time.time() + 60
+        while True:
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise RuntimeError(f"server with {workers} workers did not come up")
+            time.sleep(0.2)
+        time.sleep(1)  # let the remaining workers finish their lifespan
+
+        rng = random.Random(args.seed)
+        data = load.seed(env["ES117_DB_PATH"], args.users, args.shoutouts, args.polls, args.votes, rng)
+        print(f"  {workers} worker(s): driving {args.requests} {args.scenario} requests", file=sys.stderr)
+        result = drive(url, data, args)
+
+        os.environ["ES117_DB_PATH"] = env["ES117_DB_PATH"]
+        from app.auth import create_jwt
+        result["coherence"] = asyncio.run(check_coherence(url, workers, create_jwt(1, "student1@iitgn.ac.in")))
+        print(f"    {result['throughput_rps']} req/s, {result['errors']} errors, "
+              f"converged in {result['coherence']['converged_ms']} ms", file=sys.stderr)
+        return result
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(args) -> int:
+    report = {
+        "benchmark": "workers",
+        "cpus": os.cpu_count(),
+        "config": {k: getattr(args, k) for k in ("scenario", "requests", "concurrency", "clients", "users",
+                                                 "shoutouts", "polls", "votes", "seed")},
+        "runs": {},
+    }
+    for workers in args.workers:
+        report["runs"][str(workers)] = run_one(workers, args)
+    base = report["runs"][str(args.workers[0])]["throughput_rps"]
+    for run in report["runs"].values():
+        run["speedup"] = round(run["throughput_rps"] / base, 2)
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(out)
+    print(out)
+    healthy = all(r["errors"] == 0 and r["coherence"]["consistent"] for r in report["runs"].values())
+    return 0 if healthy else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure throughput scaling across uvicorn worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--scenario", default="mixed", choices=("vote-storm", "wall-refresh", "mixed"))
+    parser.add_argument("--requests", type=int, default=4000, help="Total requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=128, help="Total in-flight requests")
+    parser.add_argument("--clients", type=int, default=4, help="Load-generating processes")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--shoutouts", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--output", help="Write the JSON report here")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,359 @@
+"""ES117 Backend — Load test and latency benchmark
+
+Boots app.main:app against a temporary SQLite file, seeds realistic data
+(users, shoutouts, polls, votes), forges JWTs with create_jwt and drives
+concurrent workloads. Per endpoint it reports p50/p95/p99 latency,
+throughput and DB time (from the Server-Timing header), as JSON so runs
+can be diffed or gated in regression checks.
+
+Scenarios:
+    vote-storm    every user votes (and some revote) on the live polls at once
+    wall-refresh  anonymous wall + poll reloads, half of them conditional
+    mixed         signed-in browsing with votes and the odd shoutout
+    write-flood   a few scripted accounts spam shoutouts while everyone else votes;
+                  the spam should be cut off (429/503) and the votes still get through
+
+Usage:
+    python -m benchmarks.load                              # all scenarios, in-process
+    python -m benchmarks.load --scenario vote-storm --users 5000 --concurrency 400
+    python -m benchmarks.load --output run.json --compare baseline.json --tolerance 0.25
+    python -m benchmarks.load --url http://127.0.0.1:8000 --db /path/to/es117.db   # live server
+    python -m benchmarks.load --check-plans    # also fail on full table scans, on the seeded data
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+SCENARIOS = ("vote-storm", "wall-refresh", "mixed", "write-flood")
+
+_WORDS = ("great", "demo", "robot", "sensor", "team", "idea", "build", "prototype", "solar", "drone",
+          "awesome", "keep", "going", "shoutout", "amazing", "progress", "circuit", "design", "code")
+
+
+def seed(db_path: str, users: int, shoutouts: int, polls: int, votes: int, rng: random.Random) -> dict:
+    """Fill an initialized database with synthetic data. Returns ids the workloads need."""
+    con = sqlite3.connect(db_path)
+    con.executemany("INSERT INTO users (email, name) VALUES (?, ?)",
+                    [(f"student{i}@iitgn.ac.in", f"Student {i}") for i in range(1, users + 1)])
+    con.executemany("INSERT INTO shoutouts (message, user_id) VALUES (?, ?)", [
+        (" ".join(rng.choices(_WORDS, k=rng.randint(4, 20))), rng.randint(1, users))
+        for _ in range(shoutouts)
+    ])
+    options: dict[int, list[int]] = {}
+    for p in range(polls):
+        cur = con.execute("INSERT INTO polls (question, is_active) VALUES (?, ?)",
+                          (f"Lecture question {p + 1}?", 1 if p < max(1, polls // 2) else 0))
+        poll_id = cur.lastrowid
+        options[poll_id] = []
+        for o in range(rng.randint(2, 5)):
+            cur = con.execute("INSERT INTO poll_options (poll_id, text) VALUES (?, ?)", (poll_id, f"Option {o + 1}"))
+            options[poll_id].append(cur.lastrowid)
+    vote_rows = {}
+    poll_ids = list(options)
+    for _ in range(votes):
+        poll_id = rng.choice(poll_ids)
+        vote_rows[(poll_id, rng.randint(1, users))] = rng.choice(options[poll_id])
+    con.executemany("INSERT INTO poll_votes (poll_id, user_id, option_id) VALUES (?, ?, ?)",
+                    [(p, u, o) for (p, u), o in vote_rows.items()])
+    con.execute("""
+        UPDATE poll_options SET vote_count = (SELECT COUNT(*) FROM poll_votes WHERE option_id = poll_options.id)
+    """)
+    con.commit()
+    active = [r[0] for r in con.execute("SELECT id FROM polls WHERE is_active = 1")]
+    con.close()
+    return {"users": users, "options": {p: options[p] for p in active}}
+
+
+class Recorder:
+    """Latency, DB time and status per endpoint label."""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.db = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client, label: str, method: str, url: str, ok=(200, 201, 304), **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[label] += 1
+            return None
+        self.latency[label].append(time.perf_counter() - started)
+        self.statuses[label][resp.status_code] += 1
+        if resp.status_code not in ok:
+            self.errors[label] += 1
+        match = re.search(r"db;dur=([\d.]+)", resp.headers.get("server-timing", ""))
+        if match:
+            self.db[label].append(float(match.group(1)) / 1000)
+        return resp
+
+    def summary(self, elapsed: float) -> dict:
+        def pct(values, p):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+        endpoints = {}
+        for label, values in sorted(self.latency.items()):
+            db = self.db.get(label, [])
+            endpoints[label] = {
+                "count": len(values),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": round(pct(values, 50) * 1000, 2),
+                "p95_ms": round(pct(values, 95) * 1000, 2),
+                "p99_ms": round(pct(values, 99) * 1000, 2),
+                "db_mean_ms": round(statistics.fmean(db) * 1000, 3) if db else None,
+                "db_p95_ms": round(pct(db, 95) * 1000, 3) if db else None,
+                "errors": self.errors.get(label, 0),
+                "statuses": dict(self.statuses[label]),
+            }
+        total = sum(len(v) for v in self.latency.values())
+        return {"seconds": round(elapsed, 3), "requests": total, "throughput_rps": round(total / elapsed, 1),
+                "errors": sum(self.errors.values()), "endpoints": endpoints}
+
+
+async def _gather_limited(jobs, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with sem:
+            await job()
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+
+def _auth(tokens, user_id: int) -> dict:
+    return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+
+async def vote_storm(client, data, tokens, args, rng) -> dict:
+    rec = Recorder()
+    polls = list(data["options"])
+
+    def job(user_id):
+        async def run():
+            poll_id = rng.choice(polls)
+            for _ in range(2 if rng.random() < 0.2 else 1):  # some students change their mind
+                await rec.call(client, "POST /api/polls/{id}/vote", "POST", f"/api/polls/{poll_id}/vote",
+                               json={"option_id": rng.choice(data["options"][poll_id])},
+                               headers=_auth(tokens, user_id))
+        return run
+
+    started = time.perf_counter()
+    await _gather_limited([job(u) for u in range(1, data["users"] + 1)], args.concurrency)
+    return rec.summary(time.perf_counter() - started)
+
+
+async def wall_refresh(client, data, tokens, args, rng) -> dict:
+    rec = Recorder()
+    etags: dict[str, str] = {}
+
+    def job(i):
+        async def run():
+            conditional = i % 2 == 1
+            for label, url in (("GET /api/shoutouts", "/api/shoutouts"), ("GET /api/polls", "/api/polls")):
+                headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+                resp = await rec.call(client, label, "GET", url, headers=headers)
+                if resp is not None and "etag" in resp.headers:
+                    etags[url] = resp.headers["etag"]
+            if rng.random() < 0.1:
+                await rec.call(client, "GET /api/shoutouts?before", "GET",
+                               f"/api/shoutouts?before={rng.randint(2, 10_000)}&limit=50")
+        return run
+
+    started = time.perf_counter()
+    await _gather_limited([job(i) for i in range(args.requests)], args.concurrency)
+    return rec.summary(time.perf_counter() - started)
+
+
+async def mixed(client, data, tokens, args, rng) -> dict:
+    rec = Recorder()
+    polls = list(data["options"])
+
+    def job(i):
+        async def run():
+            user_id = rng.randint(1, data["users"])
+            headers = _auth(tokens, user_id)
+            roll = rng.random()
+            if roll < 0.30:
+                await rec.call(client, "GET /api/polls (auth)", "GET", "/api/polls", headers=headers)
+            elif roll < 0.55:
+                await rec.call(client, "GET /api/shoutouts", "GET", "/api/shoutouts")
+            elif roll < 0.65:
+                await rec.call(client, "GET /api/polls/{id}", "GET", f"/api/polls/{rng.choice(polls)}",
+                               headers=headers)
+            elif roll < 0.80:
+                await rec.call(client, "GET /api/auth/me", "GET", "/api/auth/me", headers=headers)
+            elif roll < 0.95:
+                poll_id = rng.choice(polls)
+                await rec.call(client, "POST /api/polls/{id}/vote", "POST", f"/api/polls/{poll_id}/vote",
+                               json={"option_id": rng.choice(data["options"][poll_id])}, headers=headers)
+            else:
+                await rec.call(client, "POST /api/shoutouts", "POST", "/api/shoutouts",
+                               json={"message": " ".join(rng.choices(_WORDS, k=8))}, headers=headers)
+        return run
+
+    started = time.perf_counter()
+    await _gather_limited([job(i) for i in range(args.requests)], args.concurrency)
+    return rec.summary(time.perf_counter() - started)
+
+
+async def write_flood(client, data, tokens, args, rng) -> dict:
+    rec = Recorder()
+    polls = list(data["options"])
+    spammers = range(1, 6)
+
+    def spam(i):
+        async def run():
+            await rec.call(client, "POST /api/shoutouts (spam)", "POST", "/api/shoutouts", ok=(201, 429, 503),
+                           json={"message": f"spam {i}"}, headers=_auth(tokens, spammers[i % len(spammers)]))
+        return run
+
+    def student(user_id):
+        async def run():
+            poll_id = rng.choice(polls)
+            await rec.call(client, "POST /api/polls/{id}/vote", "POST", f"/api/polls/{poll_id}/vote",
+                           json={"option_id": rng.choice(data["options"][poll_id])},
+                           headers=_auth(tokens, user_id))
+        return run
+
+    jobs = [spam(i) for i in range(args.requests)] + [student(u) for u in range(len(spammers) + 1, data["users"] + 1)]
+    rng.shuffle(jobs)
+    started = time.perf_counter()
+    await _gather_limited(jobs, args.concurrency)
+    return rec.summary(time.perf_counter() - started)
+
+
+WORKLOADS = {"vote-storm": vote_storm, "wall-refresh": wall_refresh, "mixed": mixed, "write-flood": write_flood}
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """p95 regressions beyond `tolerance` (fractional) versus a previous report."""
+    problems = []
+    for name, scenario in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for label, stats in scenario["endpoints"].items():
+            old = base["endpoints"].get(label)
+            if old and old["p95_ms"] > 0 and stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                problems.append(f"{name} {label}: p95 {old['p95_ms']} -> {stats['p95_ms']} ms")
+    return problems
+
+
+async def run_all(client, data, tokens, args) -> dict:
+    rng = random.Random(args.seed)
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    results = {}
+    for name in scenarios:
+        results[name] = await WORKLOADS[name](client, data, tokens, args, rng)
+        print(f"  {name}: {results[name]['throughput_rps']} req/s, {results[name]['errors']} errors",
+              file=sys.stderr)
+    return results
+
+
+async def main(args) -> int:
+    rng = random.Random(args.seed)
+    if args.url:
+        if not args.db:
+            sys.exit("--db is required with --url (the server's database file to seed)")
+        if args.check_plans:
+            sys.exit("--check-plans needs the in-process server (it reads the statements it ran)")
+        db_path = args.db
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="es117-load-"), "bench.db")
+        os.environ["ES117_DB_PATH"] = db_path
+    # Import after ES117_DB_PATH is set: config reads it at import time
+    import httpx
+    from app.auth import create_jwt
+    from app.database import init_db
+
+    if not args.url:
+        await init_db()
+    print(f"🌱 Seeding {db_path}", file=sys.stderr)
+    data = seed(db_path, args.users, args.shoutouts, args.polls, args.votes, rng)
+    tokens = {u: create_jwt(u, f"student{u}@iitgn.ac.in") for u in range(1, args.users + 1)}
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            results = await run_all(client, data, tokens, args)
+    else:
+        from app.main import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                results = await run_all(client, data, tokens, args)
+
+    report = {
+        "benchmark": "load",
+        "target": args.url or "in-process",
+        "config": {k: getattr(args, k) for k in ("users", "shoutouts", "polls", "votes", "requests",
+                                                 "concurrency", "seed")},
+        "scenarios": results,
+    }
+    status = 0
+    if args.check_plans:
+        import aiosqlite
+        from app.metrics import metrics
+        from app.migrations import check_query_plans
+        from app.query_plans import QUERY_PLAN_STATEMENTS, WHOLE_TABLE_READS
+        # The listed statements, plus any shape the scenarios ran that the list lacks
+        statements = [*(sql for name, sql in QUERY_PLAN_STATEMENTS.items() if name not in WHOLE_TABLE_READS),
+                      *metrics.request_statements()]
+        async with aiosqlite.connect(db_path) as db:
+            scans = await check_query_plans(db, statements, args.plan_min_rows)
+        report["query_plans"] = {"statements": len(statements), "min_rows": args.plan_min_rows, "full_scans": scans}
+        for scan in scans:
+            print(f"❌ full scan of {scan['table']} ({scan['rows']} rows): {scan['sql']}", file=sys.stderr)
+        status = 1 if scans else 0
+
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(out)
+    print(out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"❌ regression: {p}", file=sys.stderr)
+        status = 1 if problems else status
+    return status
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test the ES117 backend")
+    parser.add_argument("--scenario", default="all", choices=("all", *SCENARIOS))
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--shoutouts", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=30)
+    parser.add_argument("--votes", type=int, default=20000, help="Pre-existing votes to seed")
+    parser.add_argument("--requests", type=int, default=4000, help="Requests for wall-refresh / mixed")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=117)
+    parser.add_argument("--url", help="Target a running server instead of booting in-process")
+    parser.add_argument("--db", help="Database file of the --url server (seeded before the run)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Previous JSON report to check for p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 growth vs --compare")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="EXPLAIN the app's statements and those the routers ran; fail on full table scans")
+    parser.add_argument("--plan-min-rows", type=int, default=int(os.getenv("ES117_QUERY_PLAN_MIN_ROWS", "1000")),
+                        help="Only flag scans of tables at least this big")
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
@@ -0,0 +1,207 @@
+"""ES117 Backend — Local stub of Google's OAuth endpoints
+
+Serves /token, /userinfo and /certs so the OAuth callback can be exercised
+and benchmarked without talking to Google. id_tokens are RS256-signed with
+a throwaway key published at /certs, exactly like Google's JWKS.
+
+Usage:
+    python -m benchmarks.stub_oauth --port 8765 --delay-ms 40 --connect-delay-ms 80
+    # then point the backend at it:
+    ES117_GOOGLE_TOKEN_URL=http://127.0.0.1:8765/token \\
+    ES117_GOOGLE_USERINFO_URL=http://127.0.0.1:8765/userinfo \\
+    ES117_GOOGLE_CERTS_URL=http://127.0.0.1:8765/certs ...
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+KID = "stub-key-1"
+
+
+class StubOAuthServer:
+    """Threaded HTTP/1.1 server imitating Google's token, userinfo and certs endpoints.
+
+    `delay` is added to every request (network + server time); `connect_delay`
+    is paid once per new TCP connection to model the TLS handshake that a
+    shared keep-alive client avoids. Set `failures[endpoint]` to answer that
+    many of its next requests with a 503.
+    """
+
+    def __init__(self, port: int = 0, client_id: str = "stub-client", delay: float = 0.0,
+                 connect_delay: float = 0.0, email_domain: str = "iitgn.ac.in"):
+        # Keep the key object: re-parsing a PEM on every signature costs ~40 ms
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public_pem = self.private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+        public_jwk.update({"kid": KID, "use": "sig", "alg": "RS256"})
+        self.jwks = {"keys": [public_jwk]}
+        self.client_id = client_id
+        self.delay = delay
+        self.connect_delay = connect_delay
+        self.email_domain = email_domain
+        self.counts = {"connections": 0, "token": 0, "userinfo": 0, "certs": 0}
+        self.failures = {"token": 0, "userinfo": 0, "certs": 0}
+        self._lock = threading.Lock()
+        ThreadingHTTPServer.request_queue_size = 256  # a class-wide login burst must not overflow listen()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _count(self, key: str) -> bool:
+        """Count a request to an endpoint. Returns False if it should fail."""
+        with self._lock:
+            self.counts[key] += 1
+            if self.failures.get(key, 0) > 0:
+                self.failures[key] -= 1
+                return False
+            return True
+
+    def _user_for(self, code: str) -> dict:
+        n = code.rsplit("-", 1)[-1]
+        return {
+            "email": f"student{n}@{self.email_domain}",
+            "verified_email": True,
+            "name": f"Student {n}",
+            "picture": f"https://example.invalid/{n}.png",
+        }
+
+    def _id_token(self, user: dict, access_token: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com",
+            "aud": self.client_id,
+            "sub": user["email"],
+            "email": user["email"],
+            "email_verified": True,
+            "name": user["name"],
+            "picture": user["picture"],
+            "iat": now,
+            "exp": now + 3600,
+        }
+        return jwt.encode(claims, self.private_key, algorithm="RS256", headers={"kid": KID},
+                          access_token=access_token)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub._count("connections")
+                time.sleep(stub.connect_delay)
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict, headers: dict | None = None):
+                data = json.dumps(body).encode()
+                time.sleep(stub.delay)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                if self.path != "/token":
+                    return self._send(404, {"error": "not_found"})
+                if not stub._count("token"):
+                    return self._send(503, {"error": "unavailable"})
+                code = form.get("code", "")
+                if not code.startswith("code-"):
+                    return self._send(400, {"error": "invalid_grant"})
+                access_token = f"access-{code}"
+                self._send(200, {
+                    "access_token": access_token,
+                    "token_type": "Bearer",
+                    "expires_in": 3599,
+                    "id_token": stub._id_token(stub._user_for(code), access_token),
+                })
+
+            def do_GET(self):
+                if self.path == "/_stats":
+                    return self._send(200, stub.counts)
+                if self.path == "/certs":
+                    if not stub._count("certs"):
+                        return self._send(503, {"error": "unavailable"})
+                    return self._send(200, stub.jwks, {"Cache-Control": "public, max-age=21600"})
+                if self.path == "/userinfo":
+                    if not stub._count("userinfo"):
+                        return self._send(503, {"error": "unavailable"})
+                    auth = self.headers.get("Authorization", "")
+                    if not auth.startswith("Bearer access-code-"):
+                        return self._send(401, {"error": "invalid_token"})
+                    return self._send(200, stub._user_for(auth.removeprefix("Bearer access-")))
+                self._send(404, {"error": "not_found"})
+
+        return Handler
+
+    def start(self) -> "StubOAuthServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+def run_in_subprocess(port: int, client_id: str = "stub-client", delay: float = 0.0,
+                      connect_delay: float = 0.0) -> subprocess.Popen:
+    """Start the stub in its own process so it doesn't share a GIL with the app under test."""
+    proc = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.stub_oauth", "--port", str(port), "--client-id", client_id,
+        "--delay-ms", str(delay * 1000), "--connect-delay-ms", str(connect_delay * 1000),
+    ], stdout=subprocess.DEVNULL, cwd=Path(__file__).parent.parent)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats", timeout=1)
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("stub OAuth server did not start")
+
+
+def fetch_counts(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats", timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of Google's OAuth endpoints")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--client-id", default="stub-client")
+    parser.add_argument("--delay-ms", type=float, default=0)
+    parser.add_argument("--connect-delay-ms", type=float, default=0)
+    args = parser.parse_args()
+    server = StubOAuthServer(args.port, args.client_id, args.delay_ms / 1000, args.connect_delay_ms / 1000)
+    print(f"🔐 Stub OAuth server on {server.base_url} (client id {args.client_id})")
+    server.serve_forever()
@@ -15,11 +15,13 @@ if [ -f .env ]; then
 fi
 
 PORT="${ES117_PORT:-8000}"
+# Worker processes; exported so each worker's config sees it (enables the change feed when > 1)
+export ES117_WORKERS="${ES117_WORKERS:-1}"
 export PATH="$HOME/.local/bin:$PATH"
 
 # Start FastAPI backend
-echo "🚀 Starting ES117 backend on port $PORT..."
-uv run uvicorn app.main:app --host 127.0.0.1 --port "$PORT" &
+echo "🚀 Starting ES117 backend on port $PORT ($ES117_WORKERS worker(s))..."
+uv run uvicorn app.main:app --host 127.0.0.1 --port "$PORT" --workers "$ES117_WORKERS" &
 BACKEND_PID=$!
 sleep 2
 
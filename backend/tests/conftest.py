@@ -0,0 +1,9 @@
+"""ES117 Backend — test setup
+
+app.config reads its settings at import time, so the environment is set
+here, before any test imports the app: every run gets a scratch database.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("ES117_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="es117-test-"), "es117.db"))
@@ -0,0 +1,189 @@
+"""OAuth client, Google key cache and JWT cache, against the local stub OAuth server."""
+import asyncio
+import hashlib
+import sqlite3
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from app import auth
+from app.config import DB_PATH, JWT_ALGORITHM, JWT_SECRET, OAUTH_RETRIES
+from app.database import init_db, pool
+from app.main import app
+from app.routers.auth_routes import callback, me
+from benchmarks.stub_oauth import StubOAuthServer
+
+CLIENT_ID = "test-client"
+
+
+@pytest.fixture(scope="module")
+def server():
+    stub = StubOAuthServer(client_id=CLIENT_ID).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def stub(server, monkeypatch):
+    server.counts = dict.fromkeys(server.counts, 0)
+    server.failures = dict.fromkeys(server.failures, 0)
+    monkeypatch.setattr(auth, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(auth, "GOOGLE_TOKEN_URL", f"{server.base_url}/token")
+    monkeypatch.setattr(auth, "GOOGLE_USERINFO_URL", f"{server.base_url}/userinfo")
+    monkeypatch.setattr(auth, "GOOGLE_CERTS_URL", f"{server.base_url}/certs")
+    monkeypatch.setattr(auth, "OAUTH_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(auth, "_google_keys", {"jwks": None, "expires": 0.0})
+    monkeypatch.setattr(auth, "_google_keys_lock", asyncio.Lock())
+    return server
+
+
+def run(coro):
+    """Run a coroutine on a fresh loop, closing the shared client (bound to that loop) after."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await auth.close_http_client()
+    return asyncio.run(main())
+
+
+def id_token(stub: StubOAuthServer, n: int = 1) -> str:
+    return stub._id_token(stub._user_for(f"code-{n}"), f"access-code-{n}")
+
+
+def test_signing_keys_are_fetched_once_and_reused(stub):
+    async def logins():
+        for n in range(3):
+            await auth.verify_google_id_token(id_token(stub, n), f"access-code-{n}")
+    run(logins())
+    assert stub.counts["certs"] == 1
+
+
+def test_concurrent_cold_cache_logins_fetch_keys_once(stub):
+    async def burst():
+        return await asyncio.gather(*(
+            auth.verify_google_id_token(id_token(stub, n), f"access-code-{n}") for n in range(30)
+        ))
+    claims = run(burst())
+    assert [c["email"] for c in claims] == [f"student{n}@iitgn.ac.in" for n in range(30)]
+    assert stub.counts["certs"] == 1
+
+
+def test_signing_keys_expire_with_max_age(stub):
+    run(auth.verify_google_id_token(id_token(stub), "access-code-1"))
+    # The stub sends max-age=21600
+    assert 21590 < auth._google_keys["expires"] - time.monotonic() <= 21600
+    auth._google_keys["expires"] = time.monotonic() - 1
+    run(auth.verify_google_id_token(id_token(stub), "access-code-1"))
+    assert stub.counts["certs"] == 2
+
+
+def test_get_retries_server_errors(stub):
+    stub.failures["certs"] = OAUTH_RETRIES
+    jwks = run(auth._get_google_keys())
+    assert jwks == stub.jwks
+    assert stub.counts["certs"] == OAUTH_RETRIES + 1
+
+
+def test_get_gives_up_after_retries(stub):
+    stub.failures["certs"] = OAUTH_RETRIES + 1
+    with pytest.raises(HTTPException) as exc:
+        run(auth._get_google_keys())
+    assert exc.value.status_code == 502
+    assert stub.counts["certs"] == OAUTH_RETRIES + 1
+
+
+def test_code_exchange_is_not_retried(stub):
+    # The auth code is single-use: a 5xx from the token endpoint is final
+    stub.failures["token"] = 1
+    with pytest.raises(HTTPException) as exc:
+        run(auth.exchange_code("code-1"))
+    assert exc.value.status_code == 400
+    assert stub.counts["token"] == 1
+
+
+def test_verified_id_token_skips_userinfo(stub):
+    user = run(auth.exchange_code("code-7"))
+    assert user["email"] == "student7@iitgn.ac.in" and user["name"] == "Student 7"
+    assert stub.counts == {**stub.counts, "token": 1, "certs": 1, "userinfo": 0}
+
+
+def test_id_token_for_another_client_is_rejected(stub, monkeypatch):
+    monkeypatch.setattr(auth, "GOOGLE_CLIENT_ID", "someone-else")
+    with pytest.raises(JWTError):
+        run(auth.verify_google_id_token(id_token(stub), "access-code-1"))
+    # The login still works, through userinfo
+    user = run(auth.exchange_code("code-1"))
+    assert user["email"] == "student1@iitgn.ac.in"
+    assert stub.counts["userinfo"] == 1
+
+
+def test_tampered_id_token_is_rejected(stub):
+    header, payload, signature = id_token(stub).split(".")
+    forged = jwt.get_unverified_claims(".".join((header, payload, signature)))
+    forged["email"] = "intruder@iitgn.ac.in"
+    payload = jwt.encode(forged, "not-googles-key", algorithm="HS256").split(".")[1]
+    with pytest.raises(JWTError):
+        run(auth.verify_google_id_token(".".join((header, payload, signature)), "access-code-1"))
+
+
+def test_verified_jwt_cache_expires_with_the_token():
+    exp = int(time.time()) + 1
+    token = jwt.encode({"sub": "1", "email": "student1@iitgn.ac.in", "exp": exp}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    key = hashlib.sha256(token.encode()).digest()
+    assert auth.decode_jwt(token)["sub"] == "1"
+    assert auth.token_cache.get(key)["sub"] == "1"
+    time.sleep(max(0.0, exp - time.time()) + 0.05)
+    assert auth.token_cache.get(key) is None
+    # ...and once it is past exp (jose counts whole seconds) the token itself is refused
+    time.sleep(1)
+    with pytest.raises(HTTPException) as exc:
+        auth.decode_jwt(token)
+    assert exc.value.status_code == 401
+
+
+def test_me_checks_out_a_reader_only_on_a_cache_miss(monkeypatch):
+    asyncio.run(init_db())
+    con = sqlite3.connect(DB_PATH)
+    user_id = con.execute("INSERT INTO users (email, name) VALUES ('me@iitgn.ac.in', 'Me')").lastrowid
+    con.commit()
+    con.close()
+    reader, checkouts = pool.reader, []
+
+    def counting_reader(*args, **kwargs):
+        checkouts.append(1)
+        return reader(*args, **kwargs)
+    monkeypatch.setattr(pool, "reader", counting_reader)
+
+    async def calls():
+        return [await me(user={"sub": str(user_id)}) for _ in range(3)]
+    profiles = asyncio.run(calls())
+    assert [p.email for p in profiles] == ["me@iitgn.ac.in"] * 3
+    assert len(checkouts) == 1
+
+
+def test_login_with_a_new_name_refreshes_shoutout_pages(stub):
+    asyncio.run(init_db())
+    con = sqlite3.connect(DB_PATH)
+    user_id = con.execute("INSERT INTO users (email, name) VALUES ('student42@iitgn.ac.in', 'Old Name')").lastrowid
+    con.execute("INSERT INTO shoutouts (message, user_id) VALUES ('Renamed soon', ?)", (user_id,))
+    con.commit()
+    con.close()
+
+    async def page(etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get("/api/shoutouts", params={"limit": 1}, headers=headers)
+
+    before = asyncio.run(page())
+    assert before.json()[0]["author_name"] == "Old Name"
+    assert asyncio.run(page(before.headers["ETag"])).status_code == 304
+
+    run(callback("code-42"))
+    after = asyncio.run(page(before.headers["ETag"]))
+    assert after.status_code == 200
+    assert after.json()[0]["author_name"] == "Student 42"
+    assert after.headers["ETag"] != before.headers["ETag"]
@@ -0,0 +1,159 @@
+"""Online backups (app.backup): a consistent copy under writes, checksums, restore and rotation."""
+import asyncio
+import functools
+import sqlite3
+import threading
+
+import aiosqlite
+import pytest
+
+from app import backup
+from app.backup import BackupError, BackupManager, list_backups, restore, sha256_file, verify
+from app.migrations import migrate
+
+TABLES = ("users", "shoutouts", "polls", "poll_options", "poll_votes")
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "live.db"
+
+    async def create():
+        async with aiosqlite.connect(path) as db:
+            await db.execute("PRAGMA journal_mode = WAL")
+            await migrate(db)
+    asyncio.run(create())
+    con = sqlite3.connect(path)
+    # Enough pages that a copy takes many steps
+    con.executemany("INSERT INTO shoutouts (message) VALUES (?)", [(f"{i:06d} " + "x" * 500,) for i in range(2000)])
+    poll = con.execute("INSERT INTO polls (question) VALUES ('Backed up?')").lastrowid
+    con.execute("INSERT INTO poll_options (poll_id, text) VALUES (?, 'Yes')", (poll,))
+    con.commit()
+    con.close()
+    monkeypatch.setattr(backup, "copy_database", functools.partial(backup.copy_database, pages=8))
+    return path
+
+
+def _counts(path) -> dict[str, int]:
+    con = sqlite3.connect(path)
+    try:
+        return {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES}
+    finally:
+        con.close()
+
+
+def _tally_matches_votes(path) -> bool:
+    con = sqlite3.connect(path)
+    try:
+        tally, votes = con.execute(
+            "SELECT (SELECT COALESCE(SUM(vote_count), 0) FROM poll_options), (SELECT COUNT(*) FROM poll_votes)"
+        ).fetchone()
+    finally:
+        con.close()
+    return tally == votes
+
+
+class _Voter(threading.Thread):
+    """Signs up a user and records their vote (row and tally in one transaction) until stopped."""
+
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.stopping = threading.Event()
+        self.started_voting = threading.Event()
+        self.votes = 0
+
+    def run(self):
+        con = sqlite3.connect(self.path, timeout=10)
+        poll, option = con.execute("SELECT poll_id, id FROM poll_options").fetchone()
+        while not self.stopping.is_set():
+            with con:
+                user = con.execute("INSERT INTO users (email, name) VALUES (?, 'Voter')",
+                                   (f"voter{self.votes}@iitgn.ac.in",)).lastrowid
+                con.execute("INSERT INTO poll_votes (poll_id, option_id, user_id) VALUES (?, ?, ?)",
+                            (poll, option, user))
+                con.execute("UPDATE poll_options SET vote_count = vote_count + 1 WHERE id = ?", (option,))
+            self.votes += 1
+            self.started_voting.set()
+        con.close()
+
+
+def test_backup_under_writes_is_consistent_and_restores(db_path, tmp_path):
+    manager = BackupManager(directory=tmp_path / "backups", interval_hours=0, keep=3, db_path=db_path)
+    voter = _Voter(db_path)
+    voter.start()
+    assert voter.started_voting.wait(10)
+    before = voter.votes
+    try:
+        path = asyncio.run(manager.backup())
+        during = voter.votes - before
+    finally:
+        voter.stopping.set()
+        voter.join()
+    assert manager.stats()["last_steps"] > 1
+    assert during > 0, "no votes landed while the backup ran"
+
+    # The checksum file is sha256sum-style and matches
+    assert verify(path)
+    digest, name = path.with_name(path.name + ".sha256").read_text().split()
+    assert (digest, name) == (sha256_file(path), path.name)
+
+    # The copy is one snapshot: every vote row has its tally, and none written after it started is missing
+    target = tmp_path / "restored.db"
+    assert restore(path, target) is None
+    restored = _counts(target)
+    assert _tally_matches_votes(target)
+    assert before <= restored["poll_votes"] <= voter.votes
+    assert restored["users"] == restored["poll_votes"]
+    assert restored["shoutouts"] == 2000
+
+
+def test_restore_replaces_the_database_with_the_same_rows(db_path, tmp_path):
+    manager = BackupManager(directory=tmp_path / "backups", interval_hours=0, keep=3, db_path=db_path)
+    path = asyncio.run(manager.backup())
+    expected = _counts(db_path)
+
+    # Writes after the backup, some still only in the WAL, must not survive the restore
+    con = sqlite3.connect(db_path)
+    con.execute("PRAGMA wal_autocheckpoint = 0")
+    con.execute("DELETE FROM shoutouts WHERE id % 2 = 0")
+    con.commit()
+    kept = restore(path, db_path)
+    con.close()
+
+    assert _counts(db_path) == expected
+    assert kept is not None and kept.exists()
+    assert _counts(kept)["shoutouts"] == 1000
+
+
+def test_restore_refuses_a_corrupt_backup(db_path, tmp_path):
+    path = asyncio.run(BackupManager(directory=tmp_path / "backups", db_path=db_path).backup())
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert not verify(path)
+    target = tmp_path / "restored.db"
+    with pytest.raises(BackupError):
+        restore(path, target)
+    assert not target.exists()
+
+
+def test_rotation_keeps_the_newest(db_path, tmp_path):
+    directory = tmp_path / "backups"
+    directory.mkdir()
+    # Older backups from earlier days (names carry the time, so these sort first)
+    for day in range(1, 6):
+        old = directory / f"{backup.PREFIX}202601{day:02d}T000000Z{backup.SUFFIX}"
+        old.write_bytes(b"old")
+        old.with_name(old.name + ".sha256").write_text(f"{sha256_file(old)}  {old.name}\n")
+
+    manager = BackupManager(directory=directory, keep=3, db_path=db_path)
+    path = asyncio.run(manager.backup())
+
+    backups = list_backups(directory)
+    assert len(backups) == 3
+    assert backups[-1] == path
+    assert [p.name[len(backup.PREFIX):len(backup.PREFIX) + 8] for p in backups[:-1]] == ["20260104", "20260105"]
+    assert sorted(p.name for p in directory.glob("*.sha256")) == sorted(p.name + ".sha256" for p in backups)
+    assert manager.stats()["rotated"] == 3
@@ -0,0 +1,112 @@
+"""Leader election between workers (app.database.LeaderLock)."""
+import asyncio
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from app import main
+from app.analytics import activity
+from app.backup import BackupManager
+from app.config import DB_PATH
+from app.database import LeaderLock, init_db, leader
+from app.poll_archive import PollCompactor, poll_compactor
+
+HOLDER = """
+import asyncio, sys
+from pathlib import Path
+from app.database import LeaderLock
+
+async def main():
+    lock = LeaderLock(Path(sys.argv[1]))
+    print(await lock.start(lambda: asyncio.sleep(0)), flush=True)
+    await asyncio.sleep(3600)
+
+asyncio.run(main())
+"""
+
+
+def test_one_leader_and_takeover_when_it_stops(tmp_path):
+    async def scenario():
+        elected = []
+
+        def on_elected(name):
+            async def start():
+                elected.append(name)
+            return start
+
+        a, b = LeaderLock(tmp_path / "leader.lock", retry=0.05), LeaderLock(tmp_path / "leader.lock", retry=0.05)
+        assert await a.start(on_elected("a"))
+        assert not await b.start(on_elected("b"))
+        await asyncio.sleep(0.2)
+        assert elected == ["a"] and not b.is_leader
+        await a.stop()
+        await asyncio.sleep(0.2)
+        assert elected == ["a", "b"] and b.is_leader
+        await b.stop()
+
+    asyncio.run(scenario())
+
+
+def test_takeover_when_the_leader_process_dies(tmp_path):
+    # A killed leader never runs its shutdown: the kernel releases the lock
+    holder = subprocess.Popen([sys.executable, "-c", HOLDER, str(tmp_path / "leader.lock")],
+                              stdout=subprocess.PIPE, text=True, cwd=Path(__file__).parent.parent)
+    try:
+        assert holder.stdout.readline().strip() == "True"
+
+        async def scenario():
+            lock = LeaderLock(tmp_path / "leader.lock", retry=0.05)
+            assert not await lock.start(lambda: asyncio.sleep(0))
+            holder.kill()
+            deadline = time.monotonic() + 5
+            while not lock.is_leader and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            assert lock.is_leader
+            await lock.stop()
+
+        asyncio.run(scenario())
+    finally:
+        holder.kill()
+        holder.wait()
+
+
+def test_a_worker_taking_over_reconciles_and_runs_the_jobs(tmp_path, monkeypatch):
+    asyncio.run(init_db())
+    con = sqlite3.connect(DB_PATH)
+    poll = con.execute("INSERT INTO polls (question) VALUES ('Drifted?')").lastrowid
+    option = con.execute("INSERT INTO poll_options (poll_id, text, vote_count) VALUES (?, 'Yes', 7)",
+                         (poll,)).lastrowid
+    con.commit()
+    monkeypatch.setattr(main, "backup_manager", BackupManager(directory=tmp_path, interval_hours=0))
+    monkeypatch.setattr(poll_compactor, "after_hours", 24)  # off by default
+
+    async def scenario():
+        first, second = LeaderLock(tmp_path / "leader.lock", retry=0.05), LeaderLock(tmp_path / "leader.lock", retry=0.05)
+        assert await first.start(lambda: asyncio.sleep(0))
+        assert not await second.start(main._start_leader_jobs)
+        assert not (poll_compactor.running or activity.running)
+        await first.stop()
+        await asyncio.sleep(0.3)
+        running = second.is_leader, poll_compactor.running, activity.running
+        await main._stop_leader_jobs()
+        await second.stop()
+        return running
+
+    assert asyncio.run(scenario()) == (True, True, True)
+    assert con.execute("SELECT vote_count FROM poll_options WHERE id = ?", (option,)).fetchone()[0] == 0
+    con.close()
+
+
+def test_compactor_only_compacts_on_the_leader(monkeypatch):
+    async def passes(is_leader):
+        monkeypatch.setattr(leader, "is_leader", is_leader)
+        compactor = PollCompactor(after_hours=24, interval=0.05)
+        compactor.start()
+        await asyncio.sleep(0.2)
+        await compactor.stop()
+        return compactor.stats()["passes"], compactor.stats()["skipped_passes"] > 0
+
+    assert asyncio.run(passes(False)) == (0, True)
+    assert asyncio.run(passes(True))[0] > 0
@@ -0,0 +1,41 @@
+"""/health is public liveness; /health/details and /metrics are local-only or need the ops token."""
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+
+TUNNEL = {"X-Forwarded-For": "203.0.113.9"}  # what the local tunnel adds for a public caller
+
+
+def get(path: str, headers: dict | None = None, client=("127.0.0.1", 50000)) -> httpx.Response:
+    async def fetch():
+        transport = httpx.ASGITransport(app=main.app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(path, headers=headers)
+    return asyncio.run(fetch())
+
+
+def test_health_is_public_and_minimal():
+    response = get("/health", TUNNEL)
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "service": "ES117 Backend"}
+
+
+@pytest.mark.parametrize("path", ["/health/details", "/metrics"])
+def test_diagnostics_answer_this_machine(path):
+    assert get(path).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/health/details", "/metrics"])
+def test_diagnostics_refuse_the_tunnel_and_other_hosts(path):
+    assert get(path, TUNNEL).status_code == 403
+    assert get(path, client=("198.51.100.7", 50000)).status_code == 403
+
+
+@pytest.mark.parametrize("path", ["/health/details", "/metrics"])
+def test_diagnostics_accept_the_ops_token(path, monkeypatch):
+    monkeypatch.setattr(main, "OPS_TOKEN", "s3cret")
+    assert get(path, {**TUNNEL, "Authorization": "Bearer s3cret"}).status_code == 200
+    assert get(path, {**TUNNEL, "Authorization": "Bearer wrong"}).status_code == 403
@@ -0,0 +1,29 @@
+"""EXPLAIN QUERY PLAN over every router and background-job statement (app.query_plans.QUERY_PLAN_STATEMENTS)."""
+import asyncio
+
+import aiosqlite
+import pytest
+
+from app.migrations import check_query_plans, migrate
+from app.query_plans import QUERY_PLAN_STATEMENTS, WHOLE_TABLE_READS
+
+
+async def _full_scans(path, statements) -> list[dict]:
+    async with aiosqlite.connect(path) as db:
+        await migrate(db)
+        # min_rows=0: a fresh database must already plan every statement without a full scan
+        return await check_query_plans(db, statements, min_rows=0)
+
+
+@pytest.mark.parametrize("name", sorted(QUERY_PLAN_STATEMENTS))
+def test_statement_uses_an_index(tmp_path, name):
+    scans = asyncio.run(_full_scans(tmp_path / "plans.db", [QUERY_PLAN_STATEMENTS[name]]))
+    if name in WHOLE_TABLE_READS:
+        assert {s["table"] for s in scans} == {WHOLE_TABLE_READS[name]}
+    else:
+        assert not scans, "\n".join(scans[0]["plan"])
+
+
+def test_check_reports_a_full_scan(tmp_path):
+    scans = asyncio.run(_full_scans(tmp_path / "plans.db", ["SELECT id FROM shoutouts WHERE message = ?"]))
+    assert [s["table"] for s in scans] == ["shoutouts"]
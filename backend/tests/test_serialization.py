@@ -0,0 +1,101 @@
+"""The fast response rows must be exactly what the Pydantic response models would produce."""
+import asyncio
+import json
+import sqlite3
+
+import httpx
+import pytest
+from pydantic import TypeAdapter
+
+from app.cache import dumps
+from app.config import DB_PATH
+from app.database import init_db, pool
+from app.main import app
+from app.models import PollOut, ShoutoutOut
+from app.routers.polls import _fetch_polls
+from app.routers.shoutouts import _row, _select
+from app.tallies import snapshot_poll
+
+
+def _shape(value):
+    """The value with every leaf replaced by its type, so True and 1 differ."""
+    if isinstance(value, dict):
+        return [(k, _shape(v)) for k, v in value.items()]
+    if isinstance(value, list):
+        return [_shape(v) for v in value]
+    return type(value)
+
+
+def assert_matches_model(model, rows: list[dict]):
+    adapter = TypeAdapter(list[model])
+    validated = adapter.validate_python(rows)
+    # Same keys in the same order, same values, same types
+    assert rows == adapter.dump_python(validated)
+    assert _shape(rows) == _shape(adapter.dump_python(validated))
+    # ...so the bodies decode to the same JSON
+    assert json.loads(dumps(rows)) == json.loads(adapter.dump_json(validated))
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    asyncio.run(init_db())
+    con = sqlite3.connect(DB_PATH)
+    user = con.execute("INSERT INTO users (email, name) VALUES ('serial@iitgn.ac.in', 'Zoë Ünïcode')").lastrowid
+    con.executemany("INSERT INTO shoutouts (message, user_id) VALUES (?, ?)", [
+        ("Great demo today! 🎉", user),
+        ('Quotes " and \\\\ backslashes, <b>tags</b>', user),
+        ("Posted before accounts existed", None),
+    ])
+    polls = []
+    for question, active in (("Open question?", 1), ("Closed question?", 0)):
+        poll = con.execute("INSERT INTO polls (question, is_active) VALUES (?, ?)", (question, active)).lastrowid
+        options = [con.execute("INSERT INTO poll_options (poll_id, text) VALUES (?, ?)", (poll, text)).lastrowid
+                   for text in ("Yes", "No", "Ünsure")]
+        con.execute("INSERT INTO poll_votes (poll_id, option_id, user_id) VALUES (?, ?, ?)", (poll, options[0], user))
+        con.execute("UPDATE poll_options SET vote_count = 1 WHERE id = ?", (options[0],))
+        polls.append(poll)
+    con.commit()
+    con.close()
+    return {"user": user, "polls": polls}
+
+
+def test_shoutout_rows_match_model(seeded):
+    async def rows():
+        async with pool.reader() as db:
+            return [_row(r) for r in await _select(db, None, None, 1000)]
+    shoutouts = asyncio.run(rows())
+    assert any(s["author_name"] is None for s in shoutouts)
+    assert_matches_model(ShoutoutOut, shoutouts)
+
+
+@pytest.mark.parametrize("as_voter", [False, True])
+def test_poll_rows_match_model(seeded, as_voter):
+    async def rows():
+        async with pool.reader() as db:
+            return await _fetch_polls(db, "1 = 1", (), seeded["user"] if as_voter else None)
+    polls = asyncio.run(rows())
+    # Other tests share the database; the seeded polls are the ones this user voted on
+    assert {p["user_voted_option"] is not None for p in polls if p["id"] in seeded["polls"]} == {as_voter}
+    assert_matches_model(PollOut, polls)
+
+
+def test_closed_poll_snapshot_matches_model(seeded):
+    async def snapshot():
+        async with pool.writer() as db:
+            snap = await snapshot_poll(db, seeded["polls"][1])
+            await db.rollback()
+            return snap
+    assert_matches_model(PollOut, [asyncio.run(snapshot())])
+
+
+def test_ndjson_stream_matches_json_listing(seeded):
+    async def fetch():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            listing = await client.get("/api/shoutouts", params={"limit": 200})
+            stream = await client.get("/api/shoutouts/ndjson", params={"limit": 200})
+        return listing, stream
+    listing, stream = asyncio.run(fetch())
+    assert stream.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in stream.content.splitlines()]
+    assert lines == listing.json()
+    assert_matches_model(ShoutoutOut, lines)
@@ -0,0 +1,70 @@
+"""Vote activity counts a user's first vote in a poll, on both write paths, like the migration backfill."""
+import asyncio
+import sqlite3
+
+import pytest
+
+from app.analytics import DAY
+from app.config import DB_PATH
+from app.database import init_db
+from app.models import VoteCreate
+from app.routers import polls
+from app.vote_queue import VoteWriter
+
+
+@pytest.fixture
+def poll():
+    asyncio.run(init_db())
+    con = sqlite3.connect(DB_PATH)
+    user = con.execute("INSERT INTO users (email, name) VALUES (?, 'Voter')",
+                       (f"voter-{con.execute('SELECT COUNT(*) FROM users').fetchone()[0]}@iitgn.ac.in",)).lastrowid
+    poll_id = con.execute("INSERT INTO polls (question) VALUES ('Again?')").lastrowid
+    options = [con.execute("INSERT INTO poll_options (poll_id, text) VALUES (?, ?)", (poll_id, text)).lastrowid
+               for text in ("Yes", "No")]
+    con.commit()
+    con.close()
+    return {"id": poll_id, "options": options, "user": {"sub": str(user)}}
+
+
+def _votes_recorded(poll_id: int) -> int:
+    con = sqlite3.connect(DB_PATH)
+    try:
+        return con.execute("SELECT COALESCE(SUM(count), 0) FROM activity_rollups "
+                           "WHERE grain = ? AND kind = 'vote' AND scope = ?", (DAY, poll_id)).fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_direct_vote_counts_only_first_votes(poll):
+    yes, no = poll["options"]
+
+    async def cast(option_id):
+        await polls.vote(poll["id"], VoteCreate(option_id=option_id), user=poll["user"])
+
+    asyncio.run(cast(yes))
+    assert _votes_recorded(poll["id"]) == 1
+    asyncio.run(cast(yes))
+    assert _votes_recorded(poll["id"]) == 1
+    asyncio.run(cast(no))
+    assert _votes_recorded(poll["id"]) == 1
+
+
+def test_queued_votes_count_only_first_votes(poll, monkeypatch):
+    yes, no = poll["options"]
+
+    async def cast(*option_ids):
+        writer = VoteWriter(max_latency_ms=50)
+        monkeypatch.setattr(polls, "vote_writer", writer)
+        await writer.start()
+        # Submitted together, so they land in one batch
+        await asyncio.gather(*(polls.vote(poll["id"], VoteCreate(option_id=o), user=poll["user"])
+                               for o in option_ids))
+        await writer.stop()
+        return writer.stats()["largest_batch"]
+
+    assert asyncio.run(cast(yes, yes)) == 2
+    assert _votes_recorded(poll["id"]) == 1
+    asyncio.run(cast(yes))
+    assert _votes_recorded(poll["id"]) == 1
+    asyncio.run(cast(no, no))
+    assert _votes_recorded(poll["id"]) == 1
@@ -41,8 +41,11 @@ async function apiFetch(endpoint, options = {}) {
       ...options, headers, signal: controller.signal
     });
     clearTimeout(timeout);
+    if (options._onResponse) options._onResponse(res);
     if (!res.ok) {
       if (res.status === 401) return '__401__';
+      // Rate limited or server shedding load: the caller says "slow down"
+      if (res.status === 429 || res.status === 503) return '__busy__';
       return null;
     }
     return await res.json();
@@ -51,10 +54,98 @@ async function apiFetch(endpoint, options = {}) {
   }
 }
 
+// --- Live Updates (Server-Sent Events) ---
+// Read with fetch rather than EventSource, which can't send the ngrok
+// header (without it ngrok answers with its warning page, not the stream).
+// Reconnects resend Last-Event-ID, so missed events are replayed; a 'reset'
+// event means they were not and we refetch. Pass the X-Event-Id of the data
+// just loaded as lastEventId to also get the events since that read.
+// Handlers get the event's data and its id.
+const STREAM_OPEN = 1, STREAM_CLOSED = 2;
+
+function connectLiveStream(handlers, lastEventId = null) {
+  if (!API_BASE || typeof ReadableStream === 'undefined') return null;
+  let controller = null;
+  let retry = 3000;
+  const stream = {
+    readyState: 0,
+    lastEventId,
+    close() {
+      stream.readyState = STREAM_CLOSED;
+      if (controller) controller.abort();
+    },
+  };
+
+  function dispatch(frame) {
+    let event = 'message', data = [];
+    frame.split('\n').forEach(line => {
+      if (!line || line.startsWith(':')) return;
+      const colon = line.indexOf(':');
+      const field = colon < 0 ? line : line.slice(0, colon);
+      const value = colon < 0 ? '' : line.slice(colon + 1).replace(/^ /, '');
+      if (field === 'id') stream.lastEventId = value;
+      else if (field === 'event') event = value;
+      else if (field === 'data') data.push(value);
+      else if (field === 'retry' && /^\d+$/.test(value)) retry = parseInt(value);
+    });
+    if (!data.length || !handlers[event]) return;
+    try { handlers[event](JSON.parse(data.join('\n')), stream.lastEventId); } catch { /* ignore malformed events */ }
+  }
+
+  (async () => {
+    while (stream.readyState !== STREAM_CLOSED) {
+      controller = new AbortController();
+      try {
+        const headers = { 'Accept': 'text/event-stream', 'ngrok-skip-browser-warning': '1' };
+        if (stream.lastEventId) headers['Last-Event-ID'] = stream.lastEventId;
+        const res = await fetch(`${API_BASE}/api/stream`, { headers, cache: 'no-store', signal: controller.signal });
+        if (res.ok && res.body && (res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+          stream.readyState = STREAM_OPEN;
+          const reader = res.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = '';
+          for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer = (buffer + decoder.decode(value, { stream: true })).replace(/\r\n?/g, '\n');
+            let end;
+            while ((end = buffer.indexOf('\n\n')) >= 0) {
+              dispatch(buffer.slice(0, end));
+              buffer = buffer.slice(end + 2);
+            }
+          }
+        }
+      } catch { /* network error, or close() */ }
+      if (stream.readyState === STREAM_CLOSED) break;
+      stream.readyState = 0;
+      await new Promise(resolve => setTimeout(resolve, retry));
+    }
+  })();
+  return stream;
+}
+
+// --- Site Data ---
+// The backend serves data/*.json compressed with ETags,
+// so repeat visits revalidate with a 304; the static copies are the fallback.
+async function fetchSiteData(name, fallbackUrl = `data/${name}`) {
+  if (API_BASE) {
+    try {
+      const controller = new AbortController();
+      const timeout = setTimeout(() => controller.abort(), 2000);
+      const res = await fetch(`${API_BASE}/api/data/${name}`, {
+        headers: { 'ngrok-skip-browser-warning': '1' }, signal: controller.signal,
+      });
+      clearTimeout(timeout);
+      if (res.ok || res.status === 404) return res;
+    } catch { /* backend unreachable — use the static copy */ }
+  }
+  return fetch(fallbackUrl);
+}
+
 // --- Data Loading ---
 async function loadTeams() {
   try {
-    const res = await fetch('data/teams.json');
+    const res = await fetchSiteData('teams.json');
     if (!res.ok) throw new Error('Failed to load team data');
     return await res.json();
   } catch (err) {
@@ -63,9 +154,18 @@ async function loadTeams() {
   }
 }
 
+// One team from the backend's team directory (a few hundred bytes);
+// the whole teams.json when the backend is off or doesn't know the id.
+async function loadTeam(id) {
+  const team = await apiFetch(`/api/teams/${encodeURIComponent(id)}`);
+  if (team && typeof team === 'object') return team;
+  const teams = await loadTeams();
+  return teams.find(t => t.id === id) || null;
+}
+
 async function loadUpdates(week) {
   try {
-    const res = await fetch(`data/updates/week${String(week).padStart(2, '0')}.json`);
+    const res = await fetchSiteData(`updates/week${String(week).padStart(2, '0')}.json`);
     if (!res.ok) return [];
     return await res.json();
   } catch { return []; }
@@ -83,21 +183,31 @@ async function loadAllUpdates() {
 
 async function loadQuotes() {
   try {
-    const res = await fetch('data/quotes.json');
+    const res = await fetchSiteData('quotes.json');
     if (!res.ok) return [];
     return await res.json();
   } catch { return []; }
 }
 
 async function loadShoutouts() {
-  // Try API first, fall back to static JSON
-  const apiData = await apiFetch('/api/shoutouts');
-  if (apiData) return apiData;
+  // The backend exports the wall into data/shoutouts.json (with ids), which
+  // the static host serves; only shoutouts newer than it come from the API.
+  let snapshot = [];
   try {
     const res = await fetch('data/shoutouts.json');
-    if (!res.ok) return [];
-    return await res.json();
-  } catch { return []; }
+    if (res.ok) snapshot = await res.json();
+  } catch { /* no static copy */ }
+  const newest = snapshot.reduce((max, s) => Math.max(max, s.id || 0), 0);
+  if (!newest) {
+    // Hand-written file: the API has the whole wall
+    const apiData = await apiFetch('/api/shoutouts');
+    return Array.isArray(apiData) ? apiData : snapshot;
+  }
+  const limit = 100;
+  const fresh = await apiFetch(`/api/shoutouts?since=${newest}&limit=${limit}`);
+  if (!Array.isArray(fresh)) return snapshot;
+  // A full page may not reach back to the snapshot: show the API's page alone
+  return fresh.length === limit ? fresh : [...fresh, ...snapshot];
 }
 
 // --- Utility ---
@@ -846,9 +956,24 @@ async function initWallPage() {
 
   // Load shoutouts
   const shoutouts = await loadShoutouts();
+  const seen = new Set(shoutouts.map(s => s.id).filter(Boolean));
   const shuffled = shoutouts.sort(() => Math.random() - 0.5);
   gridEl.innerHTML = shuffled.map((s, i) => renderShoutoutCard(s, i)).join('');
 
+  // New shoutouts from other people appear without a reload
+  connectLiveStream({
+    'shoutout.created': shout => {
+      if (seen.has(shout.id)) return;
+      seen.add(shout.id);
+      gridEl.insertAdjacentHTML('afterbegin', renderShoutoutCard(shout, seen.size));
+    },
+    'reset': async () => {
+      const fresh = await loadShoutouts();
+      fresh.forEach(s => seen.add(s.id));
+      gridEl.innerHTML = fresh.map((s, i) => renderShoutoutCard(s, i)).join('');
+    },
+  });
+
   // Handle form submission
   const form = document.getElementById('shoutout-form');
   if (form) {
@@ -861,11 +986,14 @@ async function initWallPage() {
         method: 'POST',
         body: JSON.stringify({ message: msg })
       });
-      if (result) {
+      if (result === '__busy__') {
+        showToast('Slow down a little — try again in a few seconds');
+      } else if (result) {
         input.value = '';
         showToast('Shoutout posted! 🎉');
         // Reload
         const fresh = await loadShoutouts();
+        fresh.forEach(s => seen.add(s.id));
         gridEl.innerHTML = fresh.map((s, i) => renderShoutoutCard(s, i)).join('');
       } else {
         showToast('Failed to post — try again');
@@ -877,41 +1005,36 @@ async function initWallPage() {
 // ============================================================
 // FEATURE: Polls
 // ============================================================
-async function renderPolls() {
-  const container = document.getElementById('polls-container');
-  if (!container || !API_BASE) return;
-
-  const polls = await apiFetch('/api/polls');
-  if (!polls || polls.length === 0) {
-    container.style.display = 'none';
-    return;
-  }
+const pollState = {};
+let pollStream = null;
+let pollsEventId = null; // stream position the rendered counts already include
 
+function renderPollCard(poll) {
+  pollState[poll.id] = poll;
   const token = getToken();
-  container.innerHTML = polls.map(poll => {
-    const totalVotes = poll.options.reduce((s, o) => s + o.votes, 0);
-    const optionsHtml = poll.options.map(opt => {
-      const pct = totalVotes > 0 ? Math.round((opt.votes / totalVotes) * 100) : 0;
-      const voted = poll.user_voted_option === opt.id;
-      const cls = voted ? 'poll-option poll-option--voted' : 'poll-option';
-      return `
-              <button class="${cls}" data-poll="${poll.id}" data-option="${opt.id}"
-                      ${!token ? 'disabled title="Login to vote"' : ''}>
-                <span class="poll-option__text">${escapeHtml(opt.text)}</span>
-                <span class="poll-option__bar" style="width:${pct}%"></span>
-                <span class="poll-option__pct">${pct}%</span>
-              </button>`;
-    }).join('');
+  const totalVotes = poll.options.reduce((s, o) => s + o.votes, 0);
+  const optionsHtml = poll.options.map(opt => {
+    const pct = totalVotes > 0 ? Math.round((opt.votes / totalVotes) * 100) : 0;
+    const voted = poll.user_voted_option === opt.id;
+    const cls = voted ? 'poll-option poll-option--voted' : 'poll-option';
     return `
-          <div class="poll-card animate-in">
-            <h3 class="poll-card__question">${escapeHtml(poll.question)}</h3>
-            <div class="poll-card__options">${optionsHtml}</div>
-            <div class="poll-card__meta">${totalVotes} vote${totalVotes !== 1 ? 's' : ''}</div>
-          </div>`;
+            <button class="${cls}" data-poll="${poll.id}" data-option="${opt.id}"
+                    ${!token ? 'disabled title="Login to vote"' : ''}>
+              <span class="poll-option__text">${escapeHtml(opt.text)}</span>
+              <span class="poll-option__bar" style="width:${pct}%"></span>
+              <span class="poll-option__pct">${pct}%</span>
+            </button>`;
   }).join('');
+  return `
+        <div class="poll-card animate-in" data-poll-id="${poll.id}">
+          <h3 class="poll-card__question">${escapeHtml(poll.question)}</h3>
+          <div class="poll-card__options">${optionsHtml}</div>
+          <div class="poll-card__meta">${totalVotes} vote${totalVotes !== 1 ? 's' : ''}</div>
+        </div>`;
+}
 
-  // Vote click handlers
-  container.querySelectorAll('.poll-option:not([disabled])').forEach(btn => {
+function bindPollVotes(root) {
+  root.querySelectorAll('.poll-option:not([disabled])').forEach(btn => {
     btn.addEventListener('click', async () => {
       const pollId = btn.dataset.poll;
       const optionId = btn.dataset.option;
@@ -919,14 +1042,81 @@ async function renderPolls() {
         method: 'POST',
         body: JSON.stringify({ option_id: parseInt(optionId) })
       });
-      if (result) {
+      if (result === '__busy__') {
+        showToast('Too many votes at once — try again in a few seconds');
+      } else if (result) {
         showToast('Vote recorded! ✅');
-        renderPolls(); // Refresh
+        if (pollStream && pollStream.readyState === STREAM_OPEN && pollState[pollId]) {
+          // Counts arrive as a poll.tally event; only the highlight changes here
+          pollState[pollId].user_voted_option = parseInt(optionId);
+          const card = document.querySelector(`.poll-card[data-poll-id="${pollId}"]`);
+          card.outerHTML = renderPollCard(pollState[pollId]);
+          bindPollVotes(document.querySelector(`.poll-card[data-poll-id="${pollId}"]`));
+        } else {
+          refreshPollCard(pollId);
+        }
       }
     });
   });
 }
 
+async function refreshPollCard(pollId) {
+  // Refetch only the poll that changed instead of the whole list
+  const card = document.querySelector(`.poll-card[data-poll-id="${pollId}"]`);
+  const poll = await apiFetch(`/api/polls/${pollId}`);
+  if (!card || !poll || poll === '__401__') return renderPolls();
+  card.outerHTML = renderPollCard(poll);
+  bindPollVotes(document.querySelector(`.poll-card[data-poll-id="${pollId}"]`));
+}
+
+function applyPollTally({ poll_id, deltas }, eventId) {
+  // Apply vote deltas locally instead of refetching the poll,
+  // skipping those the last /api/polls read already counted
+  if (pollsEventId !== null && eventId && Number(eventId) <= Number(pollsEventId)) return;
+  const poll = pollState[poll_id];
+  const card = document.querySelector(`.poll-card[data-poll-id="${poll_id}"]`);
+  if (!poll || !card) return;
+  poll.options.forEach(opt => { opt.votes += deltas[opt.id] || 0; });
+  card.outerHTML = renderPollCard(poll);
+  bindPollVotes(document.querySelector(`.poll-card[data-poll-id="${poll_id}"]`));
+}
+
+// A bulk import sends one poll.created per poll: refetch once per burst
+let pollRenderTimer = null;
+function scheduleRenderPolls() {
+  clearTimeout(pollRenderTimer);
+  pollRenderTimer = setTimeout(renderPolls, 250);
+}
+
+async function renderPolls() {
+  const container = document.getElementById('polls-container');
+  if (!container || !API_BASE) return;
+
+  let eventId = null;
+  const polls = await apiFetch('/api/polls', { _onResponse: res => { eventId = res.headers.get('X-Event-Id'); } });
+  if (Array.isArray(polls)) pollsEventId = eventId;
+  if (Array.isArray(polls) && !pollStream) {
+    // Resume from the read so tallies committed since are not lost
+    pollStream = connectLiveStream({
+      'poll.tally': applyPollTally,
+      'poll.created': scheduleRenderPolls,
+      'poll.closed': () => renderPolls(),
+      'poll.reopened': () => renderPolls(),
+      'reset': () => renderPolls(),
+    }, eventId);
+  }
+  if (!polls || polls.length === 0) {
+    container.style.display = 'none';
+    return;
+  }
+
+  container.style.display = '';
+  container.innerHTML = polls.map(renderPollCard).join('');
+
+  // Vote click handlers
+  bindPollVotes(container);
+}
+
 // ============================================================
 // FEATURE: Auth UI
 // ============================================================
@@ -1021,8 +1211,7 @@ async function initTeamPage() {
   const id = getQueryParam('id');
   if (!id) { window.location.href = 'index.html'; return; }
 
-  const teams = await loadTeams();
-  const team = teams.find(t => t.id === id);
+  const team = await loadTeam(id);
   const content = document.getElementById('team-content');
 
   if (!team) {
@@ -1044,6 +1233,7 @@ async function initTeamPage() {
 // --- Global Init (runs on all pages) ---
 document.addEventListener('DOMContentLoaded', async () => {
   // 🚨 EMERGENCY KILL SWITCH — check site-config.json first
+  // Always from the static host, uncached: it must work while the backend is stale or down
   try {
     const cfg = await fetch('site-config.json?' + Date.now()).then(r => r.json());
     if (cfg.maintenance) {
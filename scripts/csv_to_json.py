@@ -1,14 +1,39 @@
 #!/usr/bin/env python3
-"""Convert Google Forms CSV to structured JSON for the ES117 website."""
+"""Convert Google Forms CSV to structured JSON for the ES117 website.
+
+Rows are streamed one at a time, so memory stays flat however long the
+export gets. A checkpoint remembers how many rows earlier runs consumed
+(and a hash of them); the next run skips straight past those rows and
+merges only the new ones into the existing JSON. If the export was edited
+rather than appended to, the hash no longer matches and the output is
+rebuilt from scratch. Outputs are written atomically.
+"""
 
 import csv
+import hashlib
 import json
 import argparse
 import re
 import os
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
+CHECKPOINT_DIR = Path(__file__).parent / ".checkpoints"
+
+# Google Forms timestamp formats seen in exports
+TIMESTAMP_FORMATS = ("%m/%d/%Y %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S")
+
+# Weekly form: output field -> header keywords (first matching column wins)
+WEEKLY_COLUMNS = {
+    "timestamp": ("timestamp",),
+    "email": ("email",),
+    "team": ("team id", "team", "project"),
+    "summary": ("summary", "progress", "update", "what did"),
+    "highlights": ("highlight", "accomplish", "achieve", "done"),
+    "blockers": ("blocker", "challenge", "issue", "help"),
+}
 
 def slugify(text):
     """Create a URL-friendly slug from text."""
@@ -17,91 +42,307 @@ def slugify(text):
     text = re.sub(r'[\s_]+', '-', text)
     return text[:60]
 
+def parse_timestamp(value):
+    """Parse a Forms timestamp; None if it is in an unknown format."""
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def write_json_atomic(path, data, indent=2):
+    """Write JSON next to `path`, fsync it, then rename over the original."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_json(path, default):
+    if not path.exists():
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class RowStream:
+    """Lazily read CSV rows, resuming after a checkpoint when the export was only appended to.
+
+    The checkpoint records the byte offset reached and a hash of the bytes
+    before it. Resuming hashes that prefix (fast, no CSV parsing) and, if
+    it is unchanged, seeks straight past it. After construction `mode` is
+    "incremental" or "full" (no usable checkpoint: every row is yielded
+    and the caller should start from empty output).
+    """
+
+    def __init__(self, csv_path, checkpoint=None):
+        self.csv_path = csv_path
+        self._file = open(csv_path, 'rb')
+        self._hash = hashlib.sha256()
+        self.offset = 0
+        self.rows = 0
+        self.last_timestamp = ""
+        self.header = next(csv.reader(self._lines()), [])
+        self.mode = "full"
+        if checkpoint and self._resume(checkpoint):
+            self.mode = "incremental"
+
+    def _lines(self):
+        """Decoded lines, tracking the byte offset and hash of everything consumed."""
+        for line in self._file:
+            self.offset += len(line)
+            self._hash.update(line)
+            yield line.decode('utf-8')
+
+    def _resume(self, checkpoint):
+        """Skip the bytes an earlier run processed if they are unchanged; True on success."""
+        target = checkpoint.get("offset", 0)
+        prefix = hashlib.sha256()
+        self._file.seek(0)
+        remaining = target
+        while remaining > 0:
+            block = self._file.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            prefix.update(block)
+            remaining -= len(block)
+        if remaining or prefix.hexdigest() != checkpoint.get("digest"):
+            # Export was edited or truncated: start over after the header
+            self._file.seek(0)
+            self._hash = hashlib.sha256()
+            self.offset = 0
+            next(csv.reader(self._lines()), None)
+            return False
+        self._hash = prefix
+        self.offset = target
+        self.rows = checkpoint.get("rows", 0)
+        self.last_timestamp = checkpoint.get("last_timestamp", "")
+        return True
+
+    def __iter__(self):
+        try:
+            for row in csv.reader(self._lines()):
+                self.rows += 1
+                if row and row[0].strip():
+                    self.last_timestamp = row[0].strip()
+                yield row
+        finally:
+            self._file.close()
+
+    def close(self):
+        self._file.close()
+
+    def checkpoint(self):
+        """State to resume from next time (call after iterating)."""
+        return {"offset": self.offset, "digest": self._hash.hexdigest(), "rows": self.rows,
+                "last_timestamp": self.last_timestamp}
+
+
+def merge_ideation(teams, rows):
+    """Merge ideation form rows into `teams` in place. Returns the number of rows applied."""
+    seen_projects = {slugify(t["name"]): i for i, t in enumerate(teams)}
+    team_num = max((int(re.sub(r'\D', '', t["id"]) or 0) for t in teams), default=0)
+    applied = 0
+
+    for row in rows:
+        if len(row) < 7:
+            continue
+        applied += 1
+
+        timestamp = row[0].strip()
+        email = row[1].strip()
+        captain = row[2].strip()
+        project_type = row[3].strip().lower()
+        idea_locked = row[4].strip()
+        project_name = row[5].strip()
+        description = row[6].strip()
+        idea_status = row[7].strip() if len(row) > 7 else ""
+        funding_needed = row[8].strip() if len(row) > 8 else ""
+        comments = row[9].strip() if len(row) > 9 else ""
+
+        # Skip duplicate entries (keep the latest one)
+        slug = slugify(project_name)
+        if slug in seen_projects:
+            # Update existing with latest data
+            idx = seen_projects[slug]
+            teams[idx]["description"] = description
+            teams[idx]["captain"] = captain
+            teams[idx]["comments"] = comments
+            continue
+
+        team_num += 1
+        team_id = f"team{team_num:02d}"
+
+        team = {
+            "id": team_id,
+            "name": project_name,
+            "captain": captain,
+            "email": email,
+            "type": project_type,
+            "description": description,
+            "currentPhase": 1,
+            "phaseStatus": "Ideation submitted",
+            "memberCount": 25 if project_type == "hardware" else 10,
+            "ideaLocked": idea_locked.lower() == "yes",
+            "fundingNeeded": funding_needed.lower() == "yes" if funding_needed else False,
+            "comments": comments,
+            "submittedAt": timestamp,
+        }
+
+        seen_projects[slug] = len(teams)
+        teams.append(team)
+
+    return applied
+
 def parse_ideation_csv(csv_path):
     """Parse the ideation phase Google Form CSV and create teams.json."""
     teams = []
-    seen_projects = {}
-    
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        
-        team_num = 0
-        for row in reader:
-            if len(row) < 7:
-                continue
-            
-            timestamp = row[0].strip()
-            email = row[1].strip()
-            captain = row[2].strip()
-            project_type = row[3].strip().lower()
-            idea_locked = row[4].strip()
-            project_name = row[5].strip()
-            description = row[6].strip()
-            idea_status = row[7].strip() if len(row) > 7 else ""
-            funding_needed = row[8].strip() if len(row) > 8 else ""
-            comments = row[9].strip() if len(row) > 9 else ""
-            
-            # Skip duplicate entries (keep the latest one)
-            slug = slugify(project_name)
-            if slug in seen_projects:
-                # Update existing with latest data
-                idx = seen_projects[slug]
-                teams[idx]["description"] = description
-                teams[idx]["captain"] = captain
-                teams[idx]["comments"] = comments
-                continue
-            
-            team_num += 1
-            team_id = f"team{team_num:02d}"
-            
-            team = {
-                "id": team_id,
-                "name": project_name,
-                "captain": captain,
-                "email": email,
-                "type": project_type,
-                "description": description,
-                "currentPhase": 1,
-                "phaseStatus": "Ideation submitted",
-                "memberCount": 25 if project_type == "hardware" else 10,
-                "ideaLocked": idea_locked.lower() == "yes",
-                "fundingNeeded": funding_needed.lower() == "yes" if funding_needed else False,
-                "comments": comments,
-                "submittedAt": timestamp,
-            }
-            
-            seen_projects[slug] = len(teams)
-            teams.append(team)
-    
+    merge_ideation(teams, RowStream(csv_path))
+    return teams
+
+
+def weekly_columns(header):
+    """Map WEEKLY_COLUMNS fields to column indexes in this export's header."""
+    lowered = [h.strip().lower() for h in header]
+    columns = {}
+    for field, keywords in WEEKLY_COLUMNS.items():
+        for keyword in keywords:
+            match = next((i for i, h in enumerate(lowered) if keyword in h and i not in columns.values()), None)
+            if match is not None:
+                columns[field] = match
+                break
+    if "team" not in columns:
+        raise ValueError("weekly CSV needs a column naming the team (e.g. 'Team ID' or 'Project name')")
+    return columns
+
+def team_resolver(teams):
+    """Find a team id from whatever the form collected: id, project name or captain email."""
+    lookup = {}
+    for t in teams:
+        lookup[t["id"].lower()] = t["id"]
+        lookup[slugify(t["name"])] = t["id"]
+        if t.get("email"):
+            lookup.setdefault(t["email"].strip().lower(), t["id"])
+
+    @lru_cache(maxsize=4096)
+    def resolve(team_value, email=""):
+        value = team_value.strip()
+        return lookup.get(value.lower()) or lookup.get(slugify(value)) or lookup.get(email.strip().lower())
+    return resolve
+
+def split_highlights(text):
+    items = re.split(r'[\n;•]+', text)
+    return [item.strip().lstrip('-*').strip() for item in items if item.strip().lstrip('-*').strip()]
+
+def merge_weekly(updates, rows, header, week, resolve):
+    """Merge weekly form rows into `updates` ({teamId: entry}); a team's latest row wins.
+
+    Returns (rows applied, rows whose team could not be matched).
+    """
+    columns = weekly_columns(header)
+
+    def cell(row, field):
+        idx = columns.get(field)
+        return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+    applied = unmatched = 0
+    for row in rows:
+        if not any(c.strip() for c in row):
+            continue
+        team_id = resolve(cell(row, "team"), cell(row, "email"))
+        if team_id is None:
+            unmatched += 1
+            continue
+        applied += 1
+        timestamp = cell(row, "timestamp")
+        parsed = parse_timestamp(timestamp) if timestamp else None
+        entry = {
+            "teamId": team_id,
+            "week": week,
+            "date": parsed.strftime("%Y-%m-%d") if parsed else timestamp.split(" ")[0],
+            "summary": cell(row, "summary") or "Update",
+        }
+        highlights = split_highlights(cell(row, "highlights"))
+        if highlights:
+            entry["highlights"] = highlights
+        blockers = cell(row, "blockers")
+        if blockers and blockers.lower() not in ("no", "none", "n/a", "nil", "-"):
+            entry["blockers"] = blockers
+        updates[team_id] = entry
+    return applied, unmatched
+
+
+def _resume(csv_path, output_path, checkpoint_path, full):
+    """Open the CSV past the checkpoint, unless there is nothing valid to merge into."""
+    checkpoint = None if full else load_json(checkpoint_path, None)
+    stream = RowStream(csv_path, checkpoint)
+    if stream.mode == "incremental" and not output_path.exists():
+        stream.close()
+        stream = RowStream(csv_path)
+    return stream
+
+def run_ideation(csv_path, data_dir, checkpoint_path, full=False):
+    output_path = data_dir / "teams.json"
+    stream = _resume(csv_path, output_path, checkpoint_path, full)
+    teams = load_json(output_path, []) if stream.mode == "incremental" else []
+    skipped = stream.rows
+    applied = merge_ideation(teams, stream)
+    if stream.mode == "incremental" and applied == 0:
+        print(f"✅ No new rows since the last run ({skipped} already processed)")
+    else:
+        write_json_atomic(output_path, teams)
+        print(f"✅ {'Merged' if stream.mode == 'incremental' else 'Created'} {output_path} "
+              f"with {len(teams)} teams ({applied} rows applied, {skipped} skipped)")
+    write_json_atomic(checkpoint_path, stream.checkpoint(), indent=None)
     return teams
 
+def run_weekly(csv_path, data_dir, week, checkpoint_path, full=False):
+    output_path = data_dir / "updates" / f"week{week:02d}.json"
+    resolve = team_resolver(load_json(data_dir / "teams.json", []))
+    stream = _resume(csv_path, output_path, checkpoint_path, full)
+    existing = load_json(output_path, []) if stream.mode == "incremental" else []
+    updates = {u["teamId"]: u for u in existing}
+    skipped = stream.rows
+    applied, unmatched = merge_weekly(updates, stream, stream.header, week, resolve)
+    if unmatched:
+        print(f"⚠️  {unmatched} rows did not match any team in teams.json")
+    if stream.mode == "incremental" and applied == 0:
+        print(f"✅ No new rows since the last run ({skipped} already processed)")
+    else:
+        entries = sorted(updates.values(), key=lambda u: u["teamId"])
+        write_json_atomic(output_path, entries)
+        print(f"✅ {'Merged' if stream.mode == 'incremental' else 'Created'} {output_path} "
+              f"with {len(entries)} team updates ({applied} rows applied, {skipped} skipped)")
+    write_json_atomic(checkpoint_path, stream.checkpoint(), indent=None)
+    return updates
+
 def main():
     parser = argparse.ArgumentParser(description="Convert Google Form CSV to JSON for ES117 website")
     parser.add_argument("--csv", required=True, help="Path to the CSV file")
     parser.add_argument("--type", default="ideation", choices=["ideation", "weekly"],
                        help="Type of form data")
     parser.add_argument("--week", type=int, help="Week number (for weekly updates)")
+    parser.add_argument("--data-dir", type=Path, default=PROJECT_ROOT / "data", help="Output directory")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file (default: scripts/.checkpoints/<type>.json)")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and rebuild from scratch")
     args = parser.parse_args()
-    
-    data_dir = PROJECT_ROOT / "data"
+
+    data_dir = args.data_dir
     data_dir.mkdir(exist_ok=True)
-    
+
     if args.type == "ideation":
-        teams = parse_ideation_csv(args.csv)
-        output_path = data_dir / "teams.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(teams, f, indent=2, ensure_ascii=False)
-        print(f"✅ Created {output_path} with {len(teams)} teams")
-    
+        checkpoint = args.checkpoint or CHECKPOINT_DIR / "ideation.json"
+        run_ideation(args.csv, data_dir, checkpoint, args.full)
+
     elif args.type == "weekly":
         if not args.week:
             print("❌ --week is required for weekly updates")
             return
-        updates_dir = data_dir / "updates"
-        updates_dir.mkdir(exist_ok=True)
-        # TODO: parse weekly update CSV
-        print(f"Weekly update parsing for week {args.week} - coming soon")
+        checkpoint = args.checkpoint or CHECKPOINT_DIR / f"weekly-week{args.week:02d}.json"
+        run_weekly(args.csv, data_dir, args.week, checkpoint, args.full)
 
 if __name__ == "__main__":
     main()